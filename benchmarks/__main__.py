@@ -0,0 +1,62 @@
+"""
+Runs the benchmark suite and writes the results into a JSON file.
+
+Usage::
+
+    python -m benchmarks [-o results.json] [-k name]
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+
+import pazgui
+
+from benchmarks.common import report
+from benchmarks.bench_suite import suite
+
+
+def run(selected=None):
+    """
+    :arg str selected: Only the scenarios containing it in their names
+                       are run if it is given.
+    :return dict: Results by scenario name
+    """
+
+    results = { }
+    for name, fcn in suite().items():
+        if selected != None and selected not in name:
+            continue
+
+        results[name] = fcn()
+        report({ name: results[name] })
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('-o', '--output', default='benchmark-results.json',
+        help='JSON file the results are written into')
+    parser.add_argument('-k', dest='selected', default=None,
+        help='run only the scenarios containing this in their names')
+    args = parser.parse_args(argv)
+
+    results = run(args.selected)
+
+    with open(args.output, 'w') as fh:
+        json.dump({
+            'pazgui': pazgui.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'results': results,
+        }, fh, indent=2)
+
+    print('Results are written into {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,61 @@
+"""
+Cost of writing frames with full repaints and differential updates.
+The output is written into a ``VirtualTerminal`` which counts bytes,
+escape sequences and printed characters, and the screens of both
+strategies are compared after every frame.
+
+Run with ``python -m benchmarks.bench_emission``.
+"""
+
+from pazgui.vt import VirtualTerminal
+
+from benchmarks.common import StyledGui
+from benchmarks.bench_suite import tree
+
+
+def bench_emission(differential, frames=20, count=1000):
+    """
+    A cell is changed in every frame of a tree of ``count`` boxes.
+
+    :arg bool differential: Only the changed cells are written.
+    :return tuple: Results per frame and the ``VirtualTerminal``
+    """
+
+    # Size of the terminal is not known until the gui is created.
+    vt = VirtualTerminal(0, 0)
+    gui = StyledGui(tree(count), stream=vt,
+        config={ 'differential-update': differential })
+    vt.width, vt.height = gui.width, gui.height
+    vt.reset()
+
+    gui.draw()
+    gui.update()
+    # The first frame is not counted.
+    start = (vt.bytes, vt.sequences, vt.printed)
+
+    # Rows are wrapped, the last ones are on top.
+    root = gui.child(0)
+    cell = root.child(root.children_count() - 1).child(0)
+    for i in range(frames):
+        cell.set_text('cell{}'.format(i % 10))
+        gui._process_events()
+        gui.draw()
+        gui.update()
+
+    return {
+        'bytes_per_frame': (vt.bytes - start[0]) / frames,
+        'sequences_per_frame': (vt.sequences - start[1]) / frames,
+        'printed_per_frame': (vt.printed - start[2]) / frames,
+    }, vt
+
+
+if __name__ == '__main__':
+    full, full_vt = bench_emission(False)
+    diff, diff_vt = bench_emission(True)
+
+    assert full_vt.cells() == diff_vt.cells()
+
+    for name, result in [ ('full', full), ('differential', diff) ]:
+        print('{:<14} {:>10.0f} bytes {:>8.0f} sequences {:>8.0f} chars'
+            ' per frame'.format(name, result['bytes_per_frame'],
+                result['sequences_per_frame'], result['printed_per_frame']))
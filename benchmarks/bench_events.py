@@ -0,0 +1,109 @@
+"""
+Creates and dispatches 1M events.
+
+Run with ``python -m benchmarks.bench_events``.
+"""
+
+import tracemalloc
+
+from pazgui import gui as pg
+from pazgui import behavior as pb
+
+from benchmarks.common import headless_gui, measure, report
+
+
+EVENT_COUNT = 1000000
+
+
+class Leaf(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1, 1),
+    }
+
+
+class Tree(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        return [ Leaf ] * 4
+
+
+def bench_events_create(number=EVENT_COUNT):
+    def run():
+        ev = pg.PazEvent('a', source='KBD')
+        ev.isprintable()
+
+    return measure(run, number, repeat=1)
+
+
+def bench_events_dispatch(number=EVENT_COUNT):
+    gui = headless_gui(Tree)
+    box = gui.child(0)
+
+    def run():
+        ev = pg.PazEvent('KEY_F5', source=box, target=box)
+        gui.propagate_event(ev)
+
+    return measure(run, number, repeat=1)
+
+
+class Subscriber(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1, 1),
+    }
+
+    # A named handler, ``event`` would receive every event and turn
+    # off the pruning by event name.
+    @pb.on('PING')
+    def ping(self, ev):
+        return True
+
+
+class Forest(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        return [ Tree ] * 2000 + [ Subscriber ]
+
+
+def bench_events_broadcast(number=1000):
+    """
+    Broadcasts an event with a single subscriber in a tree of 10k boxes.
+    """
+
+    gui = headless_gui(Forest)
+
+    def run():
+        gui.propagate_event(pg.PazEvent('PING'))
+
+    return measure(run, number, repeat=1)
+
+
+def bench_events_memory(number=100000):
+    """
+    Memory held by ``number`` queued events.
+    """
+
+    tracemalloc.start()
+    events = [ pg.PazEvent('a', source='KBD') for _ in range(number) ]
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'number': number,
+        'bytes_per_event': size / len(events),
+    }
+
+
+if __name__ == '__main__':
+    report({
+        'events_create': bench_events_create(),
+        'events_dispatch': bench_events_dispatch(),
+        'events_broadcast': bench_events_broadcast(),
+    })
+    print('{:.0f} bytes per event'.format(
+        bench_events_memory()['bytes_per_event']))
@@ -0,0 +1,79 @@
+"""
+Decodes a recorded input stream with ``blessed.Terminal.inkey`` and
+with ``InputDecoder``.
+
+Run with ``python -m benchmarks.bench_input``.
+"""
+
+import io
+
+from blessed import Terminal
+
+from pazgui.decoder import InputDecoder
+
+from benchmarks.common import measure, report
+
+
+# Typing, navigation and editing keys as sent by a terminal.
+UNIT = (
+    'Hello wörld, this is pazgui.\r'.encode('utf-8')
+    + b'\x1b[A\x1b[A\x1b[B\x1b[C\x1b[D\x1b[5~\x1b[6~\x1b[3~\x7f\t'
+    + 'çğüşöı 日本語\r'.encode('utf-8')
+    + b'\x1bOP\x1b[H\x1b[F'
+)
+REPEAT = 200
+RECORDING = UNIT * REPEAT
+
+# Terminals deliver input in reads of a few bytes to a few kilobytes.
+CHUNK = 64
+
+
+def _chunks(data):
+    return [ data[i:i+CHUNK] for i in range(0, len(data), CHUNK) ]
+
+
+def decode_inkey(term, chunks):
+    keys = [ ]
+    for chunk in chunks:
+        term.ungetch(chunk.decode('utf-8'))
+        inp = term.inkey(timeout=0)
+        while inp:
+            keys.append(inp.name if inp.is_sequence else str(inp))
+            inp = term.inkey(timeout=0)
+
+    return keys
+
+
+def decode_decoder(decoder, chunks):
+    keys = [ ]
+    for chunk in chunks:
+        keys.extend(name for name, data in decoder.decode(chunk))
+    keys.extend(name for name, data in decoder.decode(b'', final=True))
+
+    return keys
+
+
+def bench_input_inkey(number=5):
+    term = Terminal(stream=io.StringIO())
+    # ``inkey`` resolves an incomplete sequence at the end of its
+    # buffer as single keys, so chunks end at key boundaries.
+    chunks = [ UNIT ] * REPEAT
+
+    return measure(lambda: decode_inkey(term, chunks), number)
+
+
+def bench_input_decoder(number=5):
+    term = Terminal(stream=io.StringIO())
+    decoder = InputDecoder(term)
+    chunks = _chunks(RECORDING)
+
+    return measure(lambda: decode_decoder(decoder, chunks), number)
+
+
+if __name__ == '__main__':
+    results = {
+        'input_inkey': bench_input_inkey(),
+        'input_decoder': bench_input_decoder(),
+    }
+    report(results)
+    print('{} bytes per run'.format(len(RECORDING)))
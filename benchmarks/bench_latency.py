@@ -0,0 +1,136 @@
+"""
+Key-to-screen latency while 1k scheduled events per second are queued,
+with the priority queue of ``PazGui`` and with a single FIFO queue as the
+baseline.
+
+Run with ``python -m benchmarks.bench_latency [--fifo]``.
+"""
+
+import sys
+import time
+
+from pazgui import gui as pg
+from pazgui import behavior as pb
+from pazgui import accessories as acc
+
+from benchmarks.common import StyledGui, headless_gui
+
+
+TICKER_COUNT = 1000
+# Seconds of application work done for each scheduled event.
+WORK = 0.0008
+
+
+class Ticker(pg.PazBox):
+    style = {
+        'rect': (0, 0, 6, 1),
+    }
+
+    def event(self, ev):
+        if ev.cmp('SCHEDULED'):
+            t = time.perf_counter() + WORK
+            while time.perf_counter() < t:
+                pass
+
+            self.set_text('{}'.format(time.monotonic() % 1000))
+            return True
+
+
+class Editor(pg.PazBox):
+    style = {
+        'rect': (0, 0, 40, 5),
+        'behavior': {
+            pb.PazTextArea: { },
+        },
+    }
+
+
+class FifoGui(StyledGui):
+    """
+    Baseline without priorities: events are handled in the order they
+    are queued, none of them is dropped and all of them are handled
+    before a frame is drawn.
+    """
+
+    def _event_priority(self, ev):
+        return self.PRIORITY_INPUT
+
+
+class Board(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        return [ Editor ] + [ Ticker ] * TICKER_COUNT
+
+
+def bench_latency(duration=3.0, rate=1000, key_interval=0.05, fifo=False):
+    """
+    Runs the main loop for ``duration`` seconds. Scheduled events are
+    queued at ``rate`` per second and a key is typed every
+    ``key_interval`` seconds. Latency of a key is the time from queueing
+    it until the frame showing it is printed.
+
+    :arg bool fifo: Use a single FIFO queue without capacity and event
+                    budget (see ``FifoGui``).
+    :return dict: Number of keys, mean and maximum latency in seconds.
+    """
+
+    if fifo:
+        gui = FifoGui(Board, stream=acc.TestOut(), config={
+            'event-capacity': None,
+            'event-budget': None,
+        })
+    else:
+        gui = headless_gui(Board)
+    board = gui.child(0)
+    editor = board.child(0)
+    tickers = board.child('all')[1:]
+    editor.activate()
+    while gui._process_events():
+        pass
+
+    latencies = [ ]
+    typed = 0
+    key_time = None
+    next_key = time.perf_counter()
+    produced = 0
+
+    start = time.perf_counter()
+    now = start
+    while now - start < duration:
+        due = int((now - start) * rate)
+        while produced < due:
+            ticker = tickers[produced % len(tickers)]
+            gui.event_queue(pg.PazEvent('SCHEDULED', ticker, target=ticker))
+            produced += 1
+
+        if key_time == None and now >= next_key:
+            gui.event_queue(pg.PazEvent('a', source='KBD'))
+            typed += 1
+            key_time = time.perf_counter()
+
+        if gui._process_events():
+            gui.draw()
+            gui.update()
+
+        now = time.perf_counter()
+        if key_time != None and editor.get_text().count('a') == typed:
+            latencies.append(now - key_time)
+            key_time = None
+            next_key = now + key_interval
+
+    return {
+        'number': len(latencies),
+        'mean': sum(latencies) / max(1, len(latencies)),
+        'max': max(latencies, default=0),
+    }
+
+
+if __name__ == '__main__':
+    fifo = '--fifo' in sys.argv[1:]
+    result = bench_latency(fifo=fifo)
+    print('{}{} keys: {:.1f} ms mean, {:.1f} ms max key-to-screen'.format(
+        'FIFO baseline, ' if fifo else '', result['number'],
+        result['mean'] * 1000, result['max'] * 1000))
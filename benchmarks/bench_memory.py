@@ -0,0 +1,87 @@
+"""
+Memory used by a tree of 50k boxes, which declare ``__slots__`` or not.
+
+Run with ``python -m benchmarks.bench_memory``.
+"""
+
+import gc
+import tracemalloc
+
+from pazgui import gui as pg
+
+from benchmarks.common import headless_gui
+
+
+BOX_COUNT = 50000
+
+
+def leaf_class(slotted):
+    """
+    :arg bool slotted: Leaves declare ``__slots__``, otherwise their own
+                       attribute is kept in a ``__dict__``.
+    :return PazBox: Leaf box class
+    """
+
+    def __init__(self, *args, **kwargs):
+        pg.PazBox.__init__(self, *args, **kwargs)
+        # State kept by the application on the box
+        self.value = 0
+
+    attrs = {
+        'text': 'leaf',
+        'style': {
+            'rect': (0, 0, 4, 1),
+            'background': '.',
+        },
+        '__init__': __init__,
+    }
+    if slotted:
+        attrs['__slots__'] = ( 'value', )
+
+    return type('Leaf', (pg.PazBox, ), attrs)
+
+
+def tree(leaf_cls, count):
+    class Tree(pg.PazBox):
+        style = {
+            'rect': (0, 0, 1.0, 1.0),
+        }
+
+        def children(self):
+            return [ leaf_cls ] * count
+
+    return Tree
+
+
+def bench_memory_boxes(count=BOX_COUNT, slotted=False):
+    """
+    :arg int count: Number of leaves
+    :arg bool slotted: Leaves declare ``__slots__``
+    """
+
+    root = tree(leaf_class(slotted), count)
+
+    gc.collect()
+    tracemalloc.start()
+    gui = headless_gui(root)
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert gui.child(0).children_count() == count
+
+    return {
+        'number': count,
+        'bytes': size,
+        'peak_bytes': peak,
+        'bytes_per_box': size / count,
+    }
+
+
+if __name__ == '__main__':
+    for slotted in (False, True):
+        result = bench_memory_boxes(slotted=slotted)
+        print('{} {} boxes: {:.1f} MB, {:.0f} bytes per box'
+            ' (peak {:.1f} MB)'.format(result['number'],
+                'slotted' if slotted else 'unslotted', result['bytes'] / 1e6,
+                result['bytes_per_box'], result['peak_bytes'] / 1e6))
@@ -0,0 +1,82 @@
+"""
+Full screen redraw of a grid of boxes with borders and text.
+
+Run with ``python -m benchmarks.bench_redraw``, add ``--profile`` to
+print the functions taking the most time.
+"""
+
+import sys
+import cProfile
+import pstats
+
+from pazgui import gui as pg
+
+from benchmarks.common import headless_gui, measure, placed, report
+
+
+COLUMNS = 8
+ROWS = 6
+
+
+class Cell(pg.PazBox):
+    text = 'cell'
+    style = {
+        'rect': (0, 0, 10, 4),
+        'border': True,
+        'background': '.',
+    }
+
+
+class Row(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 4),
+    }
+
+    def children(self):
+        return [ placed(Cell, 10 * i, 0) for i in range(COLUMNS) ]
+
+
+class Grid(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        return [ placed(Row, 0, 4 * j) for j in range(ROWS) ]
+
+
+def _grid_gui():
+    return headless_gui(Grid)
+
+
+def bench_redraw_full(number=50):
+    gui = _grid_gui()
+
+    def run():
+        gui.draw_flag('all', 1, propagate=True)
+        gui.draw()
+
+    return measure(run, number)
+
+
+def profile_redraw_full(number=50, limit=15):
+    gui = _grid_gui()
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(number):
+        gui.draw_flag('all', 1, propagate=True)
+        gui.draw()
+    profiler.disable()
+
+    stats = pstats.Stats(profiler, stream=sys.stdout)
+    stats.sort_stats('tottime').print_stats(limit)
+
+
+if __name__ == '__main__':
+    if '--profile' in sys.argv:
+        profile_redraw_full()
+    else:
+        report({
+            'redraw_full': bench_redraw_full(),
+        })
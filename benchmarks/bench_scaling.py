@@ -0,0 +1,74 @@
+"""
+Startup time, draw time and memory versus box count of generated trees
+(see :mod:`pazgui.generator`).
+
+Run with ``python -m benchmarks.bench_scaling``.
+"""
+
+import gc
+import time
+import tracemalloc
+
+from pazgui import generator
+
+from benchmarks.common import headless_gui
+
+
+# (depth, fanout) of the measured trees
+SHAPES = [ (2, 4), (3, 4), (4, 4), (5, 4), (3, 10), (4, 8) ]
+
+
+def bench_scaling(depth, fanout, seed=0, number=5):
+    """
+    :arg int depth: Depth of the tree
+    :arg int fanout: Number of children of every box with children
+    :arg int seed: Seed of the generator
+    :arg int number: Number of measured full frames
+    :return dict: Box count, startup and draw seconds, and bytes
+    """
+
+    root = generator.generate(seed=seed, depth=depth, fanout=fanout)
+
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    gui = headless_gui(root)
+    startup = time.perf_counter() - t0
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    gui.draw()
+    gui.update()
+
+    best = None
+    for _ in range(number):
+        with gui.batch():
+            gui.draw_flag('all', 1, propagate=True)
+
+        t0 = time.perf_counter()
+        gui.draw()
+        gui.update()
+        dt = time.perf_counter() - t0
+
+        if best == None or dt < best:
+            best = dt
+
+    return {
+        'boxes': generator.tree_size(depth, fanout),
+        'startup_seconds': startup,
+        'draw_seconds': best,
+        'bytes': size,
+        'peak_bytes': peak,
+    }
+
+
+if __name__ == '__main__':
+    print('{:>8} {:>12} {:>12} {:>10} {:>12}'.format(
+        'boxes', 'startup ms', 'draw ms', 'MB', 'bytes/box'))
+    for depth, fanout in SHAPES:
+        result = bench_scaling(depth, fanout)
+        print('{:>8} {:>12.1f} {:>12.2f} {:>10.1f} {:>12.0f}'.format(
+            result['boxes'], result['startup_seconds'] * 1e3,
+            result['draw_seconds'] * 1e3, result['bytes'] / 1e6,
+            result['bytes'] / result['boxes']))
@@ -0,0 +1,207 @@
+"""
+Rendering and event throughput scenarios tracked across releases.
+
+Run with ``python -m benchmarks``, results are written into a JSON
+file (see ``benchmarks/__main__.py``).
+"""
+
+from pazgui import gui as pg
+
+from benchmarks.common import headless_gui, measure, placed
+from benchmarks.bench_events import bench_events_dispatch, \
+    bench_events_broadcast
+
+
+COLUMNS = 10
+# Rows are wrapped on the 80x24 headless terminal.
+SCREEN_ROWS = 24
+
+
+class Cell(pg.PazBox):
+    text = 'cell'
+    style = {
+        'rect': (0, 0, 8, 1),
+        'background': '.',
+        'background-style': 'black_on_white',
+    }
+
+
+class OddCell(Cell):
+    style = dict(Cell.style, **{ 'background-style': 'white_on_blue' })
+
+
+class Row(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1),
+    }
+
+
+def tree(count):
+    """
+    Rows of ``COLUMNS`` cells, about ``count`` boxes in total.
+
+    :arg int count: Number of boxes
+    :return PazBox: Root box class
+    """
+
+    # Styles alternate, so frames have escape sequences.
+    cells = [ placed((Cell, OddCell)[i % 2], 8 * i, 0)
+        for i in range(COLUMNS) ]
+    rows = [ ]
+    for j in range(SCREEN_ROWS):
+        row = placed(Row, 0, j)
+        row.children = lambda self: cells
+        rows.append(row)
+
+    row_count = max(1, count // (COLUMNS + 1))
+
+    class Tree(pg.PazBox):
+        style = {
+            'rect': (0, 0, 1.0, 1.0),
+        }
+
+        def children(self):
+            return [ rows[j % SCREEN_ROWS] for j in range(row_count) ]
+
+    return Tree
+
+
+def _frame(gui):
+    gui.draw()
+    gui.update()
+
+
+def _config(differential):
+    return { 'differential-update': differential }
+
+
+def bench_render(count, number=10, differential=False):
+    """
+    Full frame, every box is drawn and the frame is emitted.
+    """
+
+    gui = headless_gui(tree(count), config=_config(differential))
+
+    def run():
+        with gui.batch():
+            gui.draw_flag('all', 1, propagate=True)
+        _frame(gui)
+
+    return measure(run, number, stream=gui._term.stream)
+
+
+def bench_update_cell(number=50, differential=False):
+    """
+    A single cell is changed in a tree of 1k boxes.
+    """
+
+    gui = headless_gui(tree(1000), config=_config(differential))
+    _frame(gui)
+    # Rows are wrapped, the last ones are on top.
+    root = gui.child(0)
+    cell = root.child(root.children_count() - 1).child(0)
+    texts = [ 'cell', 'CELL' ]
+
+    def run():
+        texts.reverse()
+        cell.set_text(texts[0])
+        _frame(gui)
+
+    return measure(run, number, stream=gui._term.stream)
+
+
+class History(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+
+def bench_text_append(number=50, lines=10000, differential=False):
+    """
+    A line is appended to a text of ``lines`` lines.
+    """
+
+    gui = headless_gui(History, config=_config(differential))
+    box = gui.child(0)
+    box.set_text('\n'.join('line {}'.format(i) for i in range(lines)))
+    _frame(gui)
+
+    def run():
+        box.set_text('{}\nMe: hello'.format(box.get_text()))
+        _frame(gui)
+
+    return measure(run, number, stream=gui._term.stream)
+
+
+def bench_resize(number=10, differential=False):
+    """
+    Terminal resize of a tree of 1k boxes.
+    """
+
+    gui = headless_gui(tree(1000), config=_config(differential))
+    _frame(gui)
+
+    def run():
+        gui.event_queue(pg.PazEvent('SIGWINCH', source='SYS', target=gui))
+        gui._process_events()
+        _frame(gui)
+
+    return measure(run, number, stream=gui._term.stream)
+
+
+def bench_box_at(number=1000):
+    """
+    Finding the topmost box at a terminal position in a tree of 1k
+    boxes.
+    """
+
+    gui = headless_gui(tree(1000))
+    _frame(gui)
+    # The index is built by the first query.
+    gui.box_at(0, 0)
+    points = [ ((k * 7) % gui.width, (k * 3) % gui.height)
+        for k in range(number) ]
+    it = iter(points * 3)
+
+    def run():
+        gui.box_at(*next(it))
+
+    return measure(run, number)
+
+
+def bench_startup(number=5):
+    """
+    Creating a gui of 1k boxes and emitting the first frame.
+    """
+
+    def run():
+        _frame(headless_gui(tree(1000)))
+
+    return measure(run, number)
+
+
+def suite():
+    """
+    :return dict: Scenario functions by name, they return the results
+                  of :func:`benchmarks.common.measure`.
+    """
+
+    return {
+        'render_100': lambda: bench_render(100, number=20),
+        'render_1k': lambda: bench_render(1000, number=10),
+        'render_10k': lambda: bench_render(10000, number=3),
+        'render_1k_differential':
+            lambda: bench_render(1000, number=10, differential=True),
+        'update_cell': bench_update_cell,
+        'update_cell_differential':
+            lambda: bench_update_cell(differential=True),
+        'text_append': bench_text_append,
+        'text_append_differential':
+            lambda: bench_text_append(differential=True),
+        'events_dispatch': lambda: bench_events_dispatch(100000),
+        'events_broadcast': lambda: bench_events_broadcast(200),
+        'resize': bench_resize,
+        'resize_differential': lambda: bench_resize(differential=True),
+        'box_at': bench_box_at,
+        'startup': bench_startup,
+    }
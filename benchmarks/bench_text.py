@@ -0,0 +1,63 @@
+"""
+Compares the markup and the span paths of ``PazText``.
+
+Run with ``python -m benchmarks.bench_text``.
+"""
+
+from pazgui import gui as pg
+
+from benchmarks.common import headless_gui, measure, report
+
+
+class StatusBar(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1),
+    }
+
+
+SPANS = [
+    ('12:00:01', 'green'), (' | ', None), ('cpu 42%', 'red'),
+    (' | ', None), ('mem 1.2G', 'yellow'), (' | ', None),
+    ('<ready>', 'black_on_white'),
+]
+
+
+def _markup(spans):
+    text = ''
+    for t, s in spans:
+        t = t.replace('<', '\x01').replace('>', '\x02').replace('&', '\x03')
+        if s:
+            text += '<t s="{}">{}</t>'.format(s, t)
+        else:
+            text += t
+
+    return text
+
+
+def bench_text_markup(number=5000):
+    gui = headless_gui(StatusBar)
+    box = gui.child(0)
+
+    def run():
+        box.set_text(_markup(SPANS))
+        box._text.parse()
+
+    return measure(run, number)
+
+
+def bench_text_spans(number=5000):
+    gui = headless_gui(StatusBar)
+    box = gui.child(0)
+
+    def run():
+        box.set_spans(SPANS)
+        box._text.parse()
+
+    return measure(run, number)
+
+
+if __name__ == '__main__':
+    report({
+        'text_markup': bench_text_markup(),
+        'text_spans': bench_text_spans(),
+    })
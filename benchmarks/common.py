@@ -0,0 +1,94 @@
+import time
+
+from blessed import Terminal
+
+from pazgui import gui as pg
+from pazgui import accessories as acc
+
+
+class StyledGui(pg.PazGui):
+    """
+    Writes escape sequences of xterm into the stream, which is not a
+    terminal.
+    """
+
+    def _create_terminal(self, stream):
+        return Terminal(kind='xterm-256color', stream=stream,
+            force_styling=True)
+
+
+def headless_gui(box_cls, **kwargs):
+    """
+    Create a ``StyledGui`` which writes into a :class:`TestOut` stream
+    instead of a terminal, so the bytes of the frames can be counted.
+    """
+
+    return StyledGui(box_cls, stream=acc.TestOut(), **kwargs)
+
+
+def placed(cls, x, y):
+    """
+    Subclass of ``cls`` placed at (``x``, ``y``) in its parent.
+    """
+
+    style = dict(cls.style)
+    rect = style['rect']
+    style['rect'] = (x, y, rect[2], rect[3])
+
+    return type(cls.__name__, (cls, ), { 'style': style })
+
+
+def measure(fcn, number=1000, repeat=3, stream=None):
+    """
+    Run ``fcn`` ``number`` times for ``repeat`` rounds and keep
+    the fastest round.
+
+    :arg callable fcn: Function to be measured.
+    :arg int number: Calls per round.
+    :arg int repeat: Number of rounds.
+    :arg TestOut stream: Output stream of the gui, bytes written into it
+                         are counted if it is given.
+
+    :return dict: Number of calls, seconds, operations per second and
+                  bytes emitted per call.
+    """
+
+    best = None
+    emitted = None
+    for _ in range(repeat):
+        if stream != None:
+            start = stream.tell()
+
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fcn()
+        dt = time.perf_counter() - t0
+
+        if stream != None:
+            written = stream.getvalue()[start:]
+            emitted = len(written.encode('utf-8')) / number
+            # Output is not kept between rounds.
+            stream.seek(0)
+            stream.truncate()
+
+        if best == None or dt < best:
+            best = dt
+
+    result = {
+        'number': number,
+        'seconds': best,
+        'ops_per_s': number / best if best > 0 else float('inf'),
+    }
+    if emitted != None:
+        result['bytes_per_op'] = emitted
+
+    return result
+
+
+def report(results):
+    for name in results:
+        result = results[name]
+        line = '{:<40} {:>14.1f} ops/s'.format(name, result['ops_per_s'])
+        if 'bytes_per_op' in result:
+            line += ' {:>12.0f} bytes/op'.format(result['bytes_per_op'])
+        print(line)
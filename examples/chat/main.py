@@ -27,6 +27,26 @@ class MainBox(pg.PazBox):
         super(MainBox, self).__init__(*args, **kwargs)
 
     def children(self):
+        HEIGHT = 2
+        class Contact(pg.PazBox):
+            style = {
+                'background-style:active': 'on_green',
+                'background-style': 'on_blue',
+                'behavior': {
+                    pb.PazButton: { },
+                },
+            }
+
+            @pb.on('PRESSED')
+            def pressed(self, ev):
+                ev = pg.PazEvent(
+                    'NEW_CHAT', self,
+                    '/root/main/main-container/chat-history',
+                    data={ 'contact-name': self.get_text() }
+                )
+                self.event_queue(ev)
+                return True
+
         class SideBar(pg.PazBox):
             name = "sidebar"
             style = {
@@ -34,50 +54,16 @@ class MainBox(pg.PazBox):
                 'stretch-ratio': 0.2,
                 'border': True,
                 'border-style:active': 'gray',
+                'behavior': {
+                    # Only visible contacts have a ``Contact`` box.
+                    pb.PazList: {
+                        'source': self.contacts,
+                        'row': Contact,
+                        'row-height': HEIGHT,
+                    },
+                },
             }
 
-            def __init__(self, *args, **kwargs):
-                super(SideBar, self).__init__(*args, **kwargs)
-
-                i = 0
-                for child in self.child('all'):
-                    child.set_text('{}'.format(
-                        self._parent.contacts[i]
-                    ))
-                    i += 1
-
-            def children(self):
-                HEIGHT = 2
-                class Contact(pg.PazBox):
-                    class ListBehavior(pb.PazBehavior):
-                        def pre_create(self, params=None):
-                            sibling_count = self._ctx.sibling_count()
-                            rect = list(self._ctx.get_style('rect'))
-                            rect[1] = HEIGHT * sibling_count
-                            self._ctx.set_style('original-rect', tuple(rect))
-
-                    style = {
-                        'rect': (0, 0, 1.0, HEIGHT),
-                        'background-style:active': 'on_green',
-                        'background-style': 'on_blue',
-                        'behavior': {
-                            ListBehavior: { },
-                            pb.PazButton: { },
-                        },
-                    }
-
-                    def event(self, ev):
-                        if ev.cmp('PRESSED'):
-                            ev = pg.PazEvent(
-                                'NEW_CHAT', self,
-                                '/root/main/main-container/chat-history',
-                                data={ 'contact-name': self.get_text() }
-                            )
-                            self.event_queue(ev)
-                            return True
-
-                return [ Contact ] * len(self._parent.contacts)
-
         class MainContainer(pg.PazBox):
             name = "main-container"
             style = {
@@ -103,17 +89,19 @@ class MainBox(pg.PazBox):
                         'border-style:active': 'gray',
                     }
 
-                    def event(self, ev):
-                        if ev.cmp('NEW_CHAT'):
-                            contact_name = ev.get('contact-name')
-                            if contact_name:
-                                self.get_behavior(pb.PazPanel).attr('text', contact_name)
-                            return True
-                        elif ev.cmp('NEW_MESSAGE'):
-                            message = ev.get('message')
-                            text = self.get_text()
-                            self.set_text('{}\nMe: {}'.format(text, message))
-                            return True
+                    @pb.on('NEW_CHAT')
+                    def new_chat(self, ev):
+                        contact_name = ev.get('contact-name')
+                        if contact_name:
+                            self.get_behavior(pb.PazPanel).attr('text', contact_name)
+                        return True
+
+                    @pb.on('NEW_MESSAGE')
+                    def new_message(self, ev):
+                        message = ev.get('message')
+                        text = self.get_text()
+                        self.set_text('{}\nMe: {}'.format(text, message))
+                        return True
 
                 class ChatInput(pg.PazBox):
                     class FilteredTextArea(pb.PazTextArea):
@@ -123,16 +111,16 @@ class MainBox(pg.PazBox):
                             self._filter_key += [ 'KEY_ENTER' ]
 
                     class SendOnEnterKey(pb.PazBehavior):
-                        def pre_event(self, params):
-                            if params['ev'].cmp('KEY_ENTER'):
-                                ev = pg.PazEvent(
-                                    'NEW_MESSAGE', self._ctx,
-                                    '/root/main/main-container/chat-history',
-                                    data={ 'message': self._ctx.get_text() }
-                                )
-                                self._ctx.event_queue(ev)
-                                self._ctx.clear_text()
-                                return True
+                        @pb.on('KEY_ENTER')
+                        def send(self, ev):
+                            ev = pg.PazEvent(
+                                'NEW_MESSAGE', self._ctx,
+                                '/root/main/main-container/chat-history',
+                                data={ 'message': self._ctx.get_text() }
+                            )
+                            self._ctx.event_queue(ev)
+                            self._ctx.clear_text()
+                            return True
 
                     name = "chat-input"
                     style = {
@@ -217,27 +205,27 @@ class LoginBox(pg.PazBox):
                         'border': True,
                     }
 
-                    def event(self, ev):
-                        if ev.cmp('PRESSED'):
-                            login_box = self.follow_path('/root/login-box')
-                            username = self.follow_path(
-                                '/root/login-box/login-container/username'
-                            )
+                    @pb.on('PRESSED')
+                    def pressed(self, ev):
+                        login_box = self.follow_path('/root/login-box')
+                        username = self.follow_path(
+                            '/root/login-box/login-container/username'
+                        )
 
-                            root = self.follow_path('/root')
-                            main_box = MainBox(
-                                self._buffer, root,
-                                username = username.get_text().strip(),
-                                contacts = [ 'Good', 'Bad', 'Ugly' ],
-                            )
+                        root = self.follow_path('/root')
+                        main_box = MainBox(
+                            self._buffer, root,
+                            username = username.get_text().strip(),
+                            contacts = [ 'Good', 'Bad', 'Ugly' ],
+                        )
 
-                            #root.gui_resize(propagate=False)
-                            root.remove_child(root.child(0))
+                        #root.gui_resize(propagate=False)
+                        root.remove_child(root.child(0))
 
-                            root.add_child(main_box)
-                            root.gui_resize()
+                        root.add_child(main_box)
+                        root.gui_resize()
 
-                            main_box.activate()
+                        main_box.activate()
 
                 return [ Username, Password, Submit ]
 
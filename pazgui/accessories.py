@@ -1,34 +1,57 @@
 import os
 import io
+import json
 import logging
 from collections.abc import MutableMapping
+import collections
 import weakref
 
 
 LOGGER = 'pazgui-app'
+# Handler installed by the last ``init_logger`` call.
+_log_handler = None
 
 
 def logger():
     return logging.getLogger(LOGGER)
 
 
+class JSONFormatter(logging.Formatter):
+    """
+    Escapes the message which is placed in a JSON string by the format.
+    """
+
+    def formatMessage(self, record):
+        record.message = json.dumps(record.message)[1:-1]
+
+        return super().formatMessage(record)
+
+
 def init_logger(name, level=logging.INFO):
+    global _log_handler
+
     logger = logging.getLogger(LOGGER)
     logger.setLevel(level)
 
-    formatter = logging.Formatter((
+    formatter = JSONFormatter((
         '{"unix_time":%(created)s, "time":"%(asctime)s", "module":"%(name)s",'
         ' "line_no":%(lineno)s, "level":"%(levelname)s", "msg":"%(message)s"},'
     ))
 
+    # Handler of the previous gui is replaced, the ones added by the
+    # application are kept.
+    if _log_handler != None:
+        logger.removeHandler(_log_handler)
+        _log_handler.close()
+
     log_filename = os.path.splitext(name)[0] + '.log'
-    fh = open(log_filename, 'a')
 
-    ch = logging.StreamHandler(fh)
+    ch = logging.FileHandler(log_filename, 'a')
     ch.setFormatter(formatter)
 
     ch.setLevel(level)
     logger.addHandler(ch)
+    _log_handler = ch
 
     logger.info('Logger started.')
 
@@ -154,3 +177,157 @@ class StyleDict(DeepDict):
             for _key in del_keys:
                 del self.store[_key]
 
+
+
+class GridIndex(object):
+    """
+    Uniform grid over rectangles given as (x1, y1, x2, y2). Every grid
+    cell keeps the rectangles which overlap it, so a point query only
+    checks the rectangles of one cell.
+
+    Rectangles inserted later are considered to be above the earlier
+    ones.
+    """
+
+    def __init__(self, cell_size=(8, 4)):
+        self._cell_size = cell_size
+        self._cells = dict()
+        self._items = list()
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        self._cells.clear()
+        self._items.clear()
+
+    def insert(self, area, item):
+        """
+        :arg tuple area: Rectangle (x1, y1, x2, y2), (x2, y2) excluded
+        :arg object item: Object returned by the queries
+        """
+
+        if area[0] >= area[2] or area[1] >= area[3]:
+            return
+
+        ind = len(self._items)
+        self._items.append((area, item))
+
+        cw, ch = self._cell_size
+        for cy in range(area[1] // ch, (area[3] - 1) // ch + 1):
+            for cx in range(area[0] // cw, (area[2] - 1) // cw + 1):
+                cell = self._cells.get((cx, cy))
+                if cell == None:
+                    cell = self._cells[(cx, cy)] = list()
+                cell.append(ind)
+
+    def at(self, x, y):
+        """
+        Returns the topmost item whose rectangle contains (`x`, `y`).
+        """
+
+        cw, ch = self._cell_size
+        cell = self._cells.get((x // cw, y // ch))
+        if cell == None:
+            return None
+
+        for ind in reversed(cell):
+            area, item = self._items[ind]
+            if area[0] <= x < area[2] and area[1] <= y < area[3]:
+                return item
+
+        return None
+
+    def within(self, rect):
+        """
+        Returns items whose rectangles intersect `rect` in
+        insertion order.
+        """
+
+        cw, ch = self._cell_size
+        found = set()
+        for cy in range(rect[1] // ch, (rect[3] - 1) // ch + 1):
+            for cx in range(rect[0] // cw, (rect[2] - 1) // cw + 1):
+                cell = self._cells.get((cx, cy))
+                if cell != None:
+                    found.update(cell)
+
+        items = list()
+        for ind in sorted(found):
+            area, item = self._items[ind]
+            if area[0] < rect[2] and rect[0] < area[2] \
+                and area[1] < rect[3] and rect[1] < area[3]:
+                items.append(item)
+
+        return items
+
+
+class EventQueue(object):
+    """
+    Queue with priority classes. An item is dequeued only when the
+    classes of higher priority are empty, items of a class are dequeued
+    in the order they are queued.
+
+    Items dropped or merged because of the capacity are counted by
+    name in ``dropped`` and ``merged``.
+    """
+
+    def __init__(self, priorities, capacity=None):
+        """
+        :arg int priorities: Number of priority classes, ``0`` is the
+                             highest priority.
+        :arg int capacity: Maximum number of items in each class,
+                           ``None`` for no limit.
+        """
+
+        self._queues = [ collections.deque() for _ in range(priorities) ]
+        self.capacity = capacity
+        self.dropped = collections.Counter()
+        self.merged = collections.Counter()
+
+    def __len__(self):
+        return sum(len(q) for q in self._queues)
+
+    def __iter__(self):
+        """
+        Iterates items in the order they are dequeued.
+        """
+
+        for q in self._queues:
+            yield from q
+
+    def queue(self, priority):
+        """
+        :arg int priority: Priority class
+        :return collections.deque: Items of the class
+        """
+
+        return self._queues[priority]
+
+    def push(self, item, priority):
+        self._queues[priority].append(item)
+
+    def full(self, priority):
+        """
+        :arg int priority: Priority class
+        :return bool: ``True`` if the class has ``capacity`` items.
+        """
+
+        return self.capacity != None \
+            and len(self._queues[priority]) >= self.capacity
+
+    def pop(self):
+        """
+        :return object: First item of the highest priority class, or
+                        ``None`` if the queue is empty.
+        """
+
+        for q in self._queues:
+            if q:
+                return q.popleft()
+
+        return None
+
+    def clear(self):
+        for q in self._queues:
+            q.clear()
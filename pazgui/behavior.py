@@ -1,3 +1,5 @@
+import functools
+
 from pazgui.accessories import new_weakref
 
 """
@@ -6,7 +8,87 @@ Decorators
 
 """
 
+# Name subscribing a handler to every event.
+ALL_EVENTS = '*'
+
+# Styles holding event names of handlers, handlers of a box are updated
+# when one of them is set.
+handler_styles = set()
+
+def on(*names, after=False):
+    """
+    Subscribes the decorated method to events by their names. A box
+    invokes only the handlers subscribed to the name of an event and
+    events are not propagated into boxes without a subscriber.
+
+    Handlers are called with the event and return ``True`` if they
+    handle it. Handlers of behaviors run before the handlers of their
+    box, or after them if ``after`` is ``True``.
+
+    :arg str_or_callable names: Event names ('PRESSED', 'KEY_ENTER',
+                                etc.), ``ALL_EVENTS`` or callables
+                                returning the name for an instance.
+    :arg bool after: Run after the handlers of the box.
+    """
+
+    def decorator(func):
+        func._event_names = names
+        func._event_after = after
+
+        return func
+
+    return decorator
+
+def style_key(name):
+    """
+    Event name read from a style of the box of a behavior, to be used
+    with :func:`on`.
+
+    :arg str name: Style name ('scroll-up-key', etc.)
+    :return callable: Returns the style value for a behavior.
+    """
+
+    handler_styles.add(name)
+
+    def resolve(bhv):
+        return bhv._ctx.get_style(name)
+
+    return resolve
+
+def collect_handlers(cls, base=None, hooks={ }):
+    """
+    Collects the methods of a class decorated with :func:`on`.
+
+    :arg type cls: ``PazBox`` or ``PazBehavior`` based class
+    :arg type base: Handlers of this class and its bases are skipped.
+    :arg dict hooks: Methods subscribed to all events if they are
+                     overridden without :func:`on`, mapped to their
+                     ``after`` value.
+    :return tuple: Tuples of (method name, names, after, hook)
+    """
+
+    skipped = set(base.__mro__) if base != None else set()
+    handlers = { }
+
+    for klass in reversed(cls.__mro__):
+        if klass in skipped:
+            continue
+
+        for attr, value in vars(klass).items():
+            if hasattr(value, '_event_names'):
+                handlers[attr] = (
+                    attr, value._event_names, value._event_after, False
+                )
+            elif attr in hooks and callable(value):
+                handlers[attr] = (attr, (ALL_EVENTS, ), hooks[attr], True)
+            elif attr in handlers:
+                # Overridden by a method which is not a handler.
+                del handlers[attr]
+
+    return tuple(handlers.values())
+
 def when_active(func):
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         if args[0]._ctx.get_style('active'):
             return func(*args, **kwargs)
@@ -14,6 +96,7 @@ def when_active(func):
     return wrapper
 
 def disable_scroll(func):
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         args[0]._ctx.set_style('scroll-x', False)
         args[0]._ctx.set_style('scroll-y', False)
@@ -29,6 +112,8 @@ Box behaviors
 """
 
 class PazBehavior(object):
+    __slots__ = ( '_ctx', '_attributes' )
+
     def __init__(self, ctx, attr={ }):
         self._attributes = { }
         if attr:
@@ -36,7 +121,30 @@ class PazBehavior(object):
                 self._attributes[a] = attr[a]
 
         self._ctx = new_weakref(ctx)
-        self._activate_key = self._ctx.get_style('activate-key')
+
+    @classmethod
+    def event_handlers(cls):
+        """
+        Event handlers of the behavior class, see :func:`collect_handlers`.
+        Every box has a ``PazBehavior`` instance, so subclasses don't
+        repeat its handlers. ``pre_event`` and ``post_event`` overridden
+        without :func:`on` are called with ``{ 'ev': ev }`` for all
+        events.
+
+        :return tuple: Handlers
+        """
+
+        handlers = cls.__dict__.get('_event_handlers')
+        if handlers == None:
+            if cls is PazBehavior:
+                handlers = collect_handlers(cls)
+            else:
+                handlers = collect_handlers(cls, PazBehavior, {
+                    'pre_event': False, 'post_event': True,
+                })
+            cls._event_handlers = handlers
+
+        return handlers
 
     def mood(self, m=None):
         return self._mood
@@ -81,41 +189,66 @@ class PazBehavior(object):
     def post_create(self, params=None):
         pass
 
+    def post_children(self, params=None):
+        pass
+
     def pre_resize(self, params=None):
         pass
 
     def post_resize(self, params=None):
         pass
 
+    def pre_scroll(self, params=None):
+        pass
+
+    def post_scroll(self, params=None):
+        pass
+
     def pre_event(self, params):
-        ev = params['ev']
+        pass
 
-        if ev.cmp(self._activate_key):
-            self._ctx.activate()
-            return True
+    def post_event(self, params):
+        pass
+
+    @on(style_key('activate-key'))
+    def _activate(self, ev):
+        self._ctx.activate()
+        return True
 
+    @on(style_key('scroll-up-key'), after=True)
     @when_active
-    def post_event(self, params):
-        ev = params['ev']
+    def _scroll_up(self, ev):
+        self._ctx.scroll((0, -1))
+        return True
 
-        if ev.cmp(self._ctx.get_style('scroll-up-key')):
-            self._ctx.scroll((0, -1))
-            return True
-        elif ev.cmp(self._ctx.get_style('scroll-down-key')):
-            self._ctx.scroll((0, 1))
-            return True
-        elif ev.cmp(self._ctx.get_style('deactivate-key')):
-            self._ctx.deactivate()
-            return True
-        elif ev.cmp(self._ctx.get_style('navigate-forwards')):
-            self._ctx.activate_sibling()
-            return True
-        elif ev.cmp(self._ctx.get_style('navigate-backwards')):
-            self._ctx.activate_sibling(backwards=True)
-            return True
+    @on(style_key('scroll-down-key'), after=True)
+    @when_active
+    def _scroll_down(self, ev):
+        self._ctx.scroll((0, 1))
+        return True
+
+    @on(style_key('deactivate-key'), after=True)
+    @when_active
+    def _deactivate(self, ev):
+        self._ctx.deactivate()
+        return True
+
+    @on(style_key('navigate-forwards'), after=True)
+    @when_active
+    def _navigate_forwards(self, ev):
+        self._ctx.activate_sibling()
+        return True
+
+    @on(style_key('navigate-backwards'), after=True)
+    @when_active
+    def _navigate_backwards(self, ev):
+        self._ctx.activate_sibling(backwards=True)
+        return True
 
 
 class PazLabeled(PazBehavior):
+    __slots__ = ( '_draw_on', '_label_area' )
+
     def __init__(self, *args, **kwargs):
         """
         Adds a label onto a given position.
@@ -188,6 +321,8 @@ class PazLabeled(PazBehavior):
 
 
 class PazCheckbox(PazLabeled):
+    __slots__ = ( '_check_format', '_check_mark', '_check_unmark' )
+
     def __init__(self, *args, **kwargs):
         self._check_mark = 'x'
         self._check_unmark = ' '
@@ -244,15 +379,17 @@ class PazCheckbox(PazLabeled):
             'margin', (margin[0], margin[1], margin[2], left_margin)
         )
 
+    @on(' ', after=True)
     @when_active
-    def post_event(self, params):
-        if params['ev'].cmp(' '):
-            self._toggle()
-            self._ctx.draw_flag('all', 1)
-            return True
+    def _check(self, ev):
+        self._toggle()
+        self._ctx.draw_flag('all', 1)
+        return True
 
 
 class PazPanel(PazLabeled):
+    __slots__ = ( )
+
     def __init__(self, *args, **kwargs):
         attributes = kwargs['attr']
         attributes['draw-on'] = 'border'
@@ -265,6 +402,8 @@ class PazPanel(PazLabeled):
 
 
 class PazHBox(PazBehavior):
+    __slots__ = ( '_dir', '_next_child_rect_start', '_rect', '_spacing' )
+
     HORIZONTAL=0
     VERTICAL=1
     def __init__(self, *args, **kwargs):
@@ -288,6 +427,17 @@ class PazHBox(PazBehavior):
         children boxes.
         """
 
+        self._layout()
+
+    def post_children(self, params=None):
+        """
+        Children of a box with 'lazy-children' style are created
+        after ``post_create``, they are laid out here.
+        """
+
+        self._layout()
+
+    def _layout(self):
         self._rect = self._ctx.get_style('content-rect')
         c_cnt = self._ctx.children_count()
 
@@ -305,6 +455,9 @@ class PazHBox(PazBehavior):
         ratios = [ r / total_ratio for r in ratios ]
 
         length = self._rect[self._dir+2]
+        if length <= 0:
+            # No space to share between the children.
+            return
 
         starts_at = 0
         ends_at = 0
@@ -328,12 +481,204 @@ class PazHBox(PazBehavior):
 
 
 class PazVBox(PazHBox):
+    __slots__ = ( )
+
     def __init__(self, *args, **kwargs):
         super(PazVBox, self).__init__(*args, **kwargs)
         self._dir = self.VERTICAL
 
 
+class PazList(PazBehavior):
+    __slots__ = (
+        '_length', '_item', '_row', '_row_height', '_bind', '_rows', '_bound',
+        '_created',
+    )
+
+    def __init__(self, *args, **kwargs):
+        """
+        Virtualized list. Only enough row boxes to fill the visible
+        height are created and they are rebound to items of the data
+        source as the list is scrolled.
+
+        Attributes are:
+        source, length, item, row, row-height, bind
+
+        Data source is either a sequence given by 'source' or a pair of
+        callables, 'length' returning the number of items and 'item'
+        returning the item at an index. 'row' is the ``PazBox`` class of
+        the rows and 'bind' is called as ``bind(row, item)`` when a row
+        shows a new item. Default 'bind' sets the text of the row.
+
+        :arg PazBox ctx: Related ``PazBox`` instance to which behaviour applies.
+        :arg dict attr: Behaviour attributes
+        """
+
+        super(PazList, self).__init__(*args, **kwargs)
+
+        source = self.attr('source')
+        if source != None:
+            self._length = lambda: len(source)
+            self._item = lambda i: source[i]
+        else:
+            self._length = self.attr('length')
+            self._item = self.attr('item')
+
+        self._row = self.attr('row')
+        self._row_height = self.attr('row-height') or 1
+        self._bind = self.attr('bind') or self._bind_text
+
+        # Row boxes, row ``k`` shows the item ``i`` where ``i % len(rows) == k``.
+        self._rows = [ ]
+        # Item index bound to each row.
+        self._bound = [ ]
+        self._created = False
+
+    @staticmethod
+    def _bind_text(row, item):
+        row.set_text('{}'.format(item))
+
+    def _row_count(self):
+        h = self._ctx.get_style('content-rect')[3]
+
+        # Top and bottom rows can be partially visible.
+        return max(0, min(self._length(), h // self._row_height + 2))
+
+    def _add_row(self):
+        row = self._row(self._ctx.buffer(), par=self._ctx)
+        # Navigation between rows is handled by the list.
+        row.set_style('navigate-forwards', None)
+        row.set_style('navigate-backwards', None)
+
+        self._ctx.add_child(row)
+        self._rows.append(row)
+        self._bound.append(-1)
+
+    def _rebind(self):
+        length = self._length()
+        h = self._ctx.get_style('content-rect')[3]
+        sx, sy = self._ctx.get_style('scroll-pos')
+
+        max_sy = max(0, length * self._row_height - h)
+        if sy < 0 or sy > max_sy:
+            sy = max(0, min(max_sy, sy))
+            self._ctx.set_style('scroll-pos', (sx, sy))
+
+        count = len(self._rows)
+        first = sy // self._row_height
+        for k in range(count):
+            index = first + (k - first) % count
+            if self._bound[k] == index:
+                continue
+
+            row = self._rows[k]
+            self._bound[k] = index
+
+            if index >= length:
+                row.set_style('visible', False)
+                row.draw_flag('all', 1)
+                continue
+
+            rect = list(row.get_style('original-rect'))
+            rect[0] = 0
+            rect[1] = index * self._row_height
+            rect[2] = 1.0
+            rect[3] = self._row_height
+
+            row.set_style('visible', True)
+            row.set_style('original-rect', tuple(rect))
+            row.resize()
+
+            self._bind(row, self._item(index))
+
+    def _active_index(self):
+        for k in range(len(self._rows)):
+            if self._rows[k].get_style('active'):
+                return self._bound[k]
+
+        return None
+
+    def refresh(self):
+        """
+        Synchronizes rows with the data source. It must be called
+        after the data source changes.
+        """
+
+        count = self._row_count()
+
+        while len(self._rows) < count:
+            self._add_row()
+
+        while len(self._rows) > count:
+            self._bound.pop()
+            self._ctx.remove_child(self._rows.pop())
+
+        self._bound = [ -1 ] * count
+        self._rebind()
+
+    def index_of(self, row):
+        """
+        Returns the index of the item shown by ``row``.
+        """
+
+        for k in range(len(self._rows)):
+            if self._rows[k] == row:
+                return self._bound[k]
+
+        return None
+
+    def select(self, index):
+        """
+        Scrolls the list until the item at ``index`` is visible
+        and activates the row showing it.
+        """
+
+        length = self._length()
+        if length == 0 or not self._rows:
+            return
+
+        index = max(0, min(length - 1, index))
+
+        h = self._ctx.get_style('content-rect')[3]
+        sy = self._ctx.get_style('scroll-pos')[1]
+        y = index * self._row_height
+
+        if y < sy:
+            self._ctx.scroll((0, y - sy))
+        elif y + self._row_height > sy + h:
+            self._ctx.scroll((0, y + self._row_height - h - sy))
+
+        self._rows[index % len(self._rows)].activate()
+
+    def post_create(self, params=None):
+        self._created = True
+        self.refresh()
+
+    def post_resize(self, params=None):
+        if self._created:
+            self.refresh()
+
+    def post_scroll(self, params=None):
+        self._rebind()
+
+    @on(style_key('navigate-forwards'), style_key('navigate-backwards'))
+    def _navigate(self, ev):
+        if ev.cmp(self._ctx.get_style('navigate-forwards')):
+            delta = 1
+        else:
+            delta = -1
+
+        index = self._active_index()
+        if index == None:
+            return False
+
+        self.select(index + delta)
+
+        return True
+
+
 class PazButton(PazBehavior):
+    __slots__ = ( '_key', )
+
     def __init__(self, *args, **kwargs):
         if kwargs['attr']:
             attributes = kwargs['attr']
@@ -353,14 +698,16 @@ class PazButton(PazBehavior):
         self._ctx.set_style('scroll-x', False)
         self._ctx.set_style('scroll-y', False)
 
+    @on(lambda bhv: bhv._key, after=True)
     @when_active
-    def post_event(self, params):
-        if params['ev'].cmp(self._key):
-            ev = self._ctx.new_event('PRESSED', self._ctx, self._ctx, queue=True)
-            return True
+    def _press(self, ev):
+        self._ctx.new_event('PRESSED', self._ctx, self._ctx, queue=True)
+        return True
 
 
 class PazTextArea(PazBehavior):
+    __slots__ = ( '_filter_key', )
+
     def __init__(self, *args, **kwargs):
         super(PazTextArea, self).__init__(*args, **kwargs)
 
@@ -370,9 +717,40 @@ class PazTextArea(PazBehavior):
     def pre_create(self, params):
         self._ctx.set_style('text', { 'cursor': 'invert' })
 
+    def _paste(self, text):
+        """
+        Inserts pasted text at the cursor with a single modification.
+        Filtered keys and non printable characters are dropped.
+        """
+
+        whitespace = { 'KEY_ENTER': '\n', 'KEY_TAB': '\t' }
+        dropped = set()
+        for key in self._filter_key:
+            dropped.add(whitespace.get(key, key))
+
+        chars = [ ]
+        for c in text:
+            if c in dropped or not (c.isprintable() or c in '\n\t'):
+                continue
+
+            chars.append(c)
+
+        text = ''.join(chars)
+        if not text:
+            return
+
+        # Nonprintable characters as place order.
+        text = text.replace('<', '\x01').replace('>', '\x02') \
+            .replace('&', '\x03')
+        self._ctx.modify_text(text, move=(len(text), 0))
+
+    @on(ALL_EVENTS)
     @when_active
-    def pre_event(self, params):
-        ev = params['ev']
+    def _edit(self, ev):
+        if ev.cmp('PASTE'):
+            self._paste(ev.get('text'))
+
+            return True
 
         if ev.isprintable() and ev.name not in self._filter_key:
             if ev.cmp('KEY_DOWN'):
@@ -405,6 +783,8 @@ class PazTextArea(PazBehavior):
 
 
 class PazTextBox(PazTextArea):
+    __slots__ = ( )
+
     def __init__(self, *args, **kwargs):
         super(PazTextBox, self).__init__(*args, **kwargs)
 
@@ -412,6 +792,8 @@ class PazTextBox(PazTextArea):
 
 
 class PazPasswordBox(PazTextBox):
+    __slots__ = ( )
+
     def __init__(self, *args, **kwargs):
         super(PazPasswordBox, self).__init__(*args, **kwargs)
 
@@ -427,6 +809,8 @@ class PazPasswordBox(PazTextBox):
 
 
 class PazProgressBar(PazBehavior):
+    __slots__ = ( '_fraction', '_style', '_symbol' )
+
     def __init__(self, *args, **kwargs):
         attributes = kwargs['attr']
 
@@ -458,26 +842,25 @@ class PazProgressBar(PazBehavior):
 
         self._ctx.set_style('rect', tuple(rect))
 
-    def post_event(self, params):
-        ev = params['ev']
-
-        if ev.cmp('PROGRESSBAR'):
-            self._fraction = min(1.0,
-                max(
-                    0.0, self._fraction + ev.get('increment')
-                )
+    @on('PROGRESSBAR', after=True)
+    def _progress(self, ev):
+        self._fraction = min(1.0,
+            max(
+                0.0, self._fraction + ev.get('increment')
             )
+        )
 
-            w = self._ctx.get_style('content-rect')[2]
-            text = '<t s="{}">{}</t>'.format(
-                self._style, self._symbol * round(self._fraction * w)
-            )
-            self._ctx.set_text(text)
+        w = self._ctx.get_style('content-rect')[2]
+        self._ctx.set_spans([
+            (self._symbol * round(self._fraction * w), self._style)
+        ])
 
-            return True
+        return True
 
 
 class PazAlwaysDraw(PazBehavior):
+    __slots__ = ( '_propagate', )
+
     def __init__(self, *args, **kwargs):
         if 'attr' in kwargs and 'propagate' in kwargs['attr']:
             self._propagate = kwargs['attr']['propagate']
@@ -0,0 +1,256 @@
+import time
+import functools
+
+
+"""
+Clock and scheduler
+===================
+
+``PazGui`` reads time through a clock given as 'clock' in its
+configuration, so the main loop, scheduled jobs, lazy releases and the
+event budget can run on simulated time. :class:`Clock` is the system
+clock, :class:`VirtualClock` only moves when it is told to, sleeping on
+it advances it instantly.
+
+Boxes schedule periodic jobs with their ``scheduler``, a
+:class:`Scheduler` of the gui which keeps time by its clock::
+
+    class Clock(PazBox):
+        def schedule(self):
+            self.scheduler.every(1).seconds.do(self.tick)
+
+        @PazBox._scheduled
+        def tick(self):
+            self.set_text(str(self.scheduler.clock.monotonic()))
+
+Jobs run at intervals, calendar times (``at``) are not supported.
+"""
+
+
+class Clock(object):
+    """
+    System clock.
+    """
+
+    def monotonic(self):
+        """
+        :return float: Seconds from an arbitrary point
+        """
+
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """
+    Simulated clock, time moves only by :meth:`advance` and
+    :meth:`sleep`.
+    """
+
+    def __init__(self, start=0.0):
+        """
+        :arg float start: Initial time in seconds
+        """
+
+        self._now = start
+
+    def monotonic(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        """
+        :arg float seconds: Seconds to move forward
+        """
+
+        self._now += max(0.0, seconds)
+
+    def set(self, now):
+        """
+        Moves the clock to ``now``, it never goes back.
+
+        :arg float now: Time in seconds
+        """
+
+        self._now = max(self._now, now)
+
+
+class CancelJob(object):
+    """
+    Returned by a job function to cancel the job.
+    """
+
+
+class Job(object):
+    """
+    Periodic job, created by :meth:`Scheduler.every`.
+    """
+
+    _units = {
+        'seconds': 1,
+        'minutes': 60,
+        'hours': 3600,
+        'days': 86400,
+        'weeks': 604800,
+    }
+
+    def __init__(self, interval, scheduler):
+        """
+        :arg float interval: Interval in units
+        :arg Scheduler scheduler: Scheduler running the job
+        """
+
+        self.interval = interval
+        self.unit = None
+        self.job_func = None
+        self.tags = set()
+        self.last_run = None
+        self.next_run = None
+        self.scheduler = scheduler
+
+    def __lt__(self, other):
+        return self.next_run < other.next_run
+
+    def __repr__(self):
+        return 'Job(interval={}, unit={}, do={})'.format(self.interval,
+            self.unit, getattr(self.job_func, '__name__', self.job_func))
+
+    def _set_unit(self, unit):
+        self.unit = unit
+        return self
+
+    second = seconds = property(lambda self: self._set_unit('seconds'))
+    minute = minutes = property(lambda self: self._set_unit('minutes'))
+    hour = hours = property(lambda self: self._set_unit('hours'))
+    day = days = property(lambda self: self._set_unit('days'))
+    week = weeks = property(lambda self: self._set_unit('weeks'))
+
+    @property
+    def period(self):
+        """
+        :return float: Seconds between the runs
+        """
+
+        return self.interval * self._units[self.unit or 'seconds']
+
+    def tag(self, *tags):
+        self.tags.update(tags)
+        return self
+
+    def do(self, job_func, *args, **kwargs):
+        """
+        Sets the function run by the job and schedules it.
+
+        :arg callable job_func: Function to be run
+        :return Job: The job
+        """
+
+        self.job_func = functools.partial(job_func, *args, **kwargs)
+        functools.update_wrapper(self.job_func, job_func)
+        self._schedule_next_run()
+        self.scheduler.jobs.append(self)
+
+        return self
+
+    def should_run(self, now):
+        return now >= self.next_run
+
+    def run(self):
+        ret = self.job_func()
+        self.last_run = self.scheduler.clock.monotonic()
+        self._schedule_next_run()
+
+        return ret
+
+    def _schedule_next_run(self):
+        if self.next_run == None:
+            self.next_run = self.scheduler.clock.monotonic() + self.period
+        else:
+            # Runs keep their phase when they are late, missed runs are
+            # skipped.
+            now = self.scheduler.clock.monotonic()
+            missed = max(0, int((now - self.next_run) // self.period))
+            self.next_run += (missed + 1) * self.period
+
+
+class Scheduler(object):
+    """
+    Runs periodic jobs on a clock, its interface is a subset of the
+    ``schedule`` package.
+    """
+
+    def __init__(self, clock=None):
+        """
+        :arg Clock clock: Clock of the jobs, system clock if it is
+                          ``None``.
+        """
+
+        self.clock = clock if clock != None else Clock()
+        self.jobs = [ ]
+
+    def every(self, interval=1):
+        """
+        :arg float interval: Interval in the unit set on the job
+        :return Job: An unscheduled job
+        """
+
+        return Job(interval, self)
+
+    def run_pending(self):
+        """
+        Runs the jobs which are due, in the order of their due times.
+        """
+
+        now = self.clock.monotonic()
+        for job in sorted(job for job in self.jobs if job.should_run(now)):
+            self._run_job(job)
+
+    def _run_job(self, job):
+        ret = job.run()
+        if isinstance(ret, CancelJob) or ret is CancelJob:
+            self.cancel_job(job)
+
+    def get_jobs(self, tag=None):
+        if tag == None:
+            return self.jobs[:]
+
+        return [ job for job in self.jobs if tag in job.tags ]
+
+    def clear(self, tag=None):
+        if tag == None:
+            del self.jobs[:]
+        else:
+            self.jobs = [ job for job in self.jobs if tag not in job.tags ]
+
+    def cancel_job(self, job):
+        try:
+            self.jobs.remove(job)
+        except ValueError:
+            pass
+
+    @property
+    def next_run(self):
+        """
+        :return float: Due time of the next job on the clock, ``None``
+                       if there are no jobs.
+        """
+
+        if not self.jobs:
+            return None
+
+        return min(self.jobs).next_run
+
+    def idle_seconds(self):
+        """
+        :return float: Seconds until the next job, ``None`` if there are
+                       no jobs.
+        """
+
+        if not self.jobs:
+            return None
+
+        return self.next_run - self.clock.monotonic()
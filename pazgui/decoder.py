@@ -0,0 +1,199 @@
+import os
+import re
+import codecs
+import locale
+import select
+
+from blessed import keyboard
+
+from pazgui import keycodes as _kc
+
+
+"""
+Input decoder
+=============
+
+Decodes raw terminal input without going through
+``blessed.Terminal.inkey``. Bytes are read from the keyboard file
+descriptor in bulk, decoded as UTF-8 and split into keys with a trie of
+the key sequences known by ``blessed``, so key names are the same
+('KEY_ENTER', 'KEY_PGUP', ...). SGR mouse reports and bracketed pastes
+are decoded as well.
+
+It is used by ``PazGui`` unless 'input-decoder' is unset in its
+configuration, then keys are read with ``inkey`` and only pastes are
+decoded by it.
+"""
+
+_SGR_MOUSE = re.compile(r'\x1b\[<\d+;\d+;\d+[Mm]')
+_SGR_MOUSE_PREFIX = re.compile(r'\x1b\[<[\d;]*$')
+
+
+def build_trie(sequences):
+    """
+    Builds a trie of key sequences.
+
+    :arg dict sequences: Key names by their sequences.
+    :return dict: Nested dictionaries keyed by characters, key names
+                  are kept under ``None``.
+    """
+
+    root = { }
+    for seq in sequences:
+        node = root
+        for c in seq:
+            node = node.setdefault(c, { })
+        node[None] = sequences[seq]
+
+    return root
+
+
+class InputDecoder(object):
+    """
+    Incremental decoder, input can be split at any byte.
+    """
+
+    def __init__(self, term):
+        """
+        :arg blessed.Terminal term: Terminal of which key sequences
+                                    are decoded.
+        """
+
+        self._term = term
+
+        codes = keyboard.get_keyboard_codes()
+        sequences = { }
+        for seq, code in keyboard.get_keyboard_sequences(term).items():
+            # Some versions of ``blessed`` have sequences of unnamed codes.
+            if code in codes:
+                sequences[seq] = codes[code]
+        sequences[_kc.PASTE_START] = 'PASTE_START'
+
+        self._trie = build_trie(sequences)
+        # Keyboard input is in the encoding of the locale like
+        # ``blessed`` decodes it.
+        self._decoder = codecs.getincrementaldecoder(
+            locale.getpreferredencoding(False) or 'utf-8')(errors='replace')
+        # Decoded text which is not split into keys yet.
+        self._text = ''
+        # Start position of the search for the paste end.
+        self._paste_search = None
+
+    def in_paste(self):
+        """
+        :return bool: ``True`` if the end of a paste is being waited.
+        """
+
+        return self._paste_search != None
+
+    def pending(self):
+        """
+        :return bool: ``True`` if an incomplete sequence is waiting for
+                      more input.
+        """
+
+        return len(self._text) > 0
+
+    def read(self, fd, timeout=0):
+        """
+        Reads all available bytes of ``fd``.
+
+        :arg int fd: Keyboard file descriptor
+        :arg float timeout: Seconds to wait for the first byte.
+        :return bytes: Bytes read
+        """
+
+        chunks = [ ]
+        while select.select([ fd ], [ ], [ ], timeout)[0]:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+
+            chunks.append(data)
+            timeout = 0
+
+        return b''.join(chunks)
+
+    def decode(self, data, final=False):
+        """
+        Splits input into keys.
+
+        :arg bytes data: Raw input
+        :arg bool final: No more input is expected, so incomplete
+                         sequences are split into single keys.
+        :return list: Tuples of key name (or character) and event data
+                      (``None`` for keys).
+        """
+
+        text = self._text + self._decoder.decode(data, final=final)
+        keys = [ ]
+        i = 0
+        n = len(text)
+
+        while i < n:
+            if self._paste_search != None:
+                end = text.find(_kc.PASTE_END, self._paste_search)
+                if end < 0 and not final:
+                    self._paste_search = max(0, n - len(_kc.PASTE_END))
+                    break
+                elif end < 0:
+                    end = n
+
+                # Terminals send line breaks as carriage returns.
+                paste = text[i:end].replace('\r\n', '\n').replace('\r', '\n')
+                keys.append(('PASTE', { 'text': paste }))
+                self._paste_search = None
+                i = min(n, end + len(_kc.PASTE_END))
+                text = text[i:]
+                n = len(text)
+                i = 0
+                continue
+
+            c = text[i]
+            if c != '\x1b' and c not in self._trie:
+                keys.append((c, None))
+                i += 1
+                continue
+
+            if text.startswith('\x1b[<', i):
+                m = _SGR_MOUSE.match(text, i)
+                if m != None:
+                    keys.append(_kc.decode_mouse(m.group()))
+                    i = m.end()
+                    continue
+                elif _SGR_MOUSE_PREFIX.match(text, i) and not final:
+                    break
+
+            # Longest sequence in the trie.
+            node = self._trie
+            match = None
+            j = i
+            while j < n and text[j] in node:
+                node = node[text[j]]
+                j += 1
+                if None in node:
+                    match = (node[None], j)
+
+            if j == n and len(node) > (1 if None in node else 0) \
+                and not final:
+                # Sequence may continue in the next input.
+                break
+
+            if match == None:
+                keys.append((c, None))
+                i += 1
+            elif match[0] == 'PASTE_START':
+                i = match[1]
+                text = text[i:]
+                n = len(text)
+                i = 0
+                self._paste_search = 0
+            else:
+                keys.append((match[0], None))
+                i = match[1]
+
+        self._text = text[i:]
+        if self._paste_search != None:
+            self._paste_search = max(0, self._paste_search - i)
+
+        return keys
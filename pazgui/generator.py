@@ -0,0 +1,149 @@
+import math
+import random
+
+from pazgui.gui import PazBox
+from pazgui.behavior import PazHBox, PazVBox, PazTextArea, PazButton
+
+
+"""
+Tree generator
+==============
+
+Builds synthetic box trees for benchmarks and stress tests. Trees are
+generated deterministically from a seed, so the same parameters always
+give the same tree.
+
+Example::
+
+    Root = generate(seed=1, depth=3, fanout=4)
+    gui = PazGui(Root)
+"""
+
+# Behaviors of the boxes with children and of the leaves.
+CONTAINER_BEHAVIORS = {
+    'none': None,
+    'hbox': PazHBox,
+    'vbox': PazVBox,
+}
+LEAF_BEHAVIORS = {
+    'none': None,
+    'textarea': PazTextArea,
+    'button': PazButton,
+}
+
+DEFAULT_MIX = {
+    'none': 2, 'hbox': 1, 'vbox': 1, 'textarea': 1, 'button': 1,
+}
+
+_WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do '
+    'eiusmod tempor incididunt ut labore et dolore magna aliqua'
+).split()
+
+
+def tree_size(depth, fanout):
+    """
+    :arg int depth: Depth of the tree, ``0`` is a single box.
+    :arg int fanout: Number of children of every box with children
+    :return int: Number of boxes in a tree built by :func:`generate`
+    """
+
+    return sum(fanout ** d for d in range(depth + 1))
+
+
+def _text(rng, size):
+    length = rng.randint(size[0], size[1])
+    words = [ ]
+    n = 0
+    while n < length:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        n += len(word) + 1
+
+    return ' '.join(words)[:length]
+
+
+def _choose(rng, mix, behaviors):
+    names = [ n for n in sorted(mix) if n in behaviors and mix[n] > 0 ]
+    if not names:
+        return None
+
+    name = rng.choices(names, weights=[ mix[n] for n in names ])[0]
+
+    return behaviors[name]
+
+
+def generate(seed=0, depth=3, fanout=4, mix=DEFAULT_MIX, text_size=(0, 40),
+             overlap=0.2, border=0.5):
+    """
+    Generates a tree of ``PazBox`` classes.
+
+    Children of a box are placed on a grid in it, unless the box has a
+    ``PazHBox`` or ``PazVBox`` behavior which lays them out. With
+    probability ``overlap`` a child is moved by half a grid cell and
+    raised above its siblings.
+
+    :arg int seed: Seed of the random generator
+    :arg int depth: Depth of the tree, ``0`` is a single box.
+    :arg int fanout: Number of children of every box with children
+    :arg dict mix: Weights of the behaviors by name, 'none', 'hbox' and
+                   'vbox' for boxes with children, 'none', 'textarea' and
+                   'button' for leaves.
+    :arg tuple text_size: Minimum and maximum text length
+    :arg float overlap: Probability of a child overlapping its siblings
+    :arg float border: Probability of a box having a border
+    :return type: Root ``PazBox`` class
+    """
+
+    rng = random.Random(seed)
+    counter = [ 0 ]
+
+    def build(level, rect, z_index):
+        ind = counter[0]
+        counter[0] += 1
+
+        is_leaf = level == depth
+        if is_leaf:
+            bhv = _choose(rng, mix, LEAF_BEHAVIORS)
+        else:
+            bhv = _choose(rng, mix, CONTAINER_BEHAVIORS)
+
+        style = {
+            'rect': rect,
+            'border': rng.random() < border,
+        }
+        if bhv != None:
+            style['behavior'] = { bhv: { } }
+        if z_index != None:
+            style['z-index'] = z_index
+
+        attributes = {
+            'name': 'box{}'.format(ind),
+            'text': _text(rng, text_size),
+            'style': style,
+        }
+
+        if not is_leaf:
+            cols = math.ceil(math.sqrt(fanout))
+            rows = math.ceil(fanout / cols)
+            child_classes = [ ]
+            for i in range(fanout):
+                x = (i % cols) / cols
+                y = (i // cols) / rows
+                z = None
+                if rng.random() < overlap:
+                    x += 0.5 / cols
+                    y += 0.5 / rows
+                    # Boxes are at 'z-index' of their level by default,
+                    # the root of the gui is at 0.
+                    z = level + 3
+
+                child_classes.append(
+                    build(level + 1, (x, y, 1 / cols, 1 / rows), z)
+                )
+
+            attributes['children'] = lambda self: child_classes
+
+        return type('GeneratedBox{}'.format(ind), (PazBox, ), attributes)
+
+    return build(0, (0, 0, 1.0, 1.0), None)
@@ -1,4 +1,6 @@
+import os
 import sys
+import bisect
 import signal
 import enum
 import time
@@ -6,15 +8,25 @@ import re
 import copy
 import logging
 import traceback
+import contextlib
+import collections
+import types
+import json
+import weakref
 import xml.etree.ElementTree as ET
 import copy
 
 from blessed import Terminal
-import schedule
 
 from pazgui import keycodes as _kc
-from pazgui.behavior import (PazBehavior, PazPanel, PazHBox, PazButton, PazAlwaysDraw)
-from pazgui.accessories import Bunch, DeepDict, init_logger, logger, StyleDict, new_weakref
+from pazgui.decoder import InputDecoder
+from pazgui.metrics import Metrics
+from pazgui.clock import Clock, Scheduler
+from pazgui.record import Recorder
+from pazgui.behavior import (PazBehavior, PazPanel, PazHBox, PazButton, PazAlwaysDraw,
+    on, collect_handlers, handler_styles, ALL_EVENTS)
+from pazgui.accessories import (Bunch, DeepDict, init_logger, logger, StyleDict,
+    new_weakref, GridIndex, EventQueue)
 
 
 class FrameBuffer(object):
@@ -35,6 +47,12 @@ class FrameBuffer(object):
         self._frame = [u' '] * self.height * self.width
         self._style = StyleDict()
         self._tmp_style = StyleDict()
+        # ``Metrics`` of the gui if they are collected, and the cells of
+        # the last frame to count the changed ones.
+        self.metrics = None
+        self._last_cells = None
+        # Only the changed cells are written by ``update``.
+        self.differential = False
         self.resize()
         self.clear()
         self._flush_stream()
@@ -91,16 +109,6 @@ class FrameBuffer(object):
 
         return resized
 
-    def _write_style(self, x, y):
-        """
-        Writes style to the point (``x``, ``y``) on the terminal.
-        """
-
-        style = self.get_style(x, y)
-        if style != None:
-            self._write_to_stream(getattr(self._term, 'normal'))
-            self._write_to_stream(getattr(self._term, style))
-
     def _write_to_stream(self, s):
         """
         Print is wrapped in this function because the output stream
@@ -201,25 +209,285 @@ class FrameBuffer(object):
         else:
             return None
 
+    def invalidate(self):
+        """
+        The whole frame is written by the next differential update,
+        e.g. after the terminal is cleared by something else.
+        """
+
+        self._last_cells = None
+
+    def _cells(self):
+        """
+        :return list: (character, style) of every cell in the buffer
+        """
+
+        get_style = self.get_style
+
+        return [
+            (self._frame[self._pos1(x, y)], get_style(x, y))
+            for y in range(self.height) for x in range(self.width)
+        ]
+
     def update(self):
         """
-        Print character buffer and style to the terminal after clearing
-        everything.
+        Print character buffer and style to the terminal. The whole
+        frame is written unless ``differential`` is set, then only the
+        cells changed since the last frame are written.
+        """
+
+        if self.metrics == None and not self.differential:
+            self._update()
+        else:
+            self._tracked_update(self.metrics)
+
+    def _tracked_update(self, metrics):
+        """
+        Updates the terminal keeping the cells of the frame, counts the
+        cells changed since the last frame and the bytes written if
+        ``metrics`` is given.
+
+        :arg Metrics metrics: Metrics of the gui or ``None``
         """
 
+        cells = self._cells()
+        last = self._last_cells
+        self._last_cells = cells
+        if last != None and len(last) != len(cells):
+            last = None
+
+        if metrics == None:
+            if last == None:
+                self._update()
+            else:
+                self._update_cells(cells, last)
+            return
+
+        if last == None:
+            changed = len(cells)
+        else:
+            changed = sum(1 for a, b in zip(last, cells) if a != b)
+
+        written = 0
+        write = self._write_to_stream
+        def counting_write(s):
+            nonlocal written
+            written += len(s.encode('utf-8'))
+            write(s)
+
+        self._write_to_stream = counting_write
+        try:
+            if last == None or not self.differential:
+                self._update()
+            else:
+                self._update_cells(cells, last)
+        finally:
+            del self._write_to_stream
+
+        metrics.count('cells-changed', changed)
+        metrics.count('bytes-written', written)
+        metrics.gauge('cells-changed', changed)
+        metrics.gauge('bytes-written', written)
+
+    def _update(self):
         self.clear()
+        term = self._term
+        # Styles are written when they change. ``False`` means the
+        # style of the terminal is not known.
+        current = False
         ind = 0
         for y in range(self.height):
             for x in range(self.width):
                 ind = self._pos1(x, y)
 
-                self._term.move(x, y)
-                self._write_style(x, y)
+                style = self.get_style(x, y)
+                if style != current:
+                    self._write_to_stream(term.normal)
+                    if style != None:
+                        self._write_to_stream(getattr(term, style))
+                    current = style
 
                 self._print_c(ind)
 
         self._flush_stream()
 
+    def _update_cells(self, cells, last):
+        """
+        Writes the cells differing from the last frame.
+
+        :arg list cells: (character, style) of the cells
+        :arg list last: Cells of the last frame
+        """
+
+        term = self._term
+        write = self._write_to_stream
+        width = self.width
+        current = False
+        # Index of the cell under the cursor, ``None`` if it is unknown.
+        cursor = None
+        for ind in range(len(cells)):
+            cell = cells[ind]
+            if cell == last[ind]:
+                continue
+
+            if cursor != ind:
+                write(term.move_yx(ind // width, ind % width))
+
+            c, style = cell
+            if style != current:
+                write(term.normal)
+                if style != None:
+                    write(getattr(term, style))
+                current = style
+
+            write(c)
+            # The cursor stays on the last column.
+            cursor = ind + 1 if (ind + 1) % width != 0 else None
+
+        self._flush_stream()
+
+
+# Style names split into their paths, see :meth:`PazBox.get_style`.
+_style_paths = { }
+
+
+def _style_path(name):
+    path = _style_paths.get(name)
+    if path == None:
+        path = _style_paths[name] = tuple(name.split('.'))
+
+    return path
+
+
+# Styles changing the boxes found by the spatial index of the root, or
+# the ones culled by :meth:`PazGui._cull`.
+_index_styles = frozenset(('visible', 'opaque', 'z-index'))
+
+
+# Result of :meth:`PazBox.clip`, a visible area of a box and how much
+# it is clipped from each side. It is kept by every box, so it is a
+# tuple rather than a ``Bunch``.
+ClipArea = collections.namedtuple('ClipArea', ('area', 'clipped'))
+
+# Event handlers of a box. ``by_name`` maps event names to handlers,
+# ``any`` holds the handlers of other events and ``names`` is the set of
+# subscribed names. A handler is a tuple of (behavior index or -1 for
+# the box, method name, hook). Tables are shared by boxes having the
+# same handlers.
+HandlerTable = collections.namedtuple('HandlerTable', ('by_name', 'any', 'names'))
+_handler_tables = { }
+
+
+class BoxSurface(object):
+    """
+    Offscreen copy of the characters and styles which a ``PazBox`` paints
+    into its own rectangle. It has the same drawing interface with
+    :class:`FrameBuffer` and it is composited into the frame buffer when
+    only the position or the clip area of the box changes.
+    """
+
+    def __init__(self, width, height):
+        """
+        Initialize BoxSurface.
+
+        :arg int width: Width of the box rectangle.
+        :arg int height: Height of the box rectangle.
+        """
+
+        self.width = max(0, width)
+        self.height = max(0, height)
+        #: Terminal position of the upper left corner of the box.
+        self.origin = (0, 0)
+        # ``None`` cells are not painted and they are transparent.
+        self._chars = [ None ] * self.width * self.height
+        self._styles = [ None ] * self.width * self.height
+
+    def _pos1(self, x, y):
+        """
+        Transform terminal coordinates to surface index.
+
+        :return: Returns index or ``None`` if it is outside of the surface.
+        """
+
+        x -= self.origin[0]
+        y -= self.origin[1]
+
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            return None
+
+        return self.width * y + x
+
+    def set_xy(self, x, y, c):
+        ind = self._pos1(x, y)
+        if ind == None:
+            return
+
+        if type(c) == int:
+            c = chr(c)
+
+        self._chars[ind] = c
+
+    def set_style(self, x, y, z, style):
+        ind = self._pos1(x, y)
+        if ind == None:
+            return
+
+        self._styles[ind] = style
+
+    def composite(self, buff, area, z, exposed=None):
+        """
+        Copy the cells inside ``area`` into the frame buffer.
+
+        :arg FrameBuffer buff: Frame buffer.
+        :arg tuple area: Rectangle (``x1``, ``y1``, ``x2``, ``y2``) in
+                         terminal coordinates.
+        :arg int z: z-index of the styles.
+        :arg callable exposed: If it is given, only the cells for which
+                               ``exposed(x, y)`` is ``True`` are copied.
+        """
+
+        x1 = max(area[0], self.origin[0], 0)
+        y1 = max(area[1], self.origin[1], 0)
+        x2 = min(area[2], self.origin[0] + self.width, buff.width)
+        y2 = min(area[3], self.origin[1] + self.height, buff.height)
+
+        if x1 >= x2:
+            return
+
+        for y in range(y1, y2):
+            start = self._pos1(x1, y)
+            end = start + x2 - x1
+
+            chars = self._chars[start:end]
+            if exposed != None:
+                chars = [ c if exposed(x1 + i, y) else None
+                    for i, c in enumerate(chars) ]
+
+            if None not in chars:
+                ind = buff._pos1(x1, y)
+                buff._frame[ind:ind+x2-x1] = chars
+            else:
+                for x in range(x1, x2):
+                    if chars[x-x1] != None:
+                        buff.set_xy(x, y, chars[x-x1])
+
+            styles = self._styles[start:end]
+            for x in range(x1, x2):
+                if styles[x-x1] != None and chars[x-x1] != None:
+                    buff.set_style(x, y, z, styles[x-x1])
+
+
+def _is_box(obj):
+    """
+    :arg object obj: Object to be checked, can be a weak reference.
+    :return bool: ``True`` if ``obj`` is a live ``PazBox`` (or subclass).
+    """
+
+    try:
+        return isinstance(obj, PazBox)
+    except ReferenceError:
+        return False
+
 
 class PazEvent(object):
     """
@@ -227,6 +495,18 @@ class PazEvent(object):
     propagated to gui elements.
     """
 
+    __slots__ = ( 'name', 'source', 'target', 'data', 'is_char' )
+
+    # Lookup tables are shared by all events.
+    _whitespace_keys = types.MappingProxyType({
+        'KEY_ENTER': '\n', 'KEY_TAB': '\t',
+    })
+
+    _accepted_text_keys = frozenset([
+        'KEY_UP', 'KEY_DOWN', 'KEY_RIGHT', 'KEY_LEFT',
+        'KEY_BACKSPACE', 'KEY_DELETE',
+    ] + list(_whitespace_keys.keys()))
+
     def __init__(self, name, source=None, target='all', data=None):
         """
         Constructor
@@ -235,49 +515,43 @@ class PazEvent(object):
         :arg PazBox_or_str object: The source which event originates from
         :arg PazBox_or_str target: The target of the events, event propagation
                                    sinks when it arrives a unique target
-	:arg dict data: Extra event data.
+        :arg dict data: Extra event data.
         """
 
-        self.name = name
+        # Names are compared a lot, interned ones are compared by identity.
+        self.name = sys.intern(name)
         self.is_char = (len(name) == 1)
 
-        if type(source) == PazBox or type(source) == PazGui:
+        if isinstance(source, PazBox):
             self.source = new_weakref(source)
         else:
             self.source = source
 
-        if type(target) == PazBox or type(target) == PazGui:
+        if isinstance(target, PazBox):
             self.target = new_weakref(target)
         else:
             self.target = target
 
         self.data = data
 
-        self._whitespace_keys = {
-            'KEY_ENTER': '\n', 'KEY_TAB': '\t',
-        }
-
-        self._accepted_text_keys = [
-            'KEY_UP', 'KEY_DOWN', 'KEY_RIGHT', 'KEY_LEFT',
-            'KEY_BACKSPACE', 'KEY_DELETE'
-             ] + list(self._whitespace_keys.keys())
-
     def __eq__(self, ev):
         """
         Compare two events
         """
 
-        if type(ev) != PazEvent:
+        if not isinstance(ev, PazEvent):
             return False
-        if self.name == ev.name \
-            and self.source == ev.source \
-            and self.target == ev.target:
-            return True
-        else:
+
+        try:
+            return self.name == ev.name \
+                and self.source == ev.source \
+                and self.target == ev.target
+        except ReferenceError:
+            # Source or target box is already released.
             return False
 
     def get(self, dname):
-        if dname in self.data:
+        if self.data != None and dname in self.data:
             return self.data[dname]
         else:
             return None
@@ -300,18 +574,9 @@ class PazEvent(object):
         """
 
         if type(ev) == str:
-            if ev == self.name:
-                return True
-            else:
-                return False
-        elif type(ev) == PazEvent:
-            if self.name == ev.name and self.source == ev.source \
-                and ev.target == ev.target:
-                return True
-            else:
-                return False
+            return ev == self.name
         else:
-            return False
+            return self == ev
 
     def isprintable(self):
         """
@@ -341,11 +606,8 @@ class PazEvent(object):
                 return True
             else:
                 return False
-        elif isinstance(self.source, PazBox) and isinstance(source, PazBox):
-            if source == self.source:
-                return True
-            else:
-                return False
+        elif _is_box(self.source) and _is_box(source):
+            return source == self.source
         else:
             return False
 
@@ -371,11 +633,8 @@ class PazEvent(object):
                 return True
             else:
                 return False
-        elif isinstance(self.target, PazBox) and isinstance(target, PazBox):
-            if target == self.target:
-                return True
-            else:
-                return False
+        elif _is_box(self.target) and _is_box(target):
+            return target == self.target
         else:
             return False
 
@@ -383,6 +642,12 @@ class PazEvent(object):
 class PazBox(object):
     """
     Main GUI object.
+
+    Attributes of ``PazBox`` are slots. A subclass gets a ``__dict__`` for
+    each instance unless it declares ``__slots__`` too, listing its own
+    attributes (or ``__slots__ = ( )`` when it has none). This saves memory
+    for boxes created in large numbers (e.g. cells of a table). Instances of
+    such subclasses cannot set ``style`` or ``text``.
     """
 
     class PazText(object):
@@ -390,6 +655,11 @@ class PazBox(object):
         Rich text object.
         """
 
+        __slots__ = (
+            '_ctx', '_text', '_raw_text', '_spans', '_style_map', '_config',
+            '_rows', '_row_length', '_pos_bimap', '_cursor_pos', '_ws_re',
+        )
+
         def __init__(self, ctx, text="", config={ }):
             """
             Constructor
@@ -405,6 +675,8 @@ class PazBox(object):
             self._text = ''
             #: Holds original text with style info.
             self._raw_text = ''
+            #: Pre-tokenized ``(text, style)`` pairs, see :meth:`set_spans`.
+            self._spans = None
             self._style_map = dict()
 
             # Default configuration
@@ -483,7 +755,7 @@ class PazBox(object):
             """
 
             self._rows.clear()
-            rect = list(self._ctx.get_style('rect'))
+            rect = list(self._ctx._rect)
             margin = self._ctx.get_margin()
             (w, h) = (
                 rect[2] - margin[1] - margin[3],
@@ -586,9 +858,34 @@ class PazBox(object):
             :arg str text: Raw text string.
             """
 
+            self._spans = None
             self._raw_text = text
             self._cursor_pos = min(self._cursor_pos, len(self._raw_text) - 1)
 
+        def set_spans(self, spans):
+            """
+            Set text from pre-tokenized ``(text, style)`` pairs. Spans are
+            fed directly into the style map and rows by :meth:`parse`, so no
+            markup is built or parsed.
+
+            :arg list spans: List of ``(text, style)`` tuples. If ``style`` is
+                             ``None``, the text style of the box is used.
+            """
+
+            self._spans = [ (text, style) for text, style in spans ]
+
+            text = ''.join([ text for text, _ in self._spans ])
+            if self._config['cursor'] and not text.endswith(' '):
+                # Keep a space to print cursor at the end of text.
+                self._spans.append((' ', None))
+                text += ' '
+
+            # Placeholders keep ``_raw_text`` valid markup, so ``modify``
+            # can fall back to the markup path (see `PazTextArea._edit`).
+            self._raw_text = text.replace('<', '\x01') \
+                .replace('>', '\x02').replace('&', '\x03')
+            self._cursor_pos = min(self._cursor_pos, len(self._raw_text) - 1)
+
         def get(self, raw=True):
             """
             Returns ``_raw_text`` or parsed text.
@@ -600,7 +897,7 @@ class PazBox(object):
 
             if raw:
                 # Replace placeholder by the corresponding character.
-                # See `PazTextArea.pre_event
+                # See `PazTextArea._edit`
                 return self._raw_text.replace('\x01', '<') \
                     .replace('\x02', '>').replace('\x03', '&')
             else:
@@ -636,17 +933,22 @@ class PazBox(object):
                     # Else start from the end of previous row
                     col_start = len(self._rows[i]) - 1
 
+                found = False
                 for j in range(col_start, -1, -1):
                     text_ind2 = text_ind + j
 
                     if text_ind2 in self._style_map:
-                        if 'invert' in self._style_map[text_ind2]:
-                            while 'invert' in self._style_map[text_ind2]:
-                                self._style_map[text_ind2].remove('invert')
-
+                        styles = self._style_map[text_ind2]
+                        if 'invert' in styles:
+                            styles = [ s for s in styles if s != 'invert' ]
                             inverted = True
 
-                        style = '_'.join(self._style_map[text_ind2])
+                        style = '_'.join(styles)
+                        found = True
+                        break
+
+                if found:
+                    break
 
             if not style:
                 style = 'normal'
@@ -657,6 +959,11 @@ class PazBox(object):
                 return self._invert_style(style)
 
         def modify_by_cursor(self, mod, overwrite=False, move=None):
+            # Cursor is placed at the end when the text is parsed, it
+            # can be modified several times before that.
+            if self._cursor_pos == -1:
+                self._cursor_pos = len(self._raw_text) - 1
+
             self.modify(mod, self._cursor_pos, overwrite, move)
 
         def modify(self, mod, pos, overwrite=False, move=None):
@@ -674,6 +981,9 @@ class PazBox(object):
                                  append text to `pos`.
             """
 
+            # Span styles are dropped, ``_raw_text`` is parsed as markup.
+            self._spans = None
+
             if type(mod) == str:
                 if not overwrite:
                     self._raw_text = self._raw_text[:pos] + mod \
@@ -683,6 +993,11 @@ class PazBox(object):
                     self._raw_text = self._raw_text[:pos] + mod \
                         + self._raw_text[pos+len(mod):]
 
+                # The trailing space must exist before the cursor moves
+                # past the inserted text.
+                if not self._raw_text.endswith(' '):
+                    self._raw_text += ' '
+
                 if move == None:
                     self.move_cursor((1, 0))
                 else:
@@ -707,6 +1022,10 @@ class PazBox(object):
                 self._rows = []
                 return
 
+            if self._spans != None:
+                self._parse_spans()
+                return
+
             def parse_recursion(el, text_len, style_stack):
                 style = el.get('s')
                 if style and len(style) > 0:
@@ -734,13 +1053,13 @@ class PazBox(object):
 
                 return text.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
 
-            # Replace tabs and place holder (see `PazTextArea.pre_event`) characters
+            # Replace tabs and place holder (see `PazTextArea._edit`) characters
             tmp_raw_text = self._set_cursor(self._cursor_pos)     \
                 .replace('\t', self._config['tab-length'] * ' ')  \
                 .replace('\x01', '&lt;').replace('\x02', '&gt;')  \
                 .replace('\x03', '&amp;')
 
-            if self._ctx.get_style('active'):
+            if self._ctx._active:
                 text_style = self._config['style:active']
             else:
                 text_style = self._config['style']
@@ -752,6 +1071,62 @@ class PazBox(object):
 
             self._update_rows()
 
+        def _parse_spans(self):
+            """
+            Build parsed text and style map from ``self._spans``. Resulting
+            style map is the same as the one :meth:`parse` creates for the
+            equivalent markup.
+            """
+
+            if self._ctx._active:
+                text_style = self._config['style:active']
+            else:
+                text_style = self._config['style']
+
+            base = [ s for s in [ text_style ] if s != 'normal' ]
+            cursor = self._config['cursor']
+            if cursor and self._cursor_pos == -1:
+                self._cursor_pos = len(self._raw_text) - 1
+
+            # Split the span under the cursor so that cursor style
+            # applies to a single character.
+            pieces = [ ]
+            start = 0
+            for text, style in self._spans:
+                if style and style != 'normal':
+                    styles = base + [ style ]
+                else:
+                    styles = base
+
+                end = start + len(text)
+                if cursor and start <= self._cursor_pos < end:
+                    i = self._cursor_pos - start
+                    pieces.append((text[:i], styles))
+                    pieces.append((text[i], styles + [ cursor ]))
+                    pieces.append((text[i+1:], styles))
+                else:
+                    pieces.append((text, styles))
+
+                start = end
+
+            self._style_map = dict()
+            tab = self._config['tab-length'] * ' '
+            texts = [ ]
+            text_len = 0
+            for text, styles in pieces:
+                if not text:
+                    continue
+
+                text = text.replace('\t', tab)
+                self._style_map[text_len] = list(styles)
+                texts.append(text)
+                text_len += len(text)
+
+            self._style_map[text_len] = [ ]
+            self._text = ''.join(texts)
+
+            self._update_rows()
+
         def move_cursor(self, delta):
             """
             Move cursor by delta points.
@@ -768,9 +1143,87 @@ class PazBox(object):
 
 
     INF = float('inf')
-    name = ""
     style = { }
     text = ""
+    # Default ``PazBox`` style. It is shared by all instances, only the
+    # styles set on an instance are kept in its own ``_style`` dict.
+    _default_style = types.MappingProxyType({
+        'z-index': -INF,
+        'visible': True,
+        # Children are created when the box is first drawn or
+        # resolved by ``follow_path``.
+        'lazy-children': False,
+        # Seconds after which children of a hidden lazy box are
+        # released, ``None`` keeps them.
+        'lazy-release': None,
+        # Paint into an offscreen ``BoxSurface`` which is composited
+        # into the frame buffer when only the position changes.
+        'cache-surface': False,
+        # An opaque box hides everything drawn before it in its
+        # clip area, see ``PazGui._cull``.
+        'opaque': True,
+        'border': False,
+        'border-style': 'normal',
+        'border-style:active': '',
+        'rect': (0, 0, 1, 1),
+         # margin: (top, right, bottom, left)
+        'margin': (0, 0, 0, 0),
+        'active': False,
+        'scroll-pos': (0, 0),
+        'scroll-x': True,
+        'scroll-y': True,
+        'background': u' ',
+        'background-style': 'normal',
+        'background:active': '',
+        'background-style:active': '',
+        'text': types.MappingProxyType({
+            'cursor': None,
+            # If text style is not provided ``PazText`` uses
+            # background style.
+            # 'style': 'normal',
+        }),
+        'tab-index': -1,
+        'activate-key': None,
+        'deactivate-key': 'KEY_ESCAPE',
+        'scroll-up-key': 'KEY_PGUP',
+        'scroll-down-key': 'KEY_PGDOWN',
+        'navigate-forwards': 'KEY_DOWN',
+        'navigate-backwards': 'KEY_UP',
+        # **
+        'original-rect': None,
+        'original-margin': None,
+    })
+
+    __slots__ = (
+        '_buffer', 'scheduler', '_children_list', '_parent', '_style',
+        '_shared_style', '_clip', '_origin', '_canvas', '_surface',
+        '_occlusion', '_draw_flags', '_path', '_children_loaded',
+        '_hidden_since', '_behavior', '_text', '_handlers', '_subtree',
+        '_attached',
+        # See ``_attr_styles``.
+        '_rect', '_margin', '_border', '_scroll_pos', '_z_index', '_active',
+        # Name of the box unless its class sets ``name``, see ``name``.
+        '_name',
+        # ``style`` and ``text`` are class level defaults, boxes that set
+        # them on the instance need a subclass without ``__slots__``.
+        '__weakref__',
+    )
+
+    @property
+    def name(self):
+        """
+        Name of the box in its path. Subclasses usually set it as a class
+        attribute, unnamed boxes are named by ``add_child``.
+
+        :return str:
+        """
+
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+
     def __init__(self, buff, par=None):
         """
         Constructor.
@@ -780,48 +1233,29 @@ class PazBox(object):
         """
 
         self._buffer = buff
-        self.scheduler = schedule
+        self._name = ""
+        if par != None:
+            # ``Scheduler`` of the gui
+            self.scheduler = par.scheduler
         self._children_list = []
         self._parent = new_weakref(par) if par else None
 
-        # Default ``PazBox`` style
-        self._style = {
-            'z-index': -self.INF,
-            'visible': True,
-            'border': False,
-            'border-style': 'normal',
-            'border-style:active': '',
-            'rect': (0, 0, 1, 1),
-             # margin: (top, right, bottom, left)
-            'margin': (0, 0, 0, 0),
-            'active': False,
-            'scroll-pos': (0, 0),
-            'scroll-x': True,
-            'scroll-y': True,
-            'background': u' ',
-            'background-style': 'normal',
-            'background:active': '',
-            'background-style:active': '',
-            'text': {
-                'cursor': None,
-                # If text style is not provided ``PazText`` uses
-                # background style.
-                # 'style': 'normal',
-            },
-            'tab-index': -1,
-            'activate-key': None,
-            'deactivate-key': 'KEY_ESCAPE',
-            'scroll-up-key': 'KEY_PGUP',
-            'scroll-down-key': 'KEY_PGDOWN',
-            'navigate-forwards': 'KEY_DOWN',
-            'navigate-backwards': 'KEY_UP',
-            # **
-            'original-rect': None,
-            'original-margin': None,
-        }
+        # Styles set on this instance, others are read
+        # from ``_shared_style`` (see ``get_style``).
+        self._style = { }
+        self._shared_style = self._class_style()
+        self._init_attr_styles()
 
         self._clip = None
         self._origin = None
+        # ``_draw_xy`` and ``draw_style`` write into the canvas, it is the
+        # frame buffer or the surface of the box while it is painted.
+        self._canvas = buff
+        self._surface = None
+        # Occlusion state of the current frame, ``None`` when the box is
+        # fully exposed, ``True`` when it is fully covered or a tuple
+        # (owner map, width, draw order) when it is partially covered.
+        self._occlusion = None
         # Everything must be drawn initially.
         self._draw_flags = { 'all': 1 }
 
@@ -831,9 +1265,24 @@ class PazBox(object):
             self._path = ''
         self._path += '/' + self.name
 
+        self._children_loaded = False
+        self._hidden_since = None
+
+        # Event handlers of the box (see ``_update_handlers``) and the
+        # number of subscribers of each event name in the subtree. It is
+        # ``None`` while the box has no children.
+        self._handlers = None
+        self._subtree = None
+        # ``True`` while the box is in the children of its parent.
+        self._attached = False
+
         self._behavior = [ PazBehavior(self) ]
         self._create()
 
+        if self._hidden_since == None and not self.get_style('visible'):
+            # It is hidden since it is created.
+            self._hidden_since = self.scheduler.clock.monotonic()
+
     def _create(self):
         """
         First section of this function iterates through `PazBehavior`
@@ -853,8 +1302,11 @@ class PazBox(object):
         # Styles should be initialized first since
         # behaviors are defined in styles.
 
-        for sty in self.style:
-            self._style[sty] = self.style[sty]
+        if self.style is not type(self).style:
+            # Style is given to the instance, merge it here.
+            self._shared_style = dict(self._shared_style)
+            self._shared_style.update(self.style)
+            self._init_attr_styles()
 
         self._init_styles()
 
@@ -867,6 +1319,8 @@ class PazBox(object):
                 # Append to the behavior list.
                 self._behavior.append(bhv_instance)
 
+        self._update_handlers()
+
         # 2)
         #
         # This is the first behavior call in `PazBox` object.
@@ -879,55 +1333,178 @@ class PazBox(object):
         # It must be resized here after `_init_styles` is called.
         self.resize()
         #
-        self._children()
+        if not self.get_style('lazy-children'):
+            self._children_loaded = True
+            self._children()
+
         self.schedule()
         # **
         self._run_behavior('post_create')
 
     def _init_styles(self):
-        s = self._style
-        for sty in s:
-            if sty == 'rect':
-                # Before style info, 'rect', will be modified, it is saved
-                # to 'original-rect'.
-                self.set_style('original-rect', s[sty])
-            elif  sty == 'margin':
-                self.set_style('original-margin', s[sty])
-            elif  sty == 'active':
-                if s[sty]:
-                    self.activate()
-            elif  sty == 'z-index':
-                zindex = s[sty]
-                if zindex == -self.INF:
-                    if self._parent != None:
-                        pzindex = self._parent.get_style(sty)
-                        # 'z-index' is parents 'z-index' plus 1, if it is
-                        # not defined in the style.
-                        self.set_style(sty, pzindex + 1)
-            elif  sty == 'tab-index':
-                root = self.follow_path('/root')
-                root.set_tab_index(self, s[sty])
-            elif  sty == 'background-style' or sty == 'border-style':
-                # Background and border color
-                active_sty = sty + ':active'
-                try:
-                    style = s[active_sty]
-                except KeyError:
-                    style = ''
+        # 'z-index' is parents 'z-index' plus 1, if it is
+        # not defined in the style.
+        if self.get_style('z-index') == -self.INF and self._parent != None:
+            self.set_style('z-index', self._parent.get_style('z-index') + 1)
+
+        # Before style info, 'rect', will be modified, it is saved
+        # to 'original-rect'.
+        self.set_style('original-rect', self.get_style('rect'))
+        self.set_style('original-margin', self.get_style('margin'))
 
-                if not style:
-                    self.set_style(active_sty, self.get_style(sty))
-            elif  sty == 'background':
-                # Background character
-                active_sty = sty + ':active'
+        if self.get_style('active'):
+            self.activate()
 
-                try:
-                    style = s[active_sty]
-                except KeyError:
-                    style = ''
+        root = self.follow_path('/root')
+        root.set_tab_index(self, self.get_style('tab-index'))
+
+        self.draw_flag('all', 1, propagate=True)
+
+    @classmethod
+    def event_handlers(cls):
+        """
+        Event handlers of the box class, see
+        :func:`pazgui.behavior.collect_handlers`. ``event`` overridden
+        without ``on`` is called for all events.
+
+        :return tuple: Handlers
+        """
+
+        handlers = cls.__dict__.get('_event_handlers')
+        if handlers == None:
+            handlers = collect_handlers(cls, PazBox, { 'event': False })
+            cls._event_handlers = handlers
+
+        return handlers
+
+    def _update_handlers(self):
+        """
+        Builds the handler table of the box from the handlers of its
+        behaviors and of its class. Subscriptions of the ancestors are
+        updated if the subscribed names are changed.
+        """
+
+        before = [ ]
+        after = [ ]
+        for i, bhv in enumerate(self._behavior):
+            for attr, names, post, hook in bhv.event_handlers():
+                names = tuple(n(bhv) if callable(n) else n for n in names)
+                (after if post else before).append((i, attr, hook, names))
+
+        box = [ ]
+        for attr, names, post, hook in self.event_handlers():
+            names = tuple(n(self) if callable(n) else n for n in names)
+            box.append((-1, attr, hook, names))
+
+        key = tuple(before + box + after)
+        table = _handler_tables.get(key)
+        if table == None:
+            by_name = { }
+            wildcard = [ ]
+            for owner, attr, hook, names in key:
+                handler = (owner, attr, hook)
+                if ALL_EVENTS in names:
+                    wildcard.append(handler)
+                    for handlers in by_name.values():
+                        handlers.append(handler)
+                    continue
+
+                for name in names:
+                    if name == None:
+                        continue
+
+                    handlers = by_name.setdefault(name, list(wildcard))
+                    if handler not in handlers:
+                        handlers.append(handler)
+
+            names = set(by_name)
+            if wildcard:
+                names.add(ALL_EVENTS)
+
+            table = HandlerTable(
+                { name: tuple(h) for name, h in by_name.items() },
+                tuple(wildcard), frozenset(names)
+            )
+            _handler_tables[key] = table
+
+        old = self._handlers
+        self._handlers = table
+
+        if old != None and old.names != table.names:
+            self._count_subscribers(dict.fromkeys(old.names, 1), -1)
+            self._count_subscribers(dict.fromkeys(table.names, 1), 1)
+
+    def _subscribers(self):
+        """
+        :return dict: Number of subscribers by event name in the subtree.
+        """
+
+        if self._subtree != None:
+            return self._subtree
+
+        return dict.fromkeys(self._handlers.names, 1)
+
+    def _count_subscribers(self, counts, sign):
+        """
+        Adds (or subtracts) subscriber counts to the box and to its
+        ancestors.
+
+        :arg dict counts: Number of subscribers by event name
+        :arg int sign: ``1`` to add, ``-1`` to subtract
+        """
+
+        box = self
+        while True:
+            subtree = box._subtree
+            if subtree != None:
+                for name, count in counts.items():
+                    count = subtree.get(name, 0) + sign * count
+                    if count > 0:
+                        subtree[name] = count
+                    else:
+                        subtree.pop(name, None)
+
+            if not box._attached:
+                break
+
+            box = box._parent
+
+    def _subscribed(self, name):
+        """
+        :arg str name: Event name
+        :return bool: ``True`` if a box in the subtree handles the events
+                      named ``name``.
+        """
+
+        names = self._subtree
+        if names == None:
+            names = self._handlers.names
+
+        return name in names or ALL_EVENTS in names
+
+    def _init_attr_styles(self):
+        shared = self._shared_style
+        for name, attr in self._attr_styles.items():
+            setattr(self, attr, shared[name])
+
+    @classmethod
+    def _class_style(cls):
+        """
+        Returns default styles merged with the ``style`` dictionary of
+        the class. The result is computed once per class and shared by
+        all of its instances.
 
-                if not style:
-                    self.set_style(active_sty, self.get_style(sty))
+        :return types.MappingProxyType: Read only style dictionary
+        """
+
+        merged = cls.__dict__.get('_merged_style')
+        if merged == None:
+            merged = dict(cls._default_style)
+            merged.update(cls.style)
+            merged = types.MappingProxyType(merged)
+            cls._merged_style = merged
+
+        return merged
 
     def _resize(self, box=None):
         """
@@ -966,23 +1543,66 @@ class PazBox(object):
 
         return children
 
-    def _draw_xy(self, x, y, val):
-        self._buffer.set_xy(x, y, val)
-
-    def _visible_area(self):
+    def _load_children(self):
         """
-        Calculates the visible area of a ``PazBox`` in screen coordinates.
-
-        :return tuple: A rectangle (``x1``, ``y1``, ``x2``, ``y2``) defined by
-                       upper left (``x1``, ``y1``) and lower right
-                       (``x2``, ``y2``) corners.
+        Creates children of a box with 'lazy-children' style.
         """
 
-        clip = self.position_helper('clip')
+        if self._children_loaded:
+            return
 
-        # Calculate visible area bounds.
-        area = list(clip.area)
-        # Get the character will be printed as background.
+        self._children_loaded = True
+        self._children()
+        self._run_behavior('post_children')
+
+        for child in self.child('all'):
+            self._resize(child)
+
+        self.draw_flag('all', 1, propagate=True)
+
+    def _release_children(self):
+        """
+        Removes children of a lazy box. They are created
+        again when the box is visible.
+        """
+
+        for child in list(self.child('all')):
+            self.remove_child(child)
+
+        self._children_loaded = False
+
+    def _update_lazy(self, now):
+        """
+        Loads or releases children of a lazy box according
+        to its visibility.
+
+        :arg float now: Current time in seconds.
+        """
+
+        if self.get_style('visible'):
+            self._load_children()
+        elif self._children_loaded and self._hidden_since != None:
+            release = self.get_style('lazy-release')
+            if release != None and now - self._hidden_since >= release:
+                self._release_children()
+
+    def _draw_xy(self, x, y, val):
+        self._canvas.set_xy(x, y, val)
+
+    def _visible_area(self):
+        """
+        Calculates the visible area of a ``PazBox`` in screen coordinates.
+
+        :return tuple: A rectangle (``x1``, ``y1``, ``x2``, ``y2``) defined by
+                       upper left (``x1``, ``y1``) and lower right
+                       (``x2``, ``y2``) corners.
+        """
+
+        clip = self.position_helper('clip')
+
+        # Calculate visible area bounds.
+        area = list(clip.area)
+        # Get the character will be printed as background.
         margin = self.get_margin(add_border=False)
 
         area[0] += max(0, margin[3] - clip.clipped[0])
@@ -991,7 +1611,7 @@ class PazBox(object):
         area[2] -= max(0, margin[1] - clip.clipped[2])
         area[3] -= max(0, margin[2] - clip.clipped[3])
 
-        if self.get_style('border'):
+        if self._border:
             if clip.clipped[0] == 0:
                 area[0] += 1
             if clip.clipped[1] == 0:
@@ -1020,7 +1640,7 @@ class PazBox(object):
         area = list(clip.area)
         # Get the character will be printed as background.
         margin = self.get_margin(add_border=True)
-        sx, sy = self.get_style('scroll-pos')
+        sx, sy = self._scroll_pos
 
         area[0] += margin[3] - clip.clipped[0] - sx
         area[1] += margin[0] - clip.clipped[1] - sy
@@ -1064,6 +1684,49 @@ class PazBox(object):
                 _x += 1
             _y += 1
 
+    def _draw_surface(self):
+        """
+        Paints the flagged parts of the box into its surface and
+        composites the surface into the frame buffer.
+        """
+
+        clip = self.position_helper('clip')
+        if clip == None:
+            return
+
+        paint = [ f for f in ('border', 'background', 'text')
+            if self.draw_flag(f) > 0 ]
+
+        if paint:
+            rect = self._rect
+            origin = self.position_helper('origin')
+
+            # Paint whole box as if it is not clipped.
+            self._surface.origin = origin
+            self._clip = ClipArea(
+                area=(origin[0], origin[1],
+                    origin[0] + rect[2], origin[1] + rect[3]),
+                clipped=(0, 0, 0, 0)
+            )
+            self._canvas = self._surface
+
+            try:
+                if 'border' in paint:
+                    self._draw_border()
+                if 'background' in paint:
+                    self._draw_background()
+                if 'text' in paint:
+                    self._draw_text()
+            finally:
+                self._canvas = self._buffer
+                self._clip = clip
+
+        if paint or self.draw_flag('composite') > 0:
+            self._surface.origin = self.position_helper('origin')
+            exposed = self._exposed if self._occlusion != None else None
+            self._surface.composite(
+                self._buffer, clip.area, self._z_index, exposed)
+
     def _draw_text_style(self, col, row, x, y):
         style = self._text.get_text_style(col, row)
         if style != None:
@@ -1075,13 +1738,14 @@ class PazBox(object):
         """
 
         # Return if there is no border style.
-        if self.get_style('border') == False:
+        if self._border == False:
             return
 
         # Get the rectangle in which the `PazBox` lays in local coordinates.
-        rect = self.get_style('rect')
+        rect = self._rect
         # Get how many characters the rectangle clipped from all sides.
         clip = self.position_helper('clip')
+        border_style = self.get_style('border-style')
 
         xb = (0, rect[2] - 1)
         yb = (0, rect[3] - 1)
@@ -1122,7 +1786,7 @@ class PazBox(object):
                     drawn = False
 
                 if drawn == True:
-                    self.draw_style(_x, _y, self.get_style('border-style'))
+                    self.draw_style(_x, _y, border_style)
 
     def _draw_background(self):
         """
@@ -1139,7 +1803,7 @@ class PazBox(object):
 
         # If the box has border, then the background area is
         # shrinked for 1 character from all sides.
-        if self.get_style('border') == True:
+        if self._border == True:
             if clip.clipped[0] == 0:
                 area[0] += 1
             if clip.clipped[1] == 0:
@@ -1175,11 +1839,16 @@ class PazBox(object):
         if not ev.is_target(self):
             return False
 
-        ret = self._run_behavior('pre_event', { 'ev': ev }) or False
-        # **
-        ret |= self.event(ev) or False
-        # **
-        ret |= self._run_behavior('post_event', { 'ev': ev }) or False
+        table = self._handlers
+        ret = False
+        for owner, attr, hook in table.by_name.get(ev.name, table.any):
+            if owner < 0:
+                ret |= getattr(self, attr)(ev) or False
+            elif hook:
+                ret |= getattr(self._behavior[owner], attr)({ 'ev': ev }) \
+                    or False
+            else:
+                ret |= getattr(self._behavior[owner], attr)(ev) or False
 
         return ret
 
@@ -1231,6 +1900,7 @@ class PazBox(object):
             if len(name) == 0:
                 continue
 
+            root._load_children()
             children = root.child('all')
             found = False
             for child in children:
@@ -1245,6 +1915,18 @@ class PazBox(object):
 
         return root
 
+    def _invalidate_index(self):
+        """
+        Declares that the spatial index of the root, which is used by
+        :meth:`PazGui.box_at`, should be rebuilt.
+        """
+
+        root = self
+        while root._parent != None:
+            root = root._parent
+
+        root._index_valid = False
+
     def children_count(self):
         return len(self._children_list)
 
@@ -1308,9 +1990,15 @@ class PazBox(object):
         )
         self._style['content-rect'] = content_rect
 
+        if self.get_style('cache-surface'):
+            if self._surface == None or self._surface.width != rect[2] \
+                or self._surface.height != rect[3]:
+                self._surface = BoxSurface(rect[2], rect[3])
+
         # Recalculate clip area and global position
         # after resize to save computation time.
         self._recalculate_position_helpers()
+        self._invalidate_index()
 
         # Everything must be redrawn.
         self.draw_flag('all', 1)
@@ -1329,9 +2017,9 @@ class PazBox(object):
         :return tuple: Global (`x`,`y`) coordinates.
         """
 
-        rect = self.get_style('rect')
+        rect = self._rect
         if self._parent != None:
-            pscroll = self._parent.get_style('scroll-pos')
+            pscroll = self._parent._scroll_pos
             pmargin = self._parent.get_margin()
         else:
             pscroll = (0, 0)
@@ -1353,6 +2041,12 @@ class PazBox(object):
             children.name = 'child:{}'.format(self.children_count())
 
         self._children_list.append(children)
+        self._invalidate_index()
+
+        if self._subtree == None:
+            self._subtree = dict.fromkeys(self._handlers.names, 1)
+        children._attached = True
+        self._count_subscribers(children._subscribers(), 1)
 
     def remove_child(self, child):
         if type(child) == int:
@@ -1366,13 +2060,33 @@ class PazBox(object):
             root.remove_tab_index(child)
 
             self._children_list.remove(child)
+            self._invalidate_index()
+
+            self._count_subscribers(child._subscribers(), -1)
+            child._attached = False
         except ValueError:
             # TODO: Add handler.
             pass
 
         self.draw_flag('all', 1, propagate=True)
 
-    _dynamic_styles = [ 'background', 'background-style', 'border-style' ]
+    # Active versions of these styles fall back to the normal ones
+    # when they are not set.
+    _dynamic_styles = {
+        'background': 'background:active',
+        'background-style': 'background-style:active',
+        'border-style': 'border-style:active',
+    }
+    # Styles read on every frame are kept in attributes instead of the
+    # style dictionary. Drawing code reads the attributes directly.
+    _attr_styles = {
+        'rect': '_rect',
+        'margin': '_margin',
+        'border': '_border',
+        'scroll-pos': '_scroll_pos',
+        'z-index': '_z_index',
+        'active': '_active',
+    }
     def get_style(self, name):
         """
         Styles are kept in a dictionary with a tree form. A sub-style
@@ -1381,56 +2095,84 @@ class PazBox(object):
 
         For example, one can check text style by ``name='text.style'``.
 
+        Styles set on the box are looked up first, then the shared
+        defaults of its class.
+
         :arg str name: Name of the style
         :return str: Style string
         """
 
-        style_path = name.split('.')
+        attr = self._attr_styles.get(name)
+        if attr != None:
+            return getattr(self, attr)
 
-        if not style_path:
-            return None
+        style_path = _style_path(name)
 
-        style = self._style
+        if self._active:
+            # Return active version if the ``PazBox`` is active, it is
+            # looked up on its own since the box and its class may set
+            # either of them.
+            active_name = self._dynamic_styles.get(style_path[-1])
+            if active_name != None:
+                value = self._find_style(style_path[:-1] + (active_name, ))
+                if value:
+                    return value
 
-        i = 0
-        while i < len(style_path) - 1:
-            style = style[style_path[i]]
+        return self._find_style(style_path)
 
-            i += 1
+    def _find_style(self, style_path):
+        style = self._style
+        if style_path[0] not in style:
+            style = self._shared_style
 
-        name = style_path[-1]
-        if self._style['active'] and name in self._dynamic_styles:
-            # Return active version if the ``PazBox`` is active.
-            name += ':active'
+        for key in style_path[:-1]:
+            style = style[key]
 
-        if name in style:
-            return style[name]
-        else:
-            return None
+        return style.get(style_path[-1])
 
     def set_style(self, name, value):
-        style_path = name.split('.')
-
-        if not style_path:
+        if name == 'visible' and bool(value) != bool(self.get_style(name)):
+            # Children of a lazy box are released 'lazy-release' seconds
+            # after it is hidden.
+            self._hidden_since = None if value \
+                else self.scheduler.clock.monotonic()
+
+        if name in _index_styles:
+            # Boxes found by the index and the culled ones may change.
+            self._invalidate_index()
+
+        attr = self._attr_styles.get(name)
+        if attr != None:
+            setattr(self, attr, value)
             return
 
+        style_path = _style_path(name)
+
         style = self._style
 
-        i = 0
-        while i < len(style_path) - 1:
-            style = style[style_path[i]]
+        if len(style_path) > 1:
+            first = style_path[0]
+            if first not in style:
+                # Nested styles are shared by the class, they are
+                # copied before the first modification.
+                style[first] = copy.deepcopy(
+                    dict(self._shared_style[first])
+                )
 
-            i += 1
+        for key in style_path[:-1]:
+            style = style[key]
 
-        name = style_path[-1]
+        style[style_path[-1]] = value
 
-        style[name] = value
+        if name in handler_styles and self._handlers != None:
+            # Event names of the handlers are read from this style.
+            self._update_handlers()
 
     def get_margin(self, add_border=True):
-        total_margin = self.get_style('margin')
+        total_margin = self._margin
 
         if add_border == True:
-            border = self.get_style('border')
+            border = self._border
             if border == True:
                 total_margin = tuple([val + 1 for val in total_margin])
 
@@ -1458,6 +2200,18 @@ class PazBox(object):
         self.draw_flag('background', 1)
         self.draw_flag('text', 1)
 
+    def set_spans(self, spans):
+        """
+        Set text from ``(text, style)`` pairs without building markup.
+
+        Actual implementation is in :meth:``self.PazText.set_spans``.
+        """
+
+        self._text.set_spans(spans)
+
+        self.draw_flag('background', 1)
+        self.draw_flag('text', 1)
+
     def get_text(self, raw=True):
         return self._text.get(raw)
 
@@ -1478,18 +2232,23 @@ class PazBox(object):
         return self._buffer
 
     def scroll(self, count):
-        scroll_pos = list(self.get_style('scroll-pos'))
+        scroll_pos = list(self._scroll_pos)
 
         if self.get_style('scroll-x'):
             scroll_pos[0] += count[0]
         if self.get_style('scroll-y'):
             scroll_pos[1] += count[1]
 
+        self._run_behavior('pre_scroll', count)
+        # **
         self.set_style('scroll-pos',
             tuple(scroll_pos)
         )
+        # **
+        self._run_behavior('post_scroll', count)
 
         self.draw_flag('all', 1, propagate=True)
+        self._invalidate_index()
 
     def draw_style(self, x, y, style):
         """
@@ -1501,8 +2260,24 @@ class PazBox(object):
         :arg str style: Style information
         """
 
-        z = self.get_style('z-index')
-        self._buffer.set_style(x, y, z, style)
+        if self._occlusion != None and self._canvas is self._buffer \
+            and not self._exposed(x, y):
+            return
+
+        z = self._z_index
+        self._canvas.set_style(x, y, z, style)
+
+    def _exposed(self, x, y):
+        """
+        Checks if the point (`x`, `y`) of a partially covered box is
+        not covered by an opaque box drawn later in this frame.
+        """
+
+        mask, area = self._occlusion
+        if x < area[0] or y < area[1] or x >= area[2] or y >= area[3]:
+            return False
+
+        return mask[(area[2] - area[0]) * (y - area[1]) + x - area[0]]
 
     def draw_xy(self, x, y, val, w='', params=None):
         """
@@ -1515,6 +2290,10 @@ class PazBox(object):
         :arg dict params: Extra parameters for the behavior function
         """
 
+        if self._occlusion != None and self._canvas is self._buffer \
+            and not self._exposed(x, y):
+            return
+
         self._run_behavior(
             'pre_draw_' + w, Bunch(x=x, y=y, val=val, extra=params)
         )
@@ -1566,17 +2345,41 @@ class PazBox(object):
             self._draw_flags[f] = v
 
             if v > 0:
-                ev = PazEvent('DRAW', source=self, target='/root')
-                self.event_queue(ev)
+                self.request_draw()
 
-            if propagate and (f == 'all' or f == 'background'):
+            if propagate and f in ('all', 'background', 'composite'):
                 for child in self.child('all'):
-                    child.draw_flag('all', 1, propagate)
+                    if child._surface != None:
+                        # Cached surface does not depend on the parent.
+                        child.draw_flag('composite', 1, propagate)
+                    else:
+                        child.draw_flag('all', 1, propagate)
 
             return 0
         else:
             return 0
 
+    def request_draw(self, box=None):
+        """
+        Requests a redraw from the root ``PazGui`` instance.
+
+        :arg PazBox box: Not used. It is only used for recursion.
+        """
+
+        root = self.follow_path('/root')
+        root.request_draw(self)
+
+    def batch(self):
+        """
+        Returns a context manager which collects redraw requests of
+        the mutations inside the block into a single one.
+
+        See :meth:`PazGui.batch`.
+        """
+
+        root = self.follow_path('/root')
+        return root.batch()
+
     def event_queue(self, ev):
         # Get the root GUI element which is an instance of ``PazGui``.
         root = self.follow_path('/root')
@@ -1603,7 +2406,7 @@ class PazBox(object):
             return (-1, -1, -1, -1)
 
         pos = self.to_global(0, 0)
-        rect = self.get_style('rect')
+        rect = self._rect
 
         c = self.get_style('background')
 
@@ -1624,7 +2427,7 @@ class PazBox(object):
         :return tuple: Returns 4 tuple reprsents the intersection
         """
 
-        rect = self.get_style('rect')
+        rect = self._rect
 
         if add_margin == True:
             margin = self.get_margin()
@@ -1644,7 +2447,7 @@ class PazBox(object):
 
             clipped = (0, 0, 0, 0)
 
-            return Bunch(area=area, clipped=clipped)
+            return ClipArea(area=area, clipped=clipped)
         else:
             pclip = self._parent.clip(True)
             if not pclip:
@@ -1653,7 +2456,7 @@ class PazBox(object):
                 return None
 
             parea = pclip.area
-            pscroll = self._parent.get_style('scroll-pos')
+            pscroll = self._parent._scroll_pos
 
         gorigin = list(self.position_helper('origin'))
 
@@ -1685,16 +2488,27 @@ class PazBox(object):
 
         clipped = (dx1, dy1, dx2, dy2)
 
-        return Bunch(area=area, clipped=clipped)
+        return ClipArea(area=area, clipped=clipped)
 
     def draw(self):
         """
         Main draw function
         """
 
+        if self._occlusion == True:
+            # Fully covered by opaque boxes drawn later, draw flags are
+            # kept until it is exposed.
+            return
+
         self._setup_draw()
         # **
-        if self.get_style('visible'):
+        if self._clip == None:
+            # Has never been in the visible area, e.g. laid out with
+            # no space left in its parent.
+            pass
+        elif self.get_style('visible') and self._surface != None:
+            self._draw_surface()
+        elif self.get_style('visible'):
             if self.draw_flag('border') > 0:
                 self._draw_border()
 
@@ -1750,12 +2564,14 @@ class PazBox(object):
     def hide(self):
         self.set_style('visible', False)
         self.draw_flag('all', 1)
-        self.event_queue(PazEvent('HIDE'), source=self, target=self)
+        self._invalidate_index()
+        self.event_queue(PazEvent('HIDE', source=self, target=self))
 
     def show(self):
         self.set_style('visible', True)
         self.draw_flag('all', 1)
-        self.event_queue(PazEvent('SHOW'), source=self, target=self)
+        self._invalidate_index()
+        self.event_queue(PazEvent('SHOW', source=self, target=self))
 
     def propagate_event(self, ev):
         """
@@ -1765,6 +2581,9 @@ class PazBox(object):
         :return bool: Returns ``True`` is event handled by this instance
         """
 
+        if not self._subscribed(ev.name):
+            return False
+
         if self._event(ev):
             return True
 
@@ -1880,22 +2699,70 @@ class PazMessageBox(PazBox):
                         'stretch-ratio': 1 / len(self._parent.buttons),
                     }
 
-                    def event(self, ev):
-                        if ev.cmp('PRESSED'):
-                            ev = PazEvent('MESSAGEBOX', data=self.get_text())
-                            self.event_queue(ev)
-                            self.close_messagebox()
-                            return True
+                    @on('PRESSED')
+                    def pressed(self, ev):
+                        ev = PazEvent('MESSAGEBOX', data=self.get_text())
+                        self.event_queue(ev)
+                        self.close_messagebox()
+                        return True
 
                 return [ Button ] * len(self._parent.buttons)
 
-            def event(self, ev):
-                pass
-
         return [ HBox ]
 
-    def event(self, ev):
-        pass
+
+class PazProfiler(PazBox):
+    """
+    Overlay showing the metrics of the gui. It is shown and hidden by
+    'profiler-key' and updated every 'profiler-interval' seconds. Its
+    own draw time is not measured.
+    """
+
+    name = 'profiler'
+    style = {
+        'rect': (0, 0, 64, 12),
+        'border': True,
+        'background-style': 'white_on_black',
+        'behavior': {
+            PazPanel: {
+                'text': 'Profiler',
+            },
+        },
+        'z-index': float('inf'),
+    }
+
+    def refresh(self, metrics):
+        """
+        Shows the current metrics.
+
+        :arg Metrics metrics: Metrics of the gui
+        """
+
+        timings = metrics.timings
+        def last_ms(name):
+            hist = timings.get(name)
+            if hist == None or hist.last == None:
+                return 0.0
+
+            return hist.last * 1000
+
+        width = self.get_style('content-rect')[2]
+        lines = [
+            'FPS {:6.1f}    frame {:7.2f} ms'.format(
+                metrics.fps(), last_ms('frame')),
+            'draw {:7.2f} ms   emit {:7.2f} ms'.format(
+                last_ms('draw'), last_ms('update')),
+            'event queue {}'.format(metrics.gauges.get('event-queue-depth', 0)),
+            'slowest boxes:',
+        ]
+        for path, mean in metrics.slowest_boxes(5):
+            line = '{:7.2f} ms {}'.format(mean * 1000, path)
+            if len(line) > width:
+                # Keep the end of the path.
+                line = line[:10] + '..' + line[len(line) - width + 12:]
+            lines.append(line)
+
+        self.set_text('\n'.join(lines))
 
 
 class PazGui(PazBox):
@@ -1904,6 +2771,27 @@ class PazGui(PazBox):
     Holds the main loop. Checks inputs and events, redraws screen.
     """
 
+    name = 'root'
+
+    # Priority classes of the event queue, events of a class are handled
+    # before the events of the following ones.
+    PRIORITY_INPUT = 0
+    PRIORITY_USER = 1
+    PRIORITY_SCHEDULED = 2
+    PRIORITY_DRAW = 3
+
+    # Sources of input events.
+    _input_sources = frozenset([ 'KBD', 'MOUSE', 'SYS' ])
+
+    # Log file when 'log' is not configured, its extension is replaced
+    # by '.log'.
+    default_log = __file__
+
+    # Only the last position of a drag is delivered.
+    _default_event_policies = {
+        'MOUSE_MOTION': 'coalesce-latest',
+    }
+
     def __init__(self, box_cls, config={ }, stream=None, **kwargs):
         """
         Initialize PazGui.
@@ -1919,21 +2807,82 @@ class PazGui(PazBox):
         self._config = {
             'key-timeout': 0.01,
             'loop-wait': 0.01,
+            'occlusion-culling': True,
+            # Enable mouse reporting when running in a terminal.
+            'mouse': True,
+            # Pasted text is delivered as a single 'PASTE' event.
+            'bracketed-paste': True,
+            # Seconds to wait for the rest of a paste.
+            'paste-timeout': 0.5,
+            # Decode input with ``InputDecoder`` instead of ``inkey``,
+            # which resolves a key over all pending input on each call.
+            'input-decoder': True,
+            # Seconds spent on handling events in a loop iteration, the
+            # rest are handled in the next one. ``None`` means no limit.
+            'event-budget': 0.05,
+            # Maximum number of queued events in each priority class,
+            # input events are never dropped. ``None`` means no limit.
+            'event-capacity': 10000,
+            # Queueing policies by event name (see ``_queue_event``).
+            'event-policies': { },
+            # Collect metrics (see ``pazgui.metrics``) and log them every
+            # 'metrics-log-interval' seconds if it is not ``None``.
+            'metrics': False,
+            'metrics-log-interval': None,
+            # Key showing the profiler overlay (``PazProfiler``) and
+            # seconds between its updates.
+            'profiler-key': 'KEY_F12',
+            'profiler-interval': 0.5,
+            # Write only the cells changed since the last frame.
+            'differential-update': False,
+            # ``pazgui.clock.Clock`` of the loop and the scheduled jobs,
+            # the system clock if it is ``None``.
+            'clock': None,
+            # File the inputs are recorded into (see ``pazgui.record``).
+            'record': None,
+            # Seconds between the writes of the recording.
+            'record-flush-interval': 1.0,
         }
         for n in config:
             self._config[n] = config[n]
 
         if 'log' not in self._config:
-            self._config['log'] = __file__
+            self._config['log'] = self.default_log
 
         init_logger(self._config['log'])
 
-        if stream == None:
-            self._term = Terminal()
-        else:
-            self._term = Terminal(stream=stream)
-
-        self._event_queue = [ ]
+        self._term = self._create_terminal(stream)
+
+        self._event_queue = EventQueue(4, self._config['event-capacity'])
+        self._event_policies = dict(self._default_event_policies)
+        self._event_policies.update(self._config['event-policies'])
+        # Depth of nested ``batch`` blocks and whether a redraw is
+        # requested inside them.
+        self._batch_depth = 0
+        self._batch_dirty = False
+        # Flags set while drawing (e.g. by ``PazAlwaysDraw``) are
+        # handled in the next frame without requesting one.
+        self._drawing = False
+        # Spatial index of visible boxes, it is rebuilt on the first
+        # query after a box is resized, scrolled, added or removed.
+        self._index = GridIndex()
+        self._index_valid = False
+        # Boxes partially covered in this frame, and the boxes fully
+        # covered until the index is rebuilt, see ``_cull``.
+        self._culled = [ ]
+        self._covered = [ ]
+        # ``True`` while the terminal reports mouse events.
+        self._mouse_enabled = False
+        # Keyboard file descriptor, input is read from it in bulk by
+        # ``_decoder_input`` and ``_paste_input``.
+        self._input_fd = self._input_fd_of(self._term)
+        # Input decoder and the time of the last input read by it.
+        self._decoder = None
+        self._input_time = 0
+        # Decoder of pastes while input is read with ``inkey``.
+        self._paste_decoder = None
+        # ``Recorder`` of the inputs, it is created after the boxes.
+        self._recorder = None
         self._active_box = None
         self._captured_sys_signals = [
             signal.SIGWINCH, # When window is resized.
@@ -1941,14 +2890,34 @@ class PazGui(PazBox):
         self._set_sys_signals()
 
         self._tab_indices = { }
+        self._tab_order = [ ]
+        # Removed indices left in ``_tab_order``, see ``_drop_tab_index``.
+        self._tab_stale = 0
         self._max_tab_index = -1
 
-        self.name = 'root'
+        if self._config['input-decoder']:
+            self._decoder = InputDecoder(self._term)
+
+        self.clock = self._config['clock']
+        if self.clock == None:
+            self.clock = Clock()
+        self.scheduler = Scheduler(self.clock)
+
+        self._frame_buffer = self._create_frame_buffer()
+        self._frame_buffer.differential = self._config['differential-update']
+
+        self._metrics = None
+        if self._config['metrics']:
+            self._metrics = Metrics()
+            self._frame_buffer.metrics = self._metrics
+        self._metrics_logged = self.clock.monotonic()
+        # Time spent by the last ``draw``.
+        self._draw_time = 0.0
 
-        self._frame_buffer = FrameBuffer(self._term)
         super(PazGui, self).__init__(buff=self._frame_buffer, par=None)
 
         self._behavior = [ ]
+        self._update_handlers()
 
         self.set_style('z-index', 0)
 
@@ -1961,18 +2930,66 @@ class PazGui(PazBox):
         self.height = self._term.height
 
         self.messagebox = None
+        self.profiler = None
+        self._profiler_updated = 0
+        # Metrics are collected only for the overlay, unless 'metrics'
+        # is set.
+        self._profiler_metrics = False
 
         # Resize gui according to terminal size.
         self.gui_resize(propagate=False)
 
-        # Root ``PazBox`` in the tree
-        box = box_cls(self._frame_buffer, self, **kwargs)
-        self.add_child(box)
+        with self.batch():
+            # Root ``PazBox`` in the tree
+            box = box_cls(self._frame_buffer, self, **kwargs)
+            self.add_child(box)
 
-        # Resize all boxes initially.
-        self.gui_resize()
+            # Resize all boxes initially.
+            self.gui_resize()
 
-        box.activate()
+            box.activate()
+
+        if self._config['record'] != None:
+            self._recorder = Recorder(self._config['record'], self.clock,
+                (self._term.width, self._term.height))
+            self._recording_flushed = self.clock.monotonic()
+
+    def _create_terminal(self, stream):
+        """
+        :arg io.StringIO stream: Output stream, ``None`` for stdout.
+        :return blessed.Terminal: Terminal the gui is drawn on
+        """
+
+        if stream == None:
+            return Terminal()
+
+        return Terminal(stream=stream)
+
+    def _input_fd_of(self, term):
+        """
+        :arg blessed.Terminal term: Terminal of the gui
+        :return int: File descriptor of the keyboard, ``None`` if the
+                     gui is not drawn on a terminal.
+        """
+
+        # Like ``blessed``, the keyboard is the standard input when it
+        # is a terminal.
+        if not term.is_a_tty or sys.__stdin__ == None:
+            return None
+
+        try:
+            fd = sys.__stdin__.fileno()
+        except (ValueError, OSError):
+            return None
+
+        return fd if os.isatty(fd) else None
+
+    def _create_frame_buffer(self):
+        """
+        :return FrameBuffer: Frame buffer written into the terminal
+        """
+
+        return FrameBuffer(self._term)
 
     def _set_sys_signals(self):
         for sig in self._captured_sys_signals:
@@ -1989,59 +3006,319 @@ class PazGui(PazBox):
             PazEvent(signal.Signals(signum).name, source='SYS', target=self)
         )
 
-    def _kbd_input(self):
-        inp = self._term.inkey(timeout=self._config['key-timeout'])
+    def _kbd_input(self, timeout=None):
+        """
+        Reads a key, a mouse report or a paste and places it into the
+        event queue.
+
+        :arg float timeout: Seconds to wait for input, 'key-timeout' in
+                            the configuration is used if it is ``None``.
+        :return bool: ``True`` if there was an input.
+        """
+
+        if timeout == None:
+            timeout = self._config['key-timeout']
+
+        inp = self._term.inkey(timeout=timeout)
         if not inp:
-            ev = None
-        elif inp.is_sequence:
-            ev = PazEvent(inp.name, source='KBD')
+            return False
+
+        if _kc.is_mouse_prefix(str(inp)):
+            events = self._escape_input(inp)
         else:
-            ev = PazEvent(str(inp), source='KBD')
+            events = [ self._key_event(inp) ]
 
-        if ev:
+        for ev in events:
             self.event_queue(ev)
 
-    def _process_events(self):
+        return True
+
+    def _escape_input(self, inp):
+        """
+        Reads the rest of an escape sequence which starts with ``inp``
+        if it is a paste or a mouse report.
+
+        :arg blessed.keyboard.Keystroke inp: Beginning of the sequence.
+        :return list: Events of the paste and of the input read with it,
+                      the mouse event or the events of the keys read.
+        """
+
+        keys = [ inp ]
+        text = str(inp)
+        # Keys are not put back into the terminal, ``ungetch`` appends
+        # them after the pending input.
+        while (len(text) < len(_kc.PASTE_START)
+            and _kc.PASTE_START.startswith(text)) \
+            or (self._mouse_enabled and _kc.is_mouse_prefix(text)):
+            inp = self._term.inkey(timeout=0)
+            if not inp:
+                break
+
+            keys.append(inp)
+            text += str(inp)
+
+        if text == _kc.PASTE_START:
+            return self._paste_input()
+
+        if self._mouse_enabled:
+            decoded = _kc.decode_mouse(text)
+            if decoded != None:
+                name, data = decoded
+                return [ PazEvent(name, source='MOUSE', data=data) ]
+
+        return [ self._key_event(key) for key in keys ]
+
+    def _key_event(self, inp):
+        """
+        :arg blessed.keyboard.Keystroke inp: Key read by ``inkey``
+        :return PazEvent: Keyboard event of the key
+        """
+
+        if inp.is_sequence:
+            return PazEvent(inp.name, source='KBD')
+
+        return PazEvent(str(inp), source='KBD')
+
+    def _paste_input(self):
+        """
+        Reads pasted text after the start of a bracketed paste. It is
+        read from the keyboard in bulk rather than key by key with
+        ``inkey``, so it is decoded by ``InputDecoder`` with the input
+        which follows it in the same reads.
+
+        :return list: 'PASTE' event with the text in its 'text' data and
+                      the events of the following input.
+        """
+
+        decoder = self._paste_decoder
+        if decoder == None:
+            decoder = self._paste_decoder = InputDecoder(self._term)
+
+        keys = decoder.decode(_kc.PASTE_START.encode('utf-8'))
+        # A paste waits for its end, then an incomplete sequence after
+        # it waits as long as a key.
+        while decoder.in_paste() or decoder.pending():
+            if decoder.in_paste():
+                timeout = self._config['paste-timeout']
+            else:
+                timeout = self._config['key-timeout']
+
+            data = b''
+            if self._input_fd != None:
+                data = decoder.read(self._input_fd, timeout)
+
+            # If the end sequence is lost, all of it is taken.
+            keys += decoder.decode(data, final=not data)
+
+        return self._decoded_events(keys)
+
+    def _decoded_events(self, keys):
+        """
+        :arg list keys: Keys decoded by ``InputDecoder``
+        :return list: Keyboard and mouse events of the keys
+        """
+
+        events = [ ]
+        for name, data in keys:
+            if name in _kc.MOUSE_EVENTS:
+                events.append(PazEvent(name, source='MOUSE', data=data))
+            else:
+                events.append(PazEvent(name, source='KBD', data=data))
+
+        return events
+
+    @contextlib.contextmanager
+    def _bracketed_paste(self):
+        """
+        Enables bracketed paste mode of the terminal inside the block if
+        'bracketed-paste' is set in the configuration.
+        """
+
+        enabled = bool(self._config['bracketed-paste']) \
+            and self._term.is_a_tty
+        if enabled:
+            self._term.stream.write(_kc.PASTE_ENABLE)
+            self._term.stream.flush()
+
+        try:
+            yield
+        finally:
+            if enabled:
+                self._term.stream.write(_kc.PASTE_DISABLE)
+                self._term.stream.flush()
+
+    @contextlib.contextmanager
+    def _mouse_tracking(self):
+        """
+        Enables mouse reporting of the terminal inside the block if
+        'mouse' is set in the configuration.
+        """
+
+        enabled = bool(self._config['mouse']) and self._term.is_a_tty
+        if enabled:
+            self._term.stream.write(_kc.MOUSE_ENABLE)
+            self._term.stream.flush()
+
+        self._mouse_enabled = enabled
+        try:
+            yield
+        finally:
+            self._mouse_enabled = False
+            if enabled:
+                self._term.stream.write(_kc.MOUSE_DISABLE)
+                self._term.stream.flush()
+
+    def _mouse_event(self, ev):
+        """
+        Delivers a mouse event to the topmost box under the pointer. If
+        the box does not handle it, it bubbles up to the parents.
+
+        :arg PazEvent ev: Mouse event
+        :return bool: Returns ``True`` if the event is handled
+        """
+
+        box = self.box_at(ev.get('x'), ev.get('y'))
+        while box != None and box != self:
+            if box._event(ev):
+                return True
+
+            box = box._parent
+
+        return self._event(ev)
+
+    def _process_events(self, limit=None):
+        """
+        Handles queued events in priority order until the queue is empty
+        or 'event-budget' is spent.
+
+        :arg int limit: Maximum number of handled events, ``None`` means
+                        no limit.
+        :return bool: ``True`` if an event is handled.
+        """
+
+        metrics = self._metrics
+        if metrics != None:
+            t0 = time.perf_counter()
+            metrics.gauge('event-queue-depth', len(self._event_queue))
+
+        budget = self._config['event-budget']
+        if budget != None:
+            deadline = self.clock.monotonic() + budget
+
         update = False
         ev = self.event_queue()
 
         while ev != None:
             # ``update`` is ``True`` when a ``PazBox`` handles the event.
             update |= self.propagate_event(ev) or False
+
+            if metrics != None:
+                metrics.count('events.' + ev.name)
+
+            if budget != None and self.clock.monotonic() > deadline:
+                break
+
+            if limit != None:
+                limit -= 1
+                if limit <= 0:
+                    break
+
             ev = self.event_queue()
 
+        if metrics != None:
+            metrics.observe('process-events', time.perf_counter() - t0)
+
         return update
 
+    def _decoder_input(self):
+        """
+        Reads all available input in bulk and places the keys decoded
+        by ``InputDecoder`` into the event queue.
+        """
+
+        if self._input_fd != None:
+            data = self._decoder.read(self._input_fd,
+                self._config['key-timeout'])
+        else:
+            data = b''
+
+        now = self.clock.monotonic()
+        if data:
+            self._input_time = now
+
+        # When no more input arrives, a waiting escape is the escape
+        # key. A paste waits longer for its end.
+        final = not data and (not self._decoder.in_paste()
+            or now - self._input_time > self._config['paste-timeout'])
+
+        keys = self._decoder.decode(data, final=final)
+        for ev in self._decoded_events(keys):
+            self.event_queue(ev)
+
     def _process_inputs(self):
-        self._kbd_input()
+        if self._decoder != None:
+            self._decoder_input()
+            return
+
+        # Wait for the first input only, then read all
+        # pending ones in one pass.
+        timeout = self._config['key-timeout']
+        while self._kbd_input(timeout):
+            timeout = 0
 
     def _loop_cleanup(self):
-        pass
+        now = self.clock.monotonic()
+        if self.profiler != None and now - self._profiler_updated \
+            >= self._config['profiler-interval']:
+            self._profiler_updated = now
+            self.profiler.refresh(self._metrics)
 
-    def _event(self, ev):
-        ret = self._gui_event(ev) or False
+        interval = self._config['metrics-log-interval']
+        if self._metrics != None and interval != None \
+            and now - self._metrics_logged >= interval:
+            self._log_metrics()
 
-        if ret:
-            return True
+        if self._recorder != None and now - self._recording_flushed \
+            >= self._config['record-flush-interval']:
+            self._recording_flushed = now
+            self._recorder.flush()
 
-        if not ev.is_target(self):
-            return False
+    def _log_metrics(self):
+        """
+        Writes the metrics into the log as JSON.
+        """
 
-        ret |= self._run_behavior('pre_event', { 'ev': ev }) or False
-        if ret: return True
-        #
-        ret |= self.event(ev) or False
-        if ret: return True
-        #
-        ret |= self._run_behavior('post_event', { 'ev': ev }) or False
-        if ret: return True
+        self._metrics_logged = self.clock.monotonic()
+        logger().info(json.dumps(self.metrics()))
 
-        return ret
+    def metrics(self):
+        """
+        Returns the collected metrics, see :mod:`pazgui.metrics`.
+
+        :return dict: Counters, gauges, timings, FPS and the slowest
+                      boxes, or ``None`` if 'metrics' is not enabled.
+        """
+
+        if self._metrics == None:
+            return None
+
+        return self._metrics.snapshot()
+
+    def _event(self, ev):
+        if self._gui_event(ev):
+            return True
+
+        return super(PazGui, self)._event(ev)
 
     def _gui_event(self, ev):
         if ev.cmp('SIGWINCH'):
             self._frame_buffer.resize()
-            self.gui_resize()
+            self._frame_buffer.invalidate()
+            with self.batch():
+                self.gui_resize()
+            return True
+        elif ev.cmp('DRAW'):
+            # Handling it triggers a redraw in the main loop.
             return True
         elif ev.cmp(_kc.CTRL('C')):
             print('Exiting!')
@@ -2055,38 +3332,80 @@ class PazGui(PazBox):
             return True
         elif ev.cmp('QUIT'):
             return self.on_quit(ev)
+        elif self._config['profiler-key'] != None \
+            and ev.cmp(self._config['profiler-key']):
+            self.toggle_profiler()
+            return True
+
+    def _event_queue_has(self, ev, priority=None):
+        """
+        :arg PazEvent ev: Event to be searched
+        :arg int priority: Priority class of ``ev``, all classes are
+                           searched if it is ``None``.
+        :return bool: ``True`` if an equal event is queued.
+        """
 
-    def _event_queue_has(self, ev):
-        for event in self._event_queue:
+        if priority == None:
+            queue = self._event_queue
+        else:
+            queue = self._event_queue.queue(priority)
+
+        for event in queue:
             if event.cmp(ev):
                 return True
 
         return False
 
-    def _fill_z_buffer(self, box=None):
+    def _event_priority(self, ev):
+        """
+        :arg PazEvent ev: An event
+        :return int: Priority class of the event (``PRIORITY_XXX``)
+        """
+
+        if ev.name == 'DRAW':
+            return self.PRIORITY_DRAW
+        elif ev.name == 'SCHEDULED':
+            return self.PRIORITY_SCHEDULED
+        elif type(ev.source) == str and ev.source in self._input_sources:
+            return self.PRIORITY_INPUT
+        else:
+            return self.PRIORITY_USER
+
+    def _fill_z_buffer(self, box=None, lazy=True, hidden=False):
+        """
+        :arg PazBox box: Box whose descendants are placed in the buffer
+        :arg bool lazy: Update children of lazy boxes.
+        :arg bool hidden: An ancestor of `box` is invisible, lazy boxes
+                          in its subtree do not load their children.
+        """
+
         if box == None:
             box = self
 
-        z_index = box.get_style('z-index')
+        if lazy and box.get_style('lazy-children') and not hidden:
+            box._update_lazy(self.clock.monotonic())
+
+        z_index = box._z_index
+        hidden = hidden or not box.get_style('visible')
 
         for child in box.child('all'):
-            cz_index = child.get_style('z-index')
+            cz_index = child._z_index
 
             if cz_index < z_index:
                 # If child has a smaller z-index, then dont draw it.
                 continue
 
-            if z_index not in self._z_buffer:
-                self._z_buffer[z_index] = [ ]
+            if cz_index not in self._z_buffer:
+                self._z_buffer[cz_index] = [ ]
 
-            self._z_buffer[z_index].append(child)
+            self._z_buffer[cz_index].append(child)
 
-            if z_index > self._max_z_index:
-                self._max_z_index = z_index
-            elif z_index < self._min_z_index:
-                self._min_z_index = z_index
+            if cz_index > self._max_z_index:
+                self._max_z_index = cz_index
+            elif cz_index < self._min_z_index:
+                self._min_z_index = cz_index
 
-            self._fill_z_buffer(child)
+            self._fill_z_buffer(child, lazy, hidden)
 
     def get_config(self, name):
         if name in self._config:
@@ -2099,7 +3418,10 @@ class PazGui(PazBox):
         User can activate GUI elements according to their ``tab-index``.
         In order to find the next GUI element that will be actived,
         they are placed in a dictionary in which tab indices are
-        keys and corresponding ``PazBox``es are values.
+        keys and weak references to corresponding ``PazBox``es are
+        values. Indices are also kept in the sorted list ``_tab_order``,
+        removed ones are left in it until ``_drop_tab_index`` compacts
+        it.
 
         :arg PazBox box: The ``PazBox`` instance to be added as a value
         :arg int ind: The key for the ``PazBox``
@@ -2109,26 +3431,61 @@ class PazGui(PazBox):
             return
 
         if ind > -1:
-            self._tab_indices[ind] = new_weakref(box)
             if ind > self._max_tab_index:
                 self._max_tab_index = ind
         else:
             self._max_tab_index += 1
-            self._tab_indices[self._max_tab_index] = new_weakref(box)
-            box.set_style('tab-index', self._max_tab_index)
+            ind = self._max_tab_index
+            box.set_style('tab-index', ind)
+
+        tab_indices = self._tab_indices
+        tab_order = self._tab_order
+        drop = self._drop_tab_index
+
+        def _removed(ref):
+            # Box is garbage collected without being removed.
+            if tab_indices.get(ind) is ref:
+                drop(ind)
+
+        if ind not in tab_indices:
+            pos = bisect.bisect_left(tab_order, ind)
+            if pos < len(tab_order) and tab_order[pos] == ind:
+                # A removed index is used again.
+                self._tab_stale -= 1
+            else:
+                tab_order.insert(pos, ind)
+
+        tab_indices[ind] = weakref.ref(box, _removed)
+
+    def _drop_tab_index(self, ind):
+        """
+        Removes a tab index. It is left in ``_tab_order`` and skipped by
+        ``activate_next``, the list is compacted when half of it is
+        removed indices. So removing is O(1) amortized, rather than
+        deleting from the middle of the list each time.
+
+        :arg int ind: Tab index
+        """
+
+        del self._tab_indices[ind]
+        self._tab_stale += 1
+
+        order = self._tab_order
+        if self._tab_stale * 2 > len(order):
+            order[:] = [ i for i in order if i in self._tab_indices ]
+            self._tab_stale = 0
 
     def remove_tab_index(self, box):
         if self == box:
             return
 
-        index = None
-        for _index, _box in self._tab_indices.items():
-            if _box == box:
-                index = _index
-                break
+        # Tab index of a box is kept in its style, so it is
+        # found without searching.
+        index = box.get_style('tab-index')
+        ref = self._tab_indices.get(index)
 
-        if index != None:
-            del self._tab_indices[index]
+        if ref != None and ref() == box:
+            self._drop_tab_index(index)
 
     def activate_next(self, backwards=False):
         """
@@ -2136,38 +3493,33 @@ class PazGui(PazBox):
         current active box.
         """
 
+        order = self._tab_order
+        if not order:
+            return
+
         if self._active_box:
             active_tab_index = self._active_box.get_style('tab-index')
         else:
             active_tab_index = 0
 
-        sorted_indices = sorted(self._tab_indices.keys(), reverse=backwards)
-        tab_indices_count = len(sorted_indices)
+        if not backwards:
+            ind = bisect.bisect_right(order, active_tab_index)
+            if ind == len(order):
+                ind = 0
+        else:
+            # Index -1 wraps to the last one.
+            ind = bisect.bisect_left(order, active_tab_index) - 1
 
-        tab_index = -1
-        try:
-            ind = sorted_indices.index(active_tab_index)
-            if ind + 1 < tab_indices_count:
-                tab_index = sorted_indices[ind+1]
-            else:
-                tab_index = sorted_indices[0]
-        except ValueError:
-            for i in range(tab_indices_count):
-                tab_index = sorted_indices[i]
-                if not backwards and tab_index > active_tab_index:
-                    break
-                elif backwards and tab_index < active_tab_index:
-                    break
+        # Skip removed indices, at least half of them are in use.
+        step = -1 if backwards else 1
+        while order[ind] not in self._tab_indices:
+            ind = (ind + step) % len(order)
 
-        try:
-            if tab_index > -1 and tab_index != active_tab_index:
-                self._tab_indices[tab_index].activate()
-            else:
-                self._tab_indices[sorted_indices[0]].activate()
-        except ReferenceError:
-            # For the case when a box is removed.
-            if self.children_count() > 0:
-                self.child(0).activate()
+        box = self._tab_indices[order[ind]]()
+        if box != None:
+            box.activate()
+        elif self.children_count() > 0:
+            self.child(0).activate()
 
     def gui_resize(self, propagate=True):
         """
@@ -2184,13 +3536,152 @@ class PazGui(PazBox):
             self.resize()
 
     def event_queue(self, ev=None):
-        if type(ev) == PazEvent and not self._event_queue_has(ev):
-            self._event_queue.append(ev)
-        elif ev == None:
-            if len(self._event_queue) > 0:
-                return self._event_queue.pop(0)
+        """
+        Places an event into the event queue or, if ``ev`` is ``None``,
+        takes the next event. Input events are taken first, then user
+        events, scheduled events and redraw requests (see
+        ``_event_priority``).
+
+        :arg PazEvent ev: Event to be queued
+        :return PazEvent: The next event, or ``None`` if the queue is empty.
+        """
+
+        if ev == None:
+            return self._event_queue.pop()
+        elif not isinstance(ev, PazEvent):
+            return
+
+        if self._recorder != None:
+            self._recorder.record(ev, (self._term.width, self._term.height))
+
+        priority = self._event_priority(ev)
+
+        if ev.name in _kc.MOUSE_EVENTS or ev.name in self._event_policies \
+            or (type(ev.source) == str and ev.source == 'KBD'):
+            # Repeated keys and clicks are not duplicates, policies
+            # decide about the others.
+            self._queue_event(ev, priority)
+        elif not self._event_queue_has(ev, priority):
+            self._queue_event(ev, priority)
+
+    def _queue_event(self, ev, priority):
+        """
+        Places an event into its priority class by the policy of its name
+        in 'event-policies':
+
+        * 'coalesce-latest': A queued event with the same name and target
+          is replaced in place. Input events are only coalesced with the
+          newest input, so that they are not reordered (e.g. a mouse
+          motion and a press).
+        * A callable: ``merge(queued, ev)`` returns an event which replaces
+          the queued event with the same name and target.
+        * 'drop-oldest': The oldest event with the same name (or the
+          oldest one of the class) is dropped if the class is full.
+        * 'drop-newest' (default): The new event is dropped if the class
+          is full.
+
+        :arg PazEvent ev: Event to be queued
+        :arg int priority: Priority class of the event
+        """
+
+        events = self._event_queue
+        queue = events.queue(priority)
+        policy = self._event_policies.get(ev.name)
+
+        # Queued events which may be merged with ``ev``, newest first.
+        candidates = range(len(queue) - 1, -1, -1)
+        if policy == 'coalesce-latest':
+            if priority == self.PRIORITY_INPUT:
+                candidates = candidates[:1]
+        elif not callable(policy):
+            candidates = ()
+
+        for i in candidates:
+            queued = queue[i]
+            if queued.name != ev.name:
+                continue
+
+            try:
+                if queued.target != ev.target:
+                    continue
+            except ReferenceError:
+                continue
+
+            if callable(policy):
+                queue[i] = policy(queued, ev)
             else:
-                return None
+                queue[i] = ev
+
+            events.merged[ev.name] += 1
+            return
+
+        if priority != self.PRIORITY_INPUT and events.full(priority):
+            if policy != 'drop-oldest':
+                events.dropped[ev.name] += 1
+                return
+
+            oldest = 0
+            for i, queued in enumerate(queue):
+                if queued.name == ev.name:
+                    oldest = i
+                    break
+
+            events.dropped[queue[oldest].name] += 1
+            del queue[oldest]
+
+        queue.append(ev)
+
+    def event_counters(self):
+        """
+        Numbers of events dropped or merged by the queue policies.
+
+        :return dict: 'dropped' and 'merged' counts by event name
+        """
+
+        return {
+            'dropped': dict(self._event_queue.dropped),
+            'merged': dict(self._event_queue.merged),
+        }
+
+    def request_draw(self, box=None):
+        """
+        Places a 'DRAW' event into the event queue. Inside a
+        :meth:`batch` block, only a single event is placed when
+        the outermost block exits.
+
+        :arg PazBox box: The box which requests the redraw.
+        """
+
+        if self._drawing:
+            return
+        elif self._batch_depth > 0:
+            self._batch_dirty = True
+        else:
+            self.event_queue(PazEvent('DRAW', source=box, target='/root'))
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Context manager to mutate many boxes at once. Draw flags are
+        set as usual, but redraw requests are coalesced into a single
+        'DRAW' event at the end of the block.
+
+        Example::
+
+            with gui.batch():
+                for cell in cells:
+                    cell.set_text(values[cell.name])
+        """
+
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+
+            if self._batch_depth == 0 and self._batch_dirty:
+                self._batch_dirty = False
+                self.request_draw(self)
 
     def exit(self):
         self._terminate = True
@@ -2198,7 +3689,8 @@ class PazGui(PazBox):
     def run(self):
         with self._term.fullscreen(), self._term.location(x=0, y=0),\
              self._term.raw(), self._term.keypad(),\
-             self._term.hidden_cursor():
+             self._term.hidden_cursor(), self._mouse_tracking(),\
+             self._bracketed_paste():
 
             try:
                 # Inital draw and print to screen
@@ -2207,36 +3699,72 @@ class PazGui(PazBox):
                 self.update()
 
                 while not self._terminate:
-                    # Read keyboard input.
-                    self._process_inputs()
-                    # Run scheduled events.
-                    self.scheduler.run_pending()
-                    # If ``update`` is ``True`` a ``PazBox`` handled the event
-                    # then screen must be refreshed.
-                    updated = self._process_events()
-
-                    if updated:
-                        # Fill the frame buffer.
-                        self.draw()
-                        # Print the frame buffer.
-                        # TODO: Update when all draw events are done.
-                        self.update()
-                    else:
-                        time.sleep(self._config['loop-wait'])
+                    updated = self._loop_once()
 
-                    self._loop_cleanup()
+                    if not updated and len(self._event_queue) == 0:
+                        self.clock.sleep(self._config['loop-wait'])
 
             except Exception as e:
                 # Catch all exceptions and log traceback.
                 logger().error(traceback.format_exc())
 
             self._gui_event(PazEvent('QUIT', self, self))
+            self.stop_recording()
+
+    def stop_recording(self):
+        """
+        Closes the recording of the inputs, see 'record' in the
+        configuration.
+        """
+
+        if self._recorder != None:
+            self._recorder.close()
+            self._recorder = None
+
+    def _loop_once(self, limit=None):
+        """
+        A single iteration of the main loop, reads inputs, handles events
+        and refreshes the screen if they changed it.
+
+        :arg int limit: Maximum number of handled events, see
+                        ``_process_events``.
+        :return bool: ``True`` if the screen is refreshed.
+        """
+
+        # Read keyboard input.
+        self._process_inputs()
+        # Run scheduled events.
+        self.scheduler.run_pending()
+        # If ``update`` is ``True`` a ``PazBox`` handled the event
+        # then screen must be refreshed.
+        updated = self._process_events(limit)
+
+        if updated:
+            # Fill the frame buffer.
+            self.draw()
+            # Print the frame buffer.
+            # TODO: Update when all draw events are done.
+            self.update()
+
+        self._loop_cleanup()
+
+        return updated
 
     def clear(self):
         self._frame_buffer.clear()
 
     def update(self):
+        metrics = self._metrics
+        if metrics == None:
+            self._frame_buffer.update()
+            return
+
+        t0 = time.perf_counter()
         self._frame_buffer.update()
+        dt = time.perf_counter() - t0
+
+        metrics.observe('update', dt)
+        metrics.frame(self._draw_time + dt)
 
     def draw(self, box=None):
         """
@@ -2245,18 +3773,185 @@ class PazGui(PazBox):
         :arg PazBox box: ``PazBox`` instance to be drawn
         """
 
+        metrics = self._metrics
+        if metrics != None:
+            t0 = time.perf_counter()
+
+        order = self._draw_order()
+
+        if self._config['occlusion-culling']:
+            self._cull(order)
+
+        self._drawing = True
+        try:
+            if metrics == None:
+                for box in order:
+                    box.draw()
+            else:
+                # The profiler is not included in its own measurements.
+                excluded = 0.0
+                for box in order:
+                    t = time.perf_counter()
+                    box.draw()
+                    dt = time.perf_counter() - t
+                    if isinstance(box, PazProfiler):
+                        excluded += dt
+                    else:
+                        metrics.observe_box(box.get_path(), dt)
+        finally:
+            self._drawing = False
+
+        if metrics != None:
+            self._draw_time = time.perf_counter() - t0 - excluded
+            metrics.observe('draw', self._draw_time)
+
+    def _draw_order(self, lazy=True):
+        """
+        :arg bool lazy: Update children of lazy boxes.
+        :return list: Boxes ordered according to their z-index.
+        """
+
         self._z_buffer.clear()
         # Order boxes according to their z-index
-        self._fill_z_buffer()
+        self._fill_z_buffer(lazy=lazy)
 
         z_vals = list(self._z_buffer.keys())
         z_vals.sort()
+
+        order = [ ]
         for z in z_vals:
             for box in self._z_buffer[z]:
                 if box == self:
                     continue
 
-                box.draw()
+                order.append(box)
+
+        return order
+
+    def _build_index(self):
+        width = self._frame_buffer.width
+        height = self._frame_buffer.height
+
+        self._index.clear()
+        # Covered boxes are found again with the new areas.
+        for box in self._covered:
+            box._occlusion = None
+        self._covered = [ ]
+
+        for box in self._draw_order(lazy=False):
+            if not box.get_style('visible'):
+                continue
+
+            box._recalculate_position_helpers()
+            clip = box.position_helper('clip')
+            if clip == None:
+                continue
+
+            area = (
+                max(0, clip.area[0]), max(0, clip.area[1]),
+                min(width, clip.area[2]), min(height, clip.area[3])
+            )
+            self._index.insert(area, new_weakref(box))
+
+        self._index_valid = True
+
+    def box_at(self, x, y):
+        """
+        Finds the topmost visible box at a terminal position.
+
+        :arg int x: `x` position
+        :arg int y: `y` position
+        :return PazBox: The box drawn last at (`x`, `y`) or ``None``
+        """
+
+        if not self._index_valid:
+            self._build_index()
+
+        return self._index.at(x, y)
+
+    def boxes_in(self, rect):
+        """
+        Finds the visible boxes overlapping a rectangle.
+
+        :arg tuple rect: Rectangle given by (x1, y1, x2, y2)
+        :return list: Boxes in drawing order
+        """
+
+        if not self._index_valid:
+            self._build_index()
+
+        return self._index.within(rect)
+
+    def _cull(self, order):
+        """
+        Finds the boxes to be redrawn which are covered by opaque boxes
+        drawn after them. Clip areas are taken from the spatial index,
+        so they are only recalculated after the layout changes. The
+        cells of a box covered by opaque boxes are marked in a mask of
+        its clip area. A fully covered box keeps its draw flags, it is
+        not checked again until the index is rebuilt.
+
+        :arg list order: Boxes in drawing order.
+        """
+
+        for box in self._culled:
+            box._occlusion = None
+        self._culled = [ ]
+
+        if not self._index_valid:
+            self._build_index()
+
+        dirty = [ box for box in order
+            if box._occlusion == None and max(box._draw_flags.values()) > 0 ]
+
+        width = self._frame_buffer.width
+        height = self._frame_buffer.height
+
+        for box in dirty:
+            clip = box.position_helper('clip')
+            if clip == None:
+                continue
+
+            x1 = max(0, clip.area[0])
+            y1 = max(0, clip.area[1])
+            x2 = min(width, clip.area[2])
+            y2 = min(height, clip.area[3])
+
+            if x1 >= x2 or y1 >= y2:
+                continue
+
+            # Boxes found by the index are in drawing order.
+            covers = None
+            for other in self._index.within((x1, y1, x2, y2)):
+                if covers == None:
+                    if other == box:
+                        covers = [ ]
+                elif other.get_style('opaque'):
+                    covers.append(other)
+
+            if not covers:
+                continue
+
+            w = x2 - x1
+            mask = [ True ] * w * (y2 - y1)
+            for other in covers:
+                area = other.position_helper('clip').area
+                ox1 = max(x1, area[0])
+                oy1 = max(y1, area[1])
+                ox2 = min(x2, area[2])
+                oy2 = min(y2, area[3])
+
+                row = [ False ] * (ox2 - ox1)
+                for y in range(oy1, oy2):
+                    start = w * (y - y1) + ox1 - x1
+                    mask[start:start+len(row)] = row
+
+            if True not in mask:
+                box._occlusion = True
+                self._covered.append(box)
+            else:
+                box._occlusion = (mask, (x1, y1, x2, y2))
+                self._culled.append(box)
 
     def deactivate(self, box):
         if self._active_box != box:
@@ -2299,6 +3994,17 @@ class PazGui(PazBox):
         :return bool: Returns ``True`` is event handled by this instance
         """
 
+        if ev.cmp('DRAW'):
+            # Redraw requests are only handled by the root.
+            return self._event(ev)
+        elif ev.name in _kc.MOUSE_EVENTS:
+            return self._mouse_event(ev)
+
+        target = ev.target
+        if _is_box(target) and target._attached:
+            # Only the target can handle the event.
+            return target._event(ev) or self._event(ev)
+
         if self._active_box:
             # Check the events of active box first.
             if self._active_box.propagate_event(ev):
@@ -2332,6 +4038,36 @@ class PazGui(PazBox):
 
         self.messagebox = new_weakref(box)
 
+    def toggle_profiler(self):
+        """
+        Shows or hides the profiler overlay. Metrics are collected while
+        it is shown if they are not collected already.
+        """
+
+        if self.profiler != None:
+            self.remove_child(self.profiler)
+            self.profiler = None
+
+            if self._profiler_metrics:
+                self._profiler_metrics = False
+                self._metrics = None
+                self._frame_buffer.metrics = None
+
+            return
+
+        if self._metrics == None:
+            self._profiler_metrics = True
+            self._metrics = Metrics()
+            self._frame_buffer.metrics = self._metrics
+
+        box = PazProfiler(self._frame_buffer, par=self)
+        self.add_child(box)
+        self.gui_resize()
+
+        self.profiler = new_weakref(box)
+        self._profiler_updated = self.clock.monotonic()
+        box.refresh(self._metrics)
+
     def close_messagebox(self):
         if self.messagebox:
             self.messagebox.deactivate()
@@ -0,0 +1,239 @@
+import io
+
+from pazgui.gui import PazGui, PazEvent, FrameBuffer
+from pazgui.clock import VirtualClock
+
+
+"""
+Headless renderer
+=================
+
+Runs a ``PazGui`` without a terminal. Frames are kept in memory as a
+grid of cells (a character and a style name), no escape sequences are
+generated. Events are fed and frames are rendered one at a time with
+:meth:`PazHeadlessGui.step`. Time is simulated with a ``VirtualClock``
+and moved forward by :meth:`PazHeadlessGui.advance`.
+
+Example::
+
+    gui = PazHeadlessGui(MyBox, size=(80, 24))
+    gui.step('a', 'KEY_ENTER')
+    assert gui.frame()[0].startswith('a')
+"""
+
+
+class HeadlessTerminal(object):
+    """
+    Stands in for ``blessed.Terminal``. It has a size and no input, styles
+    are not translated into escape sequences.
+    """
+
+    is_a_tty = False
+    home = ''
+    normal = ''
+
+    def __init__(self, width=80, height=24):
+        self.width = width
+        self.height = height
+        self.stream = io.StringIO()
+
+    def __getattr__(self, name):
+        # Style names (e.g. 'bold', 'black_on_white')
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        return ''
+
+    def move(self, x, y):
+        return ''
+
+    def inkey(self, timeout=None):
+        return ''
+
+    def kbhit(self, timeout=None):
+        return False
+
+    def ungetch(self, text):
+        pass
+
+
+class HeadlessFrameBuffer(FrameBuffer):
+    """
+    Frame buffer which is not written anywhere, its cells are read with
+    :meth:`cells`.
+    """
+
+    def clear(self):
+        pass
+
+    def _flush_stream(self):
+        pass
+
+    def _update(self):
+        pass
+
+    def _update_cells(self, cells, last):
+        pass
+
+    def cells(self):
+        """
+        :return list: Rows of (character, style) tuples, style is ``None``
+                      if the cell is not styled.
+        """
+
+        frame = self._frame
+        width = self.width
+
+        return [
+            [
+                (frame[y * width + x], self.get_style(x, y))
+                for x in range(width)
+            ]
+            for y in range(self.height)
+        ]
+
+    def text(self):
+        """
+        :return list: Rows of the frame as strings
+        """
+
+        width = self.width
+
+        return [
+            ''.join(self._frame[y * width:(y + 1) * width])
+            for y in range(self.height)
+        ]
+
+
+class PazHeadlessGui(PazGui):
+    """
+    ``PazGui`` drawing into a :class:`HeadlessFrameBuffer`. It has no
+    main loop, events are handled and frames are rendered by
+    :meth:`step`. The first frame is rendered when it is created.
+
+    It runs on a ``VirtualClock`` unless an other 'clock' is given in
+    its configuration.
+    """
+
+    # Iterations of the main loop made by a step, and events handled
+    # in each of them, at most.
+    max_passes = 10
+    max_events = 10000
+
+    def __init__(self, box_cls, config={ }, size=(80, 24), **kwargs):
+        """
+        :arg PazBox box_cls: Root PazBox class to be instanced.
+        :arg dict config: Gui configuration, see ``PazGui``.
+        :arg tuple size: Width and height of the screen
+        """
+
+        self._size = size
+
+        if config.get('clock') == None:
+            config = dict(config, clock=VirtualClock())
+
+        super(PazHeadlessGui, self).__init__(box_cls, config=config,
+            **kwargs)
+
+        self.draw()
+        self.update()
+
+    def _create_terminal(self, stream):
+        return HeadlessTerminal(*self._size)
+
+    def _create_frame_buffer(self):
+        return HeadlessFrameBuffer(self._term)
+
+    def _set_sys_signals(self):
+        # Resizes are done by ``resize_screen``.
+        pass
+
+    def _process_inputs(self):
+        # Inputs are given to ``step``.
+        pass
+
+    def run(self):
+        raise NotImplementedError('Headless gui is driven by step()')
+
+    def step(self, *events):
+        """
+        Handles the given events and all events queued by them, then
+        renders a frame if the screen has changed. It runs iterations of
+        the main loop until the event queue is empty.
+
+        :arg events: ``PazEvent`` objects or key names (e.g. 'a',
+                     'KEY_ENTER') which are sent from the keyboard.
+        :return bool: ``True`` if a frame is rendered.
+        :raises RuntimeError: Events are still queued after
+                              ``max_passes`` iterations, e.g. a handler
+                              queues an event each time it is called.
+        """
+
+        for ev in events:
+            if not isinstance(ev, PazEvent):
+                ev = PazEvent(ev, source='KBD')
+
+            self.event_queue(ev)
+
+        updated = False
+        for _ in range(self.max_passes):
+            updated |= self._loop_once(self.max_events)
+
+            if len(self._event_queue) == 0 or self._terminate:
+                return updated
+
+        raise RuntimeError('Events are still queued after {} passes'
+            .format(self.max_passes))
+
+    def advance(self, seconds):
+        """
+        Moves the clock forward, stepping at the due time of every
+        scheduled job on the way and at the end.
+
+        :arg float seconds: Seconds to move forward
+        :return int: Number of rendered frames
+        """
+
+        end = self.clock.monotonic() + seconds
+        frames = 0
+        while True:
+            next_run = self.scheduler.next_run
+            if next_run == None or next_run > end:
+                break
+
+            self.clock.set(next_run)
+            if self.step():
+                frames += 1
+
+        self.clock.set(end)
+        if self.step():
+            frames += 1
+
+        return frames
+
+    def resize_screen(self, width, height):
+        """
+        Resizes the screen, the new size is applied by the next
+        :meth:`step`.
+
+        :arg int width: Screen width
+        :arg int height: Screen height
+        """
+
+        self._term.width = width
+        self._term.height = height
+        self.event_queue(PazEvent('SIGWINCH', source='SYS', target=self))
+
+    def cells(self):
+        """
+        :return list: Rows of (character, style) tuples of the last frame
+        """
+
+        return self._frame_buffer.cells()
+
+    def frame(self):
+        """
+        :return list: Rows of the last frame as strings
+        """
+
+        return self._frame_buffer.text()
@@ -1,3 +1,5 @@
+import re
+
 VLINE = 0x2502
 ULCORNER = 0x250c
 URCORNER = 0x2510
@@ -12,3 +14,62 @@ def CTRL(key):
 
   return chr(ord(key) - ord('A') + 1)
 
+
+# SGR mouse reporting: button presses, motion while a button is
+# pressed and extended coordinates.
+MOUSE_ENABLE = '\x1b[?1000h\x1b[?1002h\x1b[?1006h'
+MOUSE_DISABLE = '\x1b[?1006l\x1b[?1002l\x1b[?1000l'
+
+MOUSE_EVENTS = frozenset((
+  'MOUSE_PRESS', 'MOUSE_RELEASE', 'MOUSE_MOTION',
+  'MOUSE_SCROLL_UP', 'MOUSE_SCROLL_DOWN',
+))
+
+_SGR_MOUSE = re.compile(r'\x1b\[<(\d+);(\d+);(\d+)([Mm])$')
+_SGR_MOUSE_PREFIX = re.compile(r'\x1b(\[(<[\d;]*)?)?$')
+
+def is_mouse_prefix(text):
+  """
+  Checks if ``text`` can be the beginning of an SGR mouse report.
+  """
+
+  return _SGR_MOUSE_PREFIX.match(text) != None
+
+def decode_mouse(text):
+  """
+  Decodes an SGR mouse report given as 'ESC [ < code ; x ; y M'
+  ('m' for release).
+
+  :arg str text: Escape sequence
+  :return tuple: Event name and data with 0 based 'x', 'y' and 'button',
+                 or ``None`` if ``text`` is not a mouse report.
+  """
+
+  m = _SGR_MOUSE.match(text)
+  if m == None:
+    return None
+
+  code = int(m.group(1))
+  data = {
+    'x': int(m.group(2)) - 1,
+    'y': int(m.group(3)) - 1,
+    'button': code & 3,
+  }
+
+  if code & 64:
+    name = 'MOUSE_SCROLL_DOWN' if code & 1 else 'MOUSE_SCROLL_UP'
+  elif code & 32:
+    name = 'MOUSE_MOTION'
+  elif m.group(4) == 'm':
+    name = 'MOUSE_RELEASE'
+  else:
+    name = 'MOUSE_PRESS'
+
+  return name, data
+
+# Bracketed paste mode, pasted text is sent between start and
+# end sequences.
+PASTE_ENABLE = '\x1b[?2004h'
+PASTE_DISABLE = '\x1b[?2004l'
+PASTE_START = '\x1b[200~'
+PASTE_END = '\x1b[201~'
@@ -0,0 +1,194 @@
+import time
+import collections
+
+
+"""
+Metrics
+=======
+
+Counters, gauges and timing histograms collected by ``PazGui`` when
+'metrics' is enabled in its configuration. They are read with
+:meth:`PazGui.metrics` and dumped into the log every
+'metrics-log-interval' seconds.
+
+Collected metrics are:
+
+* counters: 'events.<NAME>' for every handled event, 'frames',
+  'cells-changed' and 'bytes-written'
+* gauges: 'event-queue-depth', 'cells-changed' and 'bytes-written' of the
+  last frame
+* timings: 'process-events', 'draw', 'update' and 'frame' (draw and
+  update)
+* draw time of every box by its path
+"""
+
+
+class Histogram(object):
+    """
+    Timing histogram. Totals are kept for all samples, percentiles are
+    computed from the recent ones.
+    """
+
+    __slots__ = ( 'count', 'total', 'min', 'max', 'last', '_recent' )
+
+    def __init__(self, recent=1000):
+        """
+        :arg int recent: Number of recent samples kept for percentiles.
+        """
+
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+        self._recent = collections.deque(maxlen=recent)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.last = value
+        self._recent.append(value)
+
+        if self.min == None or value < self.min:
+            self.min = value
+        if self.max == None or value > self.max:
+            self.max = value
+
+    def mean(self):
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def percentile(self, p):
+        """
+        :arg float p: Percentile between 0 and 100
+        :return float: Percentile of the recent samples
+        """
+
+        if not self._recent:
+            return 0.0
+
+        values = sorted(self._recent)
+        ind = min(len(values) - 1, int(len(values) * p / 100))
+
+        return values[ind]
+
+    def snapshot(self):
+        """
+        :return dict: Count, total, mean, min, max, last, p50, p90 and p99
+        """
+
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.mean(),
+            'min': self.min,
+            'max': self.max,
+            'last': self.last,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+class Metrics(object):
+    """
+    Metrics of a gui: counters, gauges holding the last value, timing
+    histograms by name and the draw times of the boxes.
+    """
+
+    def __init__(self):
+        self.counters = collections.Counter()
+        self.gauges = { }
+        self.timings = { }
+        # Draw time of the boxes by their paths, (count, total, last)
+        self.boxes = { }
+        # End times of the recent frames.
+        self._frames = collections.deque(maxlen=120)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def observe(self, name, seconds):
+        """
+        :arg str name: Timing name
+        :arg float seconds: Measured time
+        """
+
+        hist = self.timings.get(name)
+        if hist == None:
+            hist = self.timings[name] = Histogram()
+
+        hist.observe(seconds)
+
+    def observe_box(self, path, seconds):
+        """
+        :arg str path: Path of the box (see ``PazBox.get_path``)
+        :arg float seconds: Draw time of the box
+        """
+
+        count, total, last = self.boxes.get(path, (0, 0.0, 0.0))
+        self.boxes[path] = (count + 1, total + seconds, seconds)
+
+    def frame(self, seconds):
+        """
+        Records a frame.
+
+        :arg float seconds: Draw and update time of the frame
+        """
+
+        self.count('frames')
+        self.observe('frame', seconds)
+        self._frames.append(time.monotonic())
+
+    def fps(self, window=1.0):
+        """
+        :arg float window: Seconds of the recent frames counted
+        :return float: Frames per second in the last ``window`` seconds
+        """
+
+        now = time.monotonic()
+        frames = [ t for t in self._frames if now - t <= window ]
+
+        return len(frames) / window
+
+    def slowest_boxes(self, n=5):
+        """
+        :arg int n: Number of boxes
+        :return list: (path, mean draw time) of the ``n`` slowest boxes
+        """
+
+        boxes = [
+            (path, total / count)
+            for path, (count, total, last) in self.boxes.items()
+        ]
+        boxes.sort(key=lambda b: b[1], reverse=True)
+
+        return boxes[:n]
+
+    def reset(self):
+        self.counters.clear()
+        self.gauges.clear()
+        self.timings.clear()
+        self.boxes.clear()
+        self._frames.clear()
+
+    def snapshot(self, boxes=10):
+        """
+        :arg int boxes: Number of the slowest boxes included
+        :return dict: Metrics in a JSON serializable dictionary
+        """
+
+        return {
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'timings': {
+                name: hist.snapshot() for name, hist in self.timings.items()
+            },
+            'fps': self.fps(),
+            'slowest-boxes': [
+                { 'path': path, 'mean': mean }
+                for path, mean in self.slowest_boxes(boxes)
+            ],
+        }
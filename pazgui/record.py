@@ -0,0 +1,256 @@
+import sys
+import gzip
+import json
+import time
+import zlib
+import argparse
+import importlib
+
+import pazgui
+from pazgui.clock import Clock
+from pazgui.metrics import Histogram
+
+
+"""
+Recording and replay
+====================
+
+A ``PazGui`` with 'record' set in its configuration writes every external
+input into a file: keys, mouse events, pastes, terminal resizes and the
+events posted by the application with a string source (e.g.
+``PazEvent('NEW_MESSAGE', source='NET', target='/root/chat')``). Events
+raised by the boxes follow from the inputs, so they are not recorded.
+
+A recording is replayed on a ``PazHeadlessGui``, at maximum speed on a
+virtual clock or at the original speed, and the frame times are
+collected::
+
+    python -m pazgui.record session.jsonl.gz myapp.main:MainBox
+
+Recordings are JSON lines, gzip compressed if the file name ends with
+'.gz'. The first line is a header, the others are either events
+``[time, name, source, target, data]`` or resizes ``[time, [width,
+height]]``. Times are seconds from the start of the recording on the
+clock of the gui.
+
+Entries are written every 'record-flush-interval' seconds of the gui, a
+compressed recording gets a gzip member on each write. So the recording
+of a killed session can be read up to its last write.
+"""
+
+FORMAT_VERSION = 1
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+
+    return open(path, mode, encoding='utf-8')
+
+
+class Recorder(object):
+    """
+    Writes the external inputs of a gui into a recording.
+    """
+
+    def __init__(self, path, clock, size, max_pending=1000):
+        """
+        :arg str path: Recording file
+        :arg Clock clock: Clock of the gui
+        :arg tuple size: Width and height of the terminal
+        :arg int max_pending: Entries are written when this many of
+                              them are waiting for :meth:`flush`.
+        """
+
+        self._fh = open(path, 'wb')
+        self._compress = path.endswith('.gz')
+        self._clock = clock
+        self._start = clock.monotonic()
+        self._size = tuple(size)
+        # Lines waiting to be written
+        self._pending = [ ]
+        self._max_pending = max_pending
+
+        self._write({
+            'pazgui': pazgui.__version__,
+            'version': FORMAT_VERSION,
+            'size': self._size,
+        })
+        self.flush()
+
+    def _write(self, entry):
+        self._pending.append(
+            json.dumps(entry, separators=(',', ':'), default=str) + '\n')
+
+        if len(self._pending) >= self._max_pending:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the pending entries into the file, as a gzip member if the
+        recording is compressed.
+        """
+
+        if self._fh == None or len(self._pending) == 0:
+            return
+
+        data = ''.join(self._pending).encode('utf-8')
+        self._pending = [ ]
+        if self._compress:
+            data = gzip.compress(data)
+
+        self._fh.write(data)
+        self._fh.flush()
+
+    def record(self, ev, size):
+        """
+        Records ``ev`` if it is an external input.
+
+        :arg PazEvent ev: Queued event
+        :arg tuple size: Width and height of the terminal
+        """
+
+        if self._fh == None:
+            return
+
+        # ``type`` does not follow weak references of boxes.
+        if type(ev.source) != str:
+            return
+
+        t = round(self._clock.monotonic() - self._start, 6)
+
+        if ev.name == 'SIGWINCH':
+            if tuple(size) != self._size:
+                self._size = tuple(size)
+                self._write([ t, self._size ])
+            return
+
+        target = ev.target
+        if type(target) != str:
+            try:
+                target = target.get_path()
+            except (AttributeError, ReferenceError):
+                return
+
+        self._write([ t, ev.name, ev.source, target, ev.data ])
+
+    def close(self):
+        if self._fh != None:
+            self.flush()
+            self._fh.close()
+            self._fh = None
+
+
+def load(path):
+    """
+    Reads a recording. A truncated recording (e.g. of a killed session)
+    is read up to its last complete entry.
+
+    :arg str path: Recording file
+    :return tuple: Header and the list of entries
+    """
+
+    lines = [ ]
+    with _open(path, 'r') as fh:
+        try:
+            for line in fh:
+                lines.append(line)
+        except (EOFError, OSError, zlib.error):
+            # Incomplete gzip member at the end
+            pass
+
+    if len(lines) > 0 and not lines[-1].endswith('\n'):
+        lines.pop()
+
+    header = json.loads(lines[0])
+    entries = [ json.loads(line) for line in lines[1:] if line.strip() ]
+
+    return header, entries
+
+
+def replay(path, box_cls, realtime=False, config={ }, **kwargs):
+    """
+    Drives a headless gui with a recording.
+
+    :arg str path: Recording file
+    :arg PazBox box_cls: Root PazBox class of the recorded application
+    :arg bool realtime: Inputs are given at their original times on the
+                        system clock, otherwise time is simulated and
+                        they are given as fast as possible.
+    :arg dict config: Gui configuration, metrics are always collected.
+    :return dict: Number of events and frames, wall clock seconds,
+                  frame time statistics and the metrics of the gui.
+    """
+
+    # Imported here, ``pazgui.gui`` imports this module.
+    from pazgui.gui import PazEvent
+    from pazgui.headless import PazHeadlessGui
+
+    header, entries = load(path)
+
+    config = dict(config, metrics=True)
+    if realtime:
+        config['clock'] = Clock()
+
+    gui = PazHeadlessGui(box_cls, config=config, size=header['size'],
+        **kwargs)
+    clock = gui.clock
+    start = clock.monotonic()
+    frame_times = Histogram(recent=100000)
+
+    def step(*events):
+        t0 = time.perf_counter()
+        if gui.step(*events):
+            frame_times.observe(time.perf_counter() - t0)
+
+    wall = time.perf_counter()
+    events = 0
+    for entry in entries:
+        due = start + entry[0]
+        if realtime:
+            # Scheduled jobs run while waiting.
+            while clock.monotonic() < due:
+                step()
+                clock.sleep(min(gui.get_config('loop-wait'),
+                    max(0.0, due - clock.monotonic())))
+        else:
+            gui.advance(due - clock.monotonic())
+
+        if len(entry) == 2:
+            gui.resize_screen(*entry[1])
+            step()
+        else:
+            t, name, source, target, data = entry
+            step(PazEvent(name, source=source, target=target, data=data))
+            events += 1
+
+        if gui._terminate:
+            break
+
+    return {
+        'events': events,
+        'frames': frame_times.count,
+        'seconds': time.perf_counter() - wall,
+        'frame-time': frame_times.snapshot(),
+        'metrics': gui.metrics(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pazgui.record',
+        description='Replays a recording and prints the frame times.')
+    parser.add_argument('recording', help='recording file')
+    parser.add_argument('box', help='root box class as module:Class')
+    parser.add_argument('--realtime', action='store_true',
+        help='replay at the original speed')
+    args = parser.parse_args(argv)
+
+    module, name = args.box.split(':')
+    box_cls = getattr(importlib.import_module(module), name)
+
+    results = replay(args.recording, box_cls, realtime=args.realtime)
+    print(json.dumps(results, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,345 @@
+import re
+import collections
+
+
+"""
+Virtual terminal
+================
+
+A minimal VT100/xterm emulator. It consumes the output written into the
+terminal (cursor movement, erasing, SGR styling) and reconstructs the
+screen, so frames can be compared regardless of how they are emitted.
+
+It can be used as the output stream of a ``blessed.Terminal`` or fed
+with the captured output::
+
+    vt = VirtualTerminal(80, 24)
+    vt.feed(stream.getvalue())
+    rows = vt.text()
+
+Characters are assumed to be a single cell wide, scroll regions,
+insert/delete operations and the alternate screen buffer are not
+emulated (entering and leaving the alternate screen clears it).
+"""
+
+# Rendition of a cell, colors are ``None`` for the default color, an
+# int for the 256 color palette or an (r, g, b) tuple.
+Attrs = collections.namedtuple('Attrs', ('fg', 'bg', 'flags'))
+DEFAULT_ATTRS = Attrs(None, None, frozenset())
+
+_SGR_FLAGS = {
+    1: 'bold', 2: 'dim', 3: 'italic', 4: 'underline', 5: 'blink',
+    7: 'reverse', 8: 'hidden', 9: 'strike',
+}
+# Flags cleared by SGR codes
+_SGR_RESETS = {
+    22: ( 'bold', 'dim' ), 23: ( 'italic', ), 24: ( 'underline', ),
+    25: ( 'blink', ), 27: ( 'reverse', ), 28: ( 'hidden', ),
+    29: ( 'strike', ),
+}
+
+_TOKEN = re.compile(
+    # CSI, private marker, parameters, intermediates and final byte
+    r'\x1b\[([<=>?]?)([\d;:]*)([ -/]*)([@-~])'
+    # OSC terminated by BEL or ST
+    r'|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)'
+    # Character set designation
+    r'|\x1b[()*+].'
+    # Other escape sequences
+    r'|\x1b([ -/]*[0-Z\\^-~])'
+    # Control characters
+    r'|[\x00-\x1a\x1c-\x1f\x7f]'
+    # Printable text
+    r'|[^\x00-\x1f\x7f]+',
+    re.DOTALL)
+# Start of an escape sequence which is not complete yet
+_INCOMPLETE = re.compile(
+    r'\x1b(\[[<=>?]?[\d;:]*[ -/]*|\][^\x07\x1b]*\x1b?|[()*+]|[ -/]*)\Z')
+
+
+class VirtualTerminal(object):
+    """
+    Screen of ``width`` x ``height`` cells, each cell is a tuple of a
+    character and its :class:`Attrs`.
+    """
+
+    def __init__(self, width=80, height=24):
+        """
+        :arg int width: Number of columns
+        :arg int height: Number of rows
+        """
+
+        self.width = width
+        self.height = height
+        # Incomplete escape sequence at the end of the last input.
+        self._pending = ''
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the screen and the counters, and homes the cursor.
+        """
+
+        self._reset_screen()
+
+        #: Bytes consumed
+        self.bytes = 0
+        #: Control and escape sequences consumed
+        self.sequences = 0
+        #: Characters printed
+        self.printed = 0
+
+    def _reset_screen(self):
+        self._screen = [
+            [ (' ', DEFAULT_ATTRS) ] * self.width for _ in range(self.height)
+        ]
+        self.x = 0
+        self.y = 0
+        self.attrs = DEFAULT_ATTRS
+        # Set after writing into the last column, the next character
+        # goes to the next line.
+        self._wrap = False
+        self._saved = (0, 0, DEFAULT_ATTRS)
+        self._pending = ''
+
+    # File interface, so it can be the stream of a terminal.
+    def write(self, data):
+        self.feed(data)
+
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def feed(self, data):
+        """
+        Consumes terminal output.
+
+        :arg str data: Output, ``bytes`` are decoded as UTF-8.
+        """
+
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', errors='replace')
+
+        self.bytes += len(data.encode('utf-8'))
+
+        text = self._pending + data
+        self._pending = ''
+        i = 0
+        n = len(text)
+
+        while i < n:
+            m = _TOKEN.match(text, i)
+            if m == None:
+                if _INCOMPLETE.match(text, i):
+                    # Sequence continues in the next input.
+                    self._pending = text[i:]
+                    break
+
+                # Unknown escape sequence, the escape is dropped.
+                i += 1
+                continue
+
+            token = m.group()
+            if token[0] == '\x1b':
+                self.sequences += 1
+                if m.group(4) != None:
+                    self._csi(m.group(1), m.group(2), m.group(4))
+                elif m.group(5) != None:
+                    self._esc(m.group(5))
+            elif token[0] < ' ' or token == '\x7f':
+                self.sequences += 1
+                self._control(token)
+            else:
+                self._print(token)
+
+            i = m.end()
+
+    def _print(self, text):
+        row = self._screen[self.y]
+        for c in text:
+            if self._wrap:
+                self._wrap = False
+                self.x = 0
+                self._line_feed()
+                row = self._screen[self.y]
+
+            row[self.x] = (c, self.attrs)
+            self.printed += 1
+
+            if self.x == self.width - 1:
+                self._wrap = True
+            else:
+                self.x += 1
+
+    def _line_feed(self):
+        if self.y == self.height - 1:
+            del self._screen[0]
+            self._screen.append([ (' ', DEFAULT_ATTRS) ] * self.width)
+        else:
+            self.y += 1
+
+    def _control(self, c):
+        if c == '\r':
+            self.x = 0
+        elif c in '\n\x0b\x0c':
+            self._line_feed()
+        elif c == '\b':
+            self.x = max(0, self.x - 1)
+        elif c == '\t':
+            self.x = min(self.width - 1, (self.x // 8 + 1) * 8)
+        else:
+            return
+
+        self._wrap = False
+
+    def _move(self, x, y):
+        self.x = max(0, min(self.width - 1, x))
+        self.y = max(0, min(self.height - 1, y))
+        self._wrap = False
+
+    def _esc(self, seq):
+        if seq == '7':
+            self._saved = (self.x, self.y, self.attrs)
+        elif seq == '8':
+            x, y, self.attrs = self._saved
+            self._move(x, y)
+        elif seq == 'c':
+            self._reset_screen()
+        elif seq == 'D':
+            self._line_feed()
+        elif seq == 'E':
+            self.x = 0
+            self._line_feed()
+        elif seq == 'M':
+            if self.y == 0:
+                del self._screen[-1]
+                self._screen.insert(0, [ (' ', DEFAULT_ATTRS) ] * self.width)
+            else:
+                self.y -= 1
+
+    def _csi(self, private, params, final):
+        args = [ int(p) if p else None for p in re.split('[;:]', params) ]
+
+        def arg(ind, default):
+            if ind < len(args) and args[ind] != None:
+                return args[ind]
+            return default
+
+        if private:
+            if private == '?' and final in 'hl' and 1049 in args:
+                self._erase(0, 0, self.width, self.height)
+                self._move(0, 0)
+            return
+
+        if final in 'Hf':
+            self._move(arg(1, 1) - 1, arg(0, 1) - 1)
+        elif final == 'A':
+            self._move(self.x, self.y - arg(0, 1))
+        elif final == 'B':
+            self._move(self.x, self.y + arg(0, 1))
+        elif final == 'C':
+            self._move(self.x + arg(0, 1), self.y)
+        elif final == 'D':
+            self._move(self.x - arg(0, 1), self.y)
+        elif final == 'E':
+            self._move(0, self.y + arg(0, 1))
+        elif final == 'F':
+            self._move(0, self.y - arg(0, 1))
+        elif final in 'G`':
+            self._move(arg(0, 1) - 1, self.y)
+        elif final == 'd':
+            self._move(self.x, arg(0, 1) - 1)
+        elif final == 'J':
+            mode = arg(0, 0)
+            if mode == 0:
+                self._erase(self.x, self.y, self.width, self.y + 1)
+                self._erase(0, self.y + 1, self.width, self.height)
+            elif mode == 1:
+                self._erase(0, 0, self.width, self.y)
+                self._erase(0, self.y, self.x + 1, self.y + 1)
+            elif mode in (2, 3):
+                self._erase(0, 0, self.width, self.height)
+        elif final == 'K':
+            mode = arg(0, 0)
+            if mode == 0:
+                self._erase(self.x, self.y, self.width, self.y + 1)
+            elif mode == 1:
+                self._erase(0, self.y, self.x + 1, self.y + 1)
+            elif mode == 2:
+                self._erase(0, self.y, self.width, self.y + 1)
+        elif final == 'X':
+            self._erase(self.x, self.y, self.x + arg(0, 1), self.y + 1)
+        elif final == 'm':
+            self._sgr(args)
+        elif final == 's':
+            self._saved = (self.x, self.y, self.attrs)
+        elif final == 'u':
+            x, y, self.attrs = self._saved
+            self._move(x, y)
+
+    def _erase(self, x1, y1, x2, y2):
+        # Erased cells keep the background color.
+        blank = (' ', Attrs(None, self.attrs.bg, frozenset()))
+        for y in range(max(0, y1), min(self.height, y2)):
+            row = self._screen[y]
+            for x in range(max(0, x1), min(self.width, x2)):
+                row[x] = blank
+
+    def _sgr(self, args):
+        fg, bg, flags = self.attrs
+        flags = set(flags)
+
+        i = 0
+        while i < len(args):
+            code = args[i] if args[i] != None else 0
+            i += 1
+
+            if code == 0:
+                fg, bg = None, None
+                flags.clear()
+            elif code in _SGR_FLAGS:
+                flags.add(_SGR_FLAGS[code])
+            elif code in _SGR_RESETS:
+                flags.difference_update(_SGR_RESETS[code])
+            elif 30 <= code <= 37:
+                fg = code - 30
+            elif 40 <= code <= 47:
+                bg = code - 40
+            elif 90 <= code <= 97:
+                fg = code - 90 + 8
+            elif 100 <= code <= 107:
+                bg = code - 100 + 8
+            elif code == 39:
+                fg = None
+            elif code == 49:
+                bg = None
+            elif code in (38, 48):
+                color = None
+                if i < len(args) and args[i] == 5:
+                    color = args[i + 1] if i + 1 < len(args) else None
+                    i += 2
+                elif i < len(args) and args[i] == 2:
+                    color = tuple(args[i + 1:i + 4])
+                    i += 4
+
+                if code == 38:
+                    fg = color
+                else:
+                    bg = color
+
+        self.attrs = Attrs(fg, bg, frozenset(flags))
+
+    def cells(self):
+        """
+        :return list: Rows of (character, :class:`Attrs`) tuples
+        """
+
+        return [ list(row) for row in self._screen ]
+
+    def text(self):
+        """
+        :return list: Rows of the screen as strings
+        """
+
+        return [ ''.join(c for c, attrs in row) for row in self._screen ]
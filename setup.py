@@ -19,7 +19,7 @@ setuptools.setup(
     packages=setuptools.find_packages(),
     python_requires=">=3.8",
     install_requires=[
-       'blessed', 'schedule',
+       'blessed',
     ],
 )
 
@@ -0,0 +1,13 @@
+import pytest
+
+from pazgui import gui as pg
+
+
+@pytest.fixture(autouse=True)
+def log_to_tmp_path(tmp_path, monkeypatch):
+    """
+    Guis log into the temporary directory of the test instead of the
+    package directory.
+    """
+
+    monkeypatch.setattr(pg.PazGui, 'default_log', str(tmp_path / 'gui.log'))
@@ -9,9 +9,8 @@ from pazgui import accessories as acc
 from tests import basic_guis
 
 
-def test_txt_output():
-    script_filename = __file__
-    output_filename = os.path.splitext(script_filename)[0] + '.txt'
+def test_txt_output(tmp_path):
+    output_filename = str(tmp_path / 'test_auto.txt')
 
     basic_guis.auto_quit()
 
@@ -0,0 +1,448 @@
+
+from pazgui import gui as pg
+from pazgui import accessories as acc
+
+
+class LazyScreen(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+        'visible': False,
+        'lazy-children': True,
+        'lazy-release': 0.0,
+    }
+
+    def children(self):
+        class Leaf(pg.PazBox):
+            style = {
+                'rect': (0, 0, 5, 5),
+            }
+
+        return [ Leaf ] * 10
+
+
+class LazyApp(pg.PazBox):
+    name = 'app'
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        class Screen1(LazyScreen):
+            name = 'screen1'
+
+        class Screen2(LazyScreen):
+            name = 'screen2'
+
+        return [ Screen1, Screen2 ]
+
+
+def test_lazy_children():
+    gui = pg.PazGui(LazyApp, stream=acc.TestOut())
+    screen1 = gui.follow_path('/root/app/screen1')
+    screen2 = gui.follow_path('/root/app/screen2')
+
+    # Resolving a path through a lazy box creates its children.
+    assert screen1.children_count() == 0
+    assert gui.follow_path('/root/app/screen1/child:3') != None
+    assert screen1.children_count() == 10
+
+    # Drawing a visible lazy box creates its children.
+    assert screen2.children_count() == 0
+    screen2.show()
+    gui.draw()
+    assert screen2.children_count() == 10
+
+    # Children are released when it is hidden for 'lazy-release' seconds.
+    screen2.hide()
+    gui.draw()
+    assert screen2.children_count() == 0
+
+
+class HiddenTab(pg.PazBox):
+    name = 'tab'
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+        'visible': False,
+    }
+
+    def children(self):
+        class Screen(LazyScreen):
+            name = 'screen'
+            style = dict(LazyScreen.style, visible=True)
+
+        return [ Screen ]
+
+
+def test_lazy_children_follow_visibility():
+    gui = pg.PazGui(LazyApp, stream=acc.TestOut())
+    screen1 = gui.follow_path('/root/app/screen1')
+
+    # Boxes invisible since they are created release their children.
+    gui.follow_path('/root/app/screen1/child:3')
+    gui.draw()
+    assert screen1.children_count() == 0
+
+    screen1.set_style('visible', True)
+    gui.draw()
+    assert screen1.children_count() == 10
+
+    screen1.set_style('visible', False)
+    gui.draw()
+    assert screen1.children_count() == 0
+
+    # Lazy boxes in a hidden subtree are not loaded.
+    gui = pg.PazGui(HiddenTab, stream=acc.TestOut())
+    tab = gui.child(0)
+    screen = tab.child(0)
+    gui.draw()
+    assert screen.children_count() == 0
+    # Other boxes in it are still drawn.
+    assert screen in gui._draw_order()
+
+    tab.show()
+    gui.draw()
+    assert screen.children_count() == 10
+
+
+def _surface_tree(cache):
+    class Root(pg.PazBox):
+        style = {
+            'rect': (0, 0, 40, 20),
+            'background': '.',
+            'border': True,
+        }
+
+        def children(self):
+            class Panel(pg.PazBox):
+                text = 'hello <t s="red">world</t>'
+                style = {
+                    'rect': (2, 1, 15, 6),
+                    'border': True,
+                    'background': 'a',
+                    'cache-surface': cache,
+                }
+
+                def children(self):
+                    class Inner(pg.PazBox):
+                        text = 'inner'
+                        style = {
+                            'rect': (1, 2, 8, 3),
+                            'background': 'c',
+                            'cache-surface': cache,
+                        }
+
+                    return [ Inner ]
+
+            return [ Panel ]
+
+    return Root
+
+
+def _frame(gui):
+    fb = gui.buffer()
+    styles = [ fb.get_style(x, y)
+        for y in range(fb.height) for x in range(fb.width) ]
+
+    return ''.join(fb._frame), styles
+
+
+def test_cached_surface_matches_direct_drawing():
+    frames = { }
+    for cache in (False, True):
+        gui = pg.PazGui(_surface_tree(cache), stream=acc.TestOut())
+        box = gui.child(0)
+
+        gui.draw()
+        frames[cache] = [ _frame(gui) ]
+
+        for delta in ((1, 2), (-3, -1)):
+            box.scroll(delta)
+            gui.draw()
+            frames[cache].append(_frame(gui))
+
+        panel = box.child(0)
+        assert (panel._surface != None) == cache
+
+    assert frames[True] == frames[False]
+
+
+def test_culling_uses_index_areas(monkeypatch):
+    gui = pg.PazGui(_occlusion_tree(), stream=acc.TestOut(),
+        config={ 'occlusion-culling': True })
+    gui.draw()
+
+    recalculated = [ ]
+    recalculate = pg.PazBox._recalculate_position_helpers
+    def counted(self):
+        recalculated.append(self)
+        recalculate(self)
+    monkeypatch.setattr(pg.PazBox, '_recalculate_position_helpers', counted)
+
+    # Nothing is drawn above the cover, and the covered box is not
+    # checked again until the layout changes.
+    covered = gui.follow_path('/root/child:0/covered')
+    cover = gui.follow_path('/root/child:0/cover')
+    cover.set_text('changed')
+    gui.draw()
+
+    assert gui._culled == [ ]
+    assert gui._covered == [ covered ]
+    # Positions are only recalculated by the drawn boxes themselves.
+    assert len(recalculated) == len(gui._draw_order()) - 1
+    assert covered not in recalculated
+
+    cover.set_style('opaque', False)
+    gui.draw()
+    assert gui._covered == [ ]
+    assert covered.draw_flag('text') == 0
+
+
+def test_cached_surface_is_composited_on_scroll():
+    gui = pg.PazGui(_surface_tree(True), stream=acc.TestOut())
+    box = gui.child(0)
+    panel = box.child(0)
+    gui.draw()
+
+    box.scroll((1, 1))
+    assert panel.draw_flag('background') == 0
+    assert panel.draw_flag('composite') == 1
+
+
+def _occlusion_tree():
+    class Root(pg.PazBox):
+        style = {
+            'rect': (0, 0, 30, 12),
+            'background': '.',
+        }
+
+        def children(self):
+            class Covered(pg.PazBox):
+                name = 'covered'
+                text = 'covered text'
+                style = {
+                    'rect': (2, 2, 8, 4),
+                    'background': 'c',
+                }
+
+            class Partial(pg.PazBox):
+                name = 'partial'
+                text = 'partial text'
+                style = {
+                    'rect': (12, 2, 12, 6),
+                    'background': 'p',
+                    'border': True,
+                }
+
+            class Cover(pg.PazBox):
+                name = 'cover'
+                style = {
+                    'rect': (1, 1, 16, 8),
+                    'background': 'X',
+                }
+
+            return [ Covered, Partial, Cover ]
+
+    return Root
+
+
+def test_occlusion_culling():
+    frames = { }
+    for culling in (False, True):
+        gui = pg.PazGui(_occlusion_tree(), stream=acc.TestOut(),
+            config={ 'occlusion-culling': culling })
+        gui.draw()
+
+        covered = gui.follow_path('/root/child:0/covered')
+        partial = gui.follow_path('/root/child:0/partial')
+        covered.set_text('changed')
+        partial.set_text('changed')
+
+        if culling:
+            gui.draw()
+            assert covered._occlusion == True
+            # Draw flags are kept until the box is exposed.
+            assert covered.draw_flag('text') == 1
+            assert type(partial._occlusion) == tuple
+        else:
+            # Without culling, only a full repaint keeps the cover on top.
+            gui.draw_flag('all', 1, propagate=True)
+            gui.draw()
+
+        frames[culling] = _frame(gui)
+
+    assert frames[True] == frames[False]
+
+
+class StyledLeaf(pg.PazBox):
+    style = {
+        'rect': (0, 0, 5, 1),
+        'background': 'l',
+        'text': { 'cursor': None },
+    }
+
+
+class StyledTree(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        return [ StyledLeaf ] * 2
+
+
+def test_shared_styles_are_not_modified():
+    gui = pg.PazGui(StyledTree, stream=acc.TestOut())
+    first, second = gui.child(0).child('all')
+
+    first.set_style('text.cursor', 1)
+    first.set_style('rect', (0, 0, 3, 1))
+
+    assert first.get_style('text.cursor') == 1
+    assert second.get_style('text.cursor') == None
+    assert StyledLeaf.style['text']['cursor'] == None
+    assert second.get_style('rect') == (0, 0, 5, 1)
+    assert pg.PazBox._default_style['rect'] == (0, 0, 1, 1)
+
+    # Active background falls back to the normal one.
+    first.activate()
+    assert first.get_style('background') == 'l'
+
+
+class ActiveLeaf(StyledLeaf):
+    style = dict(StyledLeaf.style, **{
+        'background-style': 'on_blue',
+        'background-style:active': 'on_green',
+    })
+
+
+def test_active_styles_are_overridden_separately():
+    gui = pg.PazGui(ActiveLeaf, stream=acc.TestOut())
+    box = gui.child(0)
+    box.activate()
+
+    assert box.get_style('background-style') == 'on_green'
+
+    box.set_style('background-style:active', 'on_red')
+    assert box.get_style('background-style') == 'on_red'
+
+    box = pg.PazGui(ActiveLeaf, stream=acc.TestOut()).child(0)
+    box.activate()
+    box.set_style('background-style', 'on_white')
+    # Active style of the class is still found.
+    assert box.get_style('background-style') == 'on_green'
+
+
+class Field(pg.PazBox):
+    name = 'field'
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        class Cell(pg.PazBox):
+            style = {
+                'rect': (0, 0, 4, 1),
+            }
+
+        return [ Cell ] * 10000
+
+
+def test_box_at():
+    gui = pg.PazGui(Field, stream=acc.TestOut())
+    field = gui.child(0)
+    cells = field.child('all')
+
+    # 20 columns and 25 rows of cells are stacked on each other.
+    with gui.batch():
+        for i, cell in enumerate(cells):
+            cell.set_style('original-rect',
+                (4 * (i % 20), (i // 20) % 25, 4, 1))
+            cell.resize()
+
+    # Last drawn cell is on top.
+    assert gui.box_at(0, 0) == cells[-500]
+    assert gui.box_at(5, 1) == cells[-500 + 21]
+    assert gui.box_at(1000, 1000) == None
+
+    found = gui.boxes_in((0, 0, 8, 1))
+    assert found[0] == field
+    assert len(found[1:]) == 2 * 10000 // 500
+    assert all(box.get_style('rect')[1] == 0 for box in found[1:])
+
+    with gui.batch():
+        field.scroll((0, 1))
+    assert gui.box_at(0, 0) == cells[-500 + 20]
+
+    # A query only visits the boxes in one cell of the index.
+    index = gui._index
+    visited = [ ]
+    class Items(list):
+        def __getitem__(self, ind):
+            visited.append(ind)
+            return list.__getitem__(self, ind)
+    index._items = Items(index._items)
+
+    for k in range(1000):
+        del visited[:]
+        x, y = (k * 7) % gui.width, (k * 3) % gui.height
+        gui.box_at(x, y)
+        assert len(visited) <= len(index._cells[(x // 8, y // 4)])
+        assert len(visited) < len(cells) // 10
+
+
+class SlottedCell(pg.PazBox):
+    __slots__ = ( )
+    style = {
+        'rect': (0, 0, 4, 1),
+    }
+
+
+class SlottedTree(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        return [ SlottedCell, pg.PazBox ]
+
+
+def test_boxes_without_dict():
+    gui = pg.PazGui(SlottedTree, stream=acc.TestOut())
+    gui.draw()
+    cell, box = gui.child(0).child('all')
+
+    assert not hasattr(cell, '__dict__')
+    assert not hasattr(box, '__dict__')
+    # Unnamed boxes are named by their parents.
+    assert gui.follow_path('/root/child:0/child:1') == box
+
+
+def test_z_index_orders_siblings():
+    class Root(pg.PazBox):
+        style = {
+            'rect': (0, 0, 10, 4),
+        }
+
+        def children(self):
+            class Top(pg.PazBox):
+                style = {
+                    'rect': (0, 0, 10, 4),
+                    'background': 'T',
+                    'z-index': 5,
+                }
+
+            class Bottom(pg.PazBox):
+                style = {
+                    'rect': (0, 0, 10, 4),
+                    'background': 'B',
+                }
+
+            return [ Top, Bottom ]
+
+    gui = pg.PazGui(Root, stream=acc.TestOut())
+    gui.draw()
+
+    top, bottom = gui.child(0).child('all')
+    order = gui._draw_order()
+    assert order.index(top) > order.index(bottom)
+    assert gui.buffer()._frame[0] == 'T'
@@ -0,0 +1,81 @@
+import zlib
+
+from pazgui import gui as pg
+from pazgui.clock import VirtualClock, Scheduler, CancelJob
+from pazgui.headless import PazHeadlessGui
+
+
+def test_scheduler_on_virtual_clock():
+    clock = VirtualClock()
+    scheduler = Scheduler(clock)
+    runs = [ ]
+
+    def once():
+        runs.append('once')
+        return CancelJob
+
+    scheduler.every(2).seconds.do(runs.append, 'fast')
+    scheduler.every(1).minute.do(runs.append, 'slow').tag('slow')
+    scheduler.every(3).seconds.do(once)
+
+    clock.advance(1)
+    scheduler.run_pending()
+    assert runs == [ ]
+    assert scheduler.idle_seconds() == 1
+
+    clock.advance(2)
+    scheduler.run_pending()
+    assert runs == [ 'fast', 'once' ]
+    assert len(scheduler.get_jobs()) == 2
+
+    # Missed runs are skipped.
+    clock.advance(60)
+    scheduler.run_pending()
+    assert runs == [ 'fast', 'once', 'fast', 'slow' ]
+    assert scheduler.next_run == 64
+
+    scheduler.clear('slow')
+    assert len(scheduler.get_jobs()) == 1
+
+
+class Ticker(pg.PazBox):
+    text = '0'
+    style = {
+        'rect': (0, 0, 20, 3),
+        'border': True,
+    }
+
+    def schedule(self):
+        self.ticks = 0
+        self.scheduler.every(1).seconds.do(self.tick)
+        self.scheduler.every(7).seconds.do(self.resize_box)
+
+    @pg.PazBox._scheduled
+    def tick(self):
+        self.ticks += 1
+        self.set_text(str(self.ticks))
+
+    @pg.PazBox._scheduled
+    def resize_box(self):
+        rect = self.get_style('rect')
+        self.set_style('rect', (rect[0], rect[1], 10 + self.ticks % 20, 3))
+        self.resize()
+        self.draw_flag('all', 1)
+
+
+def _session():
+    gui = PazHeadlessGui(Ticker)
+    frames = [ ]
+    for _ in range(600):
+        gui.advance(1)
+        frames.append(zlib.crc32('\n'.join(gui.frame()).encode('utf-8')))
+
+    return gui, frames
+
+
+def test_simulated_session():
+    gui, frames = _session()
+
+    assert gui.clock.monotonic() == 600
+    assert gui.frame()[1].startswith('│600')
+    assert _session()[1] == frames
@@ -0,0 +1,81 @@
+import io
+import os
+
+from blessed import Terminal
+
+from pazgui import gui as pg
+from pazgui import accessories as acc
+from pazgui.decoder import InputDecoder
+
+
+INPUT = (
+    'Hi wörld\r'.encode('utf-8')
+    + b'\x1b[A\x1b[B\x1b[C\x1b[D\x1b[5~\x1b[6~\x1b[3~\x7f\t\x1bOP\x1b[H'
+    + '日本'.encode('utf-8')
+)
+
+
+def _inkey_names(term, text):
+    term.ungetch(text)
+    names = [ ]
+    inp = term.inkey(timeout=0)
+    while inp:
+        names.append(inp.name if inp.is_sequence else str(inp))
+        inp = term.inkey(timeout=0)
+
+    return names
+
+
+def test_key_names_match_inkey():
+    term = Terminal(stream=io.StringIO())
+    decoder = InputDecoder(term)
+
+    keys = decoder.decode(INPUT, final=True)
+    assert [ name for name, data in keys ] == \
+        _inkey_names(term, INPUT.decode('utf-8'))
+
+
+def test_input_split_at_any_byte():
+    term = Terminal(stream=io.StringIO())
+    expected = InputDecoder(term).decode(INPUT, final=True)
+
+    for i in range(1, len(INPUT)):
+        decoder = InputDecoder(term)
+        keys = decoder.decode(INPUT[:i]) + decoder.decode(INPUT[i:])
+        keys += decoder.decode(b'', final=True)
+
+        assert keys == expected
+
+
+def test_escape_mouse_and_paste():
+    decoder = InputDecoder(Terminal(stream=io.StringIO()))
+
+    assert decoder.decode(b'\x1b') == [ ]
+    assert decoder.pending()
+    assert decoder.decode(b'', final=True) == [ ('KEY_ESCAPE', None) ]
+
+    keys = decoder.decode(b'\x1b[<0;3;4M\x1b[200~a\r\nb\x1b[20')
+    assert keys == [ ('MOUSE_PRESS', { 'x': 2, 'y': 3, 'button': 0 }) ]
+    assert decoder.in_paste()
+
+    keys = decoder.decode(b'1~x')
+    assert keys == [ ('PASTE', { 'text': 'a\nb' }), ('x', None) ]
+
+
+def test_gui_reads_input_fd():
+    gui = pg.PazGui(pg.PazBox, stream=acc.TestOut(),
+        config={ 'input-decoder': True, 'key-timeout': 0 })
+    gui._event_queue.clear()
+
+    rfd, wfd = os.pipe()
+    gui._input_fd = rfd
+    try:
+        os.write(wfd, b'a\x1b[Ab\x1b')
+        gui._process_inputs()
+        gui._process_inputs()
+    finally:
+        os.close(rfd)
+        os.close(wfd)
+
+    names = [ ev.name for ev in gui._event_queue ]
+    assert names == [ 'a', 'KEY_UP', 'b', 'KEY_ESCAPE' ]
@@ -0,0 +1,464 @@
+import gc
+import os
+import weakref
+
+from pazgui import gui as pg
+from pazgui import behavior as pb
+from pazgui import accessories as acc
+from pazgui import keycodes as kc
+from pazgui.decoder import InputDecoder
+
+
+class Table(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        class Cell(pg.PazBox):
+            style = {
+                'rect': (0, 0, 4, 1),
+            }
+
+        return [ Cell ] * 500
+
+
+def _draw_events(gui):
+    events = [ ]
+    ev = gui.event_queue()
+    while ev != None:
+        if ev.cmp('DRAW'):
+            events.append(ev)
+        ev = gui.event_queue()
+
+    return events
+
+
+def test_batch_coalesces_redraw_requests():
+    gui = pg.PazGui(Table, stream=acc.TestOut())
+    table = gui.child(0)
+    _draw_events(gui)
+
+    with gui.batch():
+        with table.batch():
+            for cell in table.child('all'):
+                cell.set_text('1')
+
+        assert _draw_events(gui) == [ ]
+
+    assert len(_draw_events(gui)) == 1
+    assert table.child(499).draw_flag('text') == 1
+
+    # Outside of a batch every box requests a redraw.
+    for cell in table.child('all'):
+        cell.set_text('2')
+
+    assert len(_draw_events(gui)) == 500
+
+
+def test_event_with_box_subclass():
+    gui = pg.PazGui(Table, stream=acc.TestOut())
+    table = gui.child(0)
+    cell = type(table.child(0))(table._buffer, table)
+
+    ev = pg.PazEvent('KEY_F5', source=cell, target=cell)
+    assert ev.is_source(cell) and ev.is_target(cell)
+    assert not ev.is_source(table.child(0))
+    assert ev == pg.PazEvent('KEY_F5', source=cell, target=cell)
+    assert ev != pg.PazEvent('KEY_F5', source=cell, target=table)
+
+    # Events don't keep boxes alive.
+    ref = weakref.ref(cell)
+    del cell
+    gc.collect()
+    assert ref() == None
+    assert not ev.is_source(table)
+    assert not ev.is_target(table)
+    assert ev != pg.PazEvent('KEY_F5', source=table, target=table)
+
+
+class Subscriber(pg.PazBox):
+    style = {
+        'rect': (0, 0, 4, 1),
+    }
+
+    @pb.on('PING')
+    def ping(self, ev):
+        self.set_text('pong')
+        return True
+
+
+class Forest(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        return [ Table, Subscriber ]
+
+
+def test_events_reach_subscribers_only():
+    gui = pg.PazGui(Forest, stream=acc.TestOut())
+    forest = gui.child(0)
+    table, subscriber = forest.child('all')
+
+    # Boxes without a subscriber are skipped.
+    assert gui._subscribed('PING') and forest._subscribed('PING')
+    assert not table._subscribed('PING')
+
+    assert gui.propagate_event(pg.PazEvent('PING'))
+    assert subscriber.get_text() == 'pong'
+
+    # Handlers follow the key styles.
+    cell = table.child(0)
+    cell.set_style('scroll-up-key', 'KEY_F2')
+    assert table._subscribed('KEY_F2')
+    cell.activate()
+    assert gui.propagate_event(pg.PazEvent('KEY_F2', source='KBD'))
+
+    cell.set_style('scroll-up-key', 'KEY_PGUP')
+    assert not gui._subscribed('KEY_F2')
+
+    forest.remove_child(subscriber)
+    assert not gui._subscribed('PING')
+    assert not gui.propagate_event(pg.PazEvent('PING'))
+
+
+def test_events_are_taken_by_priority():
+    gui = pg.PazGui(Table, stream=acc.TestOut(), config={ 'event-budget': 0 })
+    table = gui.child(0)
+    cell = table.child(0)
+    _draw_events(gui)
+
+    gui.request_draw(cell)
+    gui.event_queue(pg.PazEvent('SCHEDULED', cell, target='/root'))
+    gui.event_queue(pg.PazEvent('PING', cell, target=cell))
+    gui.event_queue(pg.PazEvent('a', source='KBD'))
+    gui.event_queue(pg.PazEvent('SIGWINCH', source='SYS', target=gui))
+
+    assert [ ev.name for ev in gui._event_queue ] == [
+        'a', 'SIGWINCH', 'PING', 'SCHEDULED', 'DRAW'
+    ]
+
+    # A single event is handled when the budget is spent.
+    gui._process_events()
+    assert len(gui._event_queue) == 4
+
+
+def _merge_progress(queued, ev):
+    increment = queued.get('increment') + ev.get('increment')
+    return pg.PazEvent(ev.name, ev.source, ev.target,
+        data={ 'increment': increment })
+
+
+def test_event_queue_policies():
+    gui = pg.PazGui(Table, stream=acc.TestOut(), config={
+        'event-capacity': 3,
+        'event-policies': {
+            'PROGRESSBAR': _merge_progress,
+            'NEW_MESSAGE': 'drop-oldest',
+            'STATUS': 'coalesce-latest',
+        },
+    })
+    cell = gui.child(0).child(0)
+    gui._event_queue.clear()
+
+    for _ in range(100):
+        gui.event_queue(pg.PazEvent('PROGRESSBAR', cell, cell,
+            data={ 'increment': 0.01 }))
+    gui.event_queue(pg.PazEvent('STATUS', cell, cell, data={ 'n': 1 }))
+    gui.event_queue(pg.PazEvent('STATUS', cell, cell, data={ 'n': 2 }))
+
+    events = list(gui._event_queue)
+    assert [ ev.name for ev in events ] == [ 'PROGRESSBAR', 'STATUS' ]
+    assert round(events[0].get('increment'), 6) == 1.0
+    assert events[1].get('n') == 2
+
+    for i in range(3):
+        gui.event_queue(pg.PazEvent('NEW_MESSAGE', cell, cell,
+            data={ 'message': i }))
+    gui.event_queue(pg.PazEvent('PING', cell, cell))
+
+    events = list(gui._event_queue)
+    assert [ ev.name for ev in events ] == [
+        'PROGRESSBAR', 'STATUS', 'NEW_MESSAGE'
+    ]
+    assert events[2].get('message') == 2
+
+    # Input is never dropped.
+    for c in 'hello':
+        gui.event_queue(pg.PazEvent(c, source='KBD'))
+    assert len(gui._event_queue) == 8
+
+    assert gui.event_counters() == {
+        'dropped': { 'NEW_MESSAGE': 2, 'PING': 1 },
+        'merged': { 'PROGRESSBAR': 99, 'STATUS': 1 },
+    }
+
+
+def test_interleaved_feed_is_coalesced():
+    gui = pg.PazGui(Table, stream=acc.TestOut(), config={
+        'event-capacity': 5,
+        'event-policies': { 'PROGRESS': 'coalesce-latest' },
+    })
+    cell = gui.child(0).child(0)
+    gui._event_queue.clear()
+
+    for i in range(10):
+        gui.event_queue(pg.PazEvent('PROGRESS', cell, cell,
+            data={ 'value': i }))
+        gui.event_queue(pg.PazEvent('NEW_MESSAGE', cell, cell,
+            data={ 'message': i }))
+        gui.event_queue(pg.PazEvent('TICK{}'.format(i), cell, cell))
+
+    events = list(gui._event_queue)
+    progress = [ ev.get('value') for ev in events if ev.name == 'PROGRESS' ]
+    assert progress == [ 9 ]
+    assert gui.event_counters()['merged'] == { 'PROGRESS': 9 }
+    assert 'PROGRESS' not in gui.event_counters()['dropped']
+
+
+def test_tab_order():
+    gui = pg.PazGui(Table, stream=acc.TestOut())
+    table = gui.child(0)
+    cells = list(table.child('all'))
+
+    assert gui._tab_order == sorted(gui._tab_indices)
+
+    cells[10].activate()
+    gui.activate_next()
+    assert gui._active_box == cells[11]
+    gui.activate_next(backwards=True)
+    gui.activate_next(backwards=True)
+    assert gui._active_box == cells[9]
+
+    # Removed boxes are skipped.
+    table.remove_child(cells[10])
+    gui.activate_next()
+    assert gui._active_box == cells[11]
+    assert cells[10].get_style('tab-index') not in gui._tab_indices
+
+    # Last one wraps to the first one.
+    cells[-1].activate()
+    gui.activate_next()
+    assert gui._active_box == gui._tab_indices[gui._tab_order[0]]()
+
+    # Removed indices are dropped when they are half of the order.
+    assert cells[10].get_style('tab-index') in gui._tab_order
+    with gui.batch():
+        for cell in cells[:len(cells) // 2 + 1]:
+            table.remove_child(cell)
+    assert gui._tab_order == sorted(gui._tab_indices)
+
+
+class Clickable(pg.PazBox):
+    def __init__(self, *args, **kwargs):
+        self.clicks = [ ]
+        super().__init__(*args, **kwargs)
+
+    def event(self, ev):
+        if ev.name.startswith('MOUSE_'):
+            self.clicks.append((ev.name, ev.get('x'), ev.get('y')))
+            return self.name == 'front'
+
+
+class Mouse(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        class Back(Clickable):
+            name = 'back'
+            style = {
+                'rect': (0, 0, 10, 5),
+            }
+
+        class Front(Clickable):
+            name = 'front'
+            style = {
+                'rect': (5, 0, 10, 5),
+            }
+
+        return [ Back, Front ]
+
+
+def _mouse_gui():
+    gui = pg.PazGui(Mouse, stream=acc.TestOut(), config={ 'key-timeout': 0 })
+    gui._mouse_enabled = True
+    gui._event_queue.clear()
+
+    return gui
+
+
+def test_mouse_events_are_routed_to_topmost_box():
+    gui = _mouse_gui()
+    back = gui.follow_path('/root/child:0/back')
+    front = gui.follow_path('/root/child:0/front')
+
+    gui._term.ungetch('\x1b[<0;7;2M\x1b[<0;2;3m\x1b[<65;7;1M')
+    for _ in range(3):
+        gui._kbd_input()
+    gui._process_events()
+
+    assert front.clicks == [
+        ('MOUSE_PRESS', 6, 1), ('MOUSE_SCROLL_DOWN', 6, 0)
+    ]
+    assert back.clicks == [ ('MOUSE_RELEASE', 1, 2) ]
+
+
+def test_mouse_motion_is_coalesced():
+    gui = _mouse_gui()
+
+    gui._term.ungetch(''.join(
+        '\x1b[<32;{};1M'.format(x) for x in range(1, 30)
+    ))
+    for _ in range(29):
+        gui._kbd_input()
+
+    events = [ ]
+    ev = gui.event_queue()
+    while ev != None:
+        events.append(ev)
+        ev = gui.event_queue()
+
+    assert [ ev.name for ev in events ] == [ 'MOUSE_MOTION' ]
+    assert events[0].get('x') == 28
+
+
+def test_mouse_motion_is_not_coalesced_across_a_press():
+    gui = _mouse_gui()
+
+    gui._term.ungetch('\x1b[<32;2;1M\x1b[<32;3;1M\x1b[<0;3;1M'
+        '\x1b[<32;4;1M\x1b[<32;5;1M')
+    for _ in range(5):
+        gui._kbd_input()
+
+    events = [ ]
+    ev = gui.event_queue()
+    while ev != None:
+        events.append((ev.name, ev.get('x')))
+        ev = gui.event_queue()
+
+    assert events == [
+        ('MOUSE_MOTION', 2), ('MOUSE_PRESS', 2), ('MOUSE_MOTION', 4)
+    ]
+
+
+def test_escape_key_is_not_a_mouse_event():
+    gui = _mouse_gui()
+
+    gui._term.ungetch('\x1b')
+    gui._kbd_input()
+
+    assert [ ev.name for ev in gui._event_queue ] == [ 'KEY_ESCAPE' ]
+
+
+class Editor(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+        'behavior': { pb.PazTextArea: None },
+    }
+
+
+class LineEditor(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1),
+        'behavior': { pb.PazTextBox: None },
+    }
+
+
+def _input_gui(box_cls, decoder=True):
+    gui = pg.PazGui(box_cls, stream=acc.TestOut(),
+        config={ 'key-timeout': 0, 'input-decoder': decoder })
+    gui._event_queue.clear()
+
+    return gui
+
+
+def _keyboard(gui, tmp_path, text):
+    """
+    Places ``text`` into the keyboard of ``gui``.
+    """
+
+    path = tmp_path / 'keyboard'
+    path.write_bytes(text.encode('utf-8'))
+    gui._input_fd = os.open(str(path), os.O_RDONLY)
+
+
+def _counted(monkeypatch, cls, name):
+    """
+    Counts the calls of the method ``name`` of ``cls``.
+    """
+
+    calls = [ ]
+    method = getattr(cls, name)
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return method(*args, **kwargs)
+
+    monkeypatch.setattr(cls, name, counted)
+
+    return calls
+
+
+def test_pending_input_is_drained_in_one_pass(tmp_path, monkeypatch):
+    gui = _input_gui(Editor)
+    decoded = _counted(monkeypatch, InputDecoder, 'decode')
+
+    _keyboard(gui, tmp_path, 'hello' * 800)
+    gui._process_inputs()
+    os.close(gui._input_fd)
+
+    # All of the input is decoded at once.
+    assert len(decoded) == 1
+
+    assert [ ev.name for ev in gui._event_queue ] == list('hello' * 800)
+
+    gui._process_events()
+    assert gui.child(0)._text._raw_text.startswith('hello')
+
+
+def _paste(gui, tmp_path, text):
+    """
+    Starts a paste for ``inkey``, the rest of ``text`` is read from the
+    keyboard.
+    """
+
+    _keyboard(gui, tmp_path, text)
+    gui._term.ungetch(kc.PASTE_START)
+
+
+def test_paste_is_inserted_at_once(tmp_path, monkeypatch):
+    gui = _input_gui(Editor, decoder=False)
+    modified = _counted(monkeypatch, pg.PazBox.PazText, 'modify')
+
+    text = ('<lorem> & ipsum\r\n' * 60000)[:1000000]
+    _paste(gui, tmp_path, text + kc.PASTE_END + 'x\x1b[A')
+
+    gui._process_inputs()
+    os.close(gui._input_fd)
+    assert [ ev.name for ev in gui._event_queue ] == [ 'PASTE', 'x', 'KEY_UP' ]
+    # The paste may spend the event budget, 'x' is handled next.
+    while len(gui._event_queue) > 0:
+        gui._process_events()
+    gui.draw()
+    # The paste and 'x'
+    assert len(modified) == 2
+
+    raw_text = gui.child(0)._text._raw_text
+    expected = text.replace('\r\n', '\n').replace('<', '\x01') \
+        .replace('>', '\x02').replace('&', '\x03')
+    assert raw_text.startswith(expected + 'x')
+
+
+def test_paste_drops_filtered_keys(tmp_path):
+    gui = _input_gui(LineEditor, decoder=False)
+
+    _paste(gui, tmp_path, 'one\rtwo' + kc.PASTE_END)
+    gui._process_inputs()
+    os.close(gui._input_fd)
+    gui._process_events()
+
+    assert gui.child(0)._text._raw_text.startswith('onetwo')
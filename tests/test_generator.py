@@ -0,0 +1,34 @@
+import zlib
+
+from pazgui import gui as pg
+from pazgui import accessories as acc
+from pazgui import generator
+
+
+def _render(root):
+    gui = pg.PazGui(root, stream=acc.TestOut())
+    gui.draw()
+    gui.update()
+
+    return gui
+
+
+def _count(box):
+    return 1 + sum(_count(c) for c in box.child('all'))
+
+
+def test_generated_tree_size():
+    for depth, fanout in [ (0, 4), (2, 3), (3, 4) ]:
+        gui = _render(generator.generate(seed=3, depth=depth, fanout=fanout))
+
+        assert _count(gui.child(0)) == generator.tree_size(depth, fanout)
+
+
+def test_generator_is_deterministic():
+    frames = [ ]
+    for seed in [ 1, 1, 2 ]:
+        gui = _render(generator.generate(seed=seed, depth=3, fanout=4))
+        frames.append(zlib.crc32(gui._term.stream.getvalue().encode()))
+
+    assert frames[0] == frames[1]
+    assert frames[0] != frames[2]
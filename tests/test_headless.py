@@ -0,0 +1,71 @@
+import pytest
+
+from pazgui import gui as pg
+from pazgui import behavior as pb
+from pazgui import accessories as acc
+from pazgui.headless import PazHeadlessGui
+from tests import basic_guis
+
+
+class Editor(pg.PazBox):
+    style = {
+        'rect': (0, 0, 20, 3),
+        'border': True,
+        'border-style': 'green',
+        'behavior': {
+            pb.PazTextArea: { },
+        },
+    }
+
+
+def test_headless_frame_matches_terminal_output():
+    for cls in [ basic_guis.PazBox02WithBackgroundandBorder2_1,
+                 basic_guis.PazBox05HVBox03 ]:
+        stream = acc.TestOut()
+        gui = pg.PazGui(cls, stream=stream)
+        gui.draw()
+        gui.clear()
+        gui.update()
+
+        headless = PazHeadlessGui(cls)
+
+        assert ''.join(row + '\n' for row in headless.frame()) \
+            == stream.get_frame((80, 24), (80, 24))
+
+
+def test_headless_step():
+    gui = PazHeadlessGui(Editor, size=(40, 10))
+
+    assert len(gui.frame()) == 10
+    assert gui.cells()[0][0] == ('┌', 'green')
+
+    assert gui.step('h', 'i') == True
+    assert gui.frame()[1].startswith('│hi')
+    assert gui.step() == False
+
+    gui.resize_screen(30, 5)
+    gui.step()
+
+    assert [ len(row) for row in gui.frame() ] == [ 30 ] * 5
+
+
+class Echo(pg.PazBox):
+    style = {
+        'rect': (0, 0, 4, 1),
+    }
+
+    @pb.on('PING')
+    def ping(self, ev):
+        # Always queues the next one.
+        self.new_event('PING', queue=True)
+        return True
+
+
+def test_headless_step_is_bounded():
+    gui = PazHeadlessGui(Echo)
+    gui.max_events = 100
+
+    with pytest.raises(RuntimeError):
+        gui.step(pg.PazEvent('PING', source='NET', target='/root/'))
+
+    assert [ ev.name for ev in gui._event_queue ].count('PING') == 1
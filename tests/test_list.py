@@ -0,0 +1,73 @@
+from pazgui import gui as pg
+from pazgui import behavior as pb
+from pazgui import accessories as acc
+
+
+ITEMS = [ 'item {}'.format(i) for i in range(100000) ]
+
+
+class Row(pg.PazBox):
+    style = {
+        'behavior': {
+            pb.PazButton: { },
+        },
+    }
+
+
+class ListBox(pg.PazBox):
+    style = {
+        'rect': (0, 0, 20, 10),
+        'behavior': {
+            pb.PazList: {
+                'source': ITEMS,
+                'row': Row,
+                'row-height': 2,
+            },
+        },
+    }
+
+
+def _shown(box):
+    rows = [ row for row in box.child('all') if row.get_style('visible') ]
+
+    return sorted([ row.get_text() for row in rows ],
+        key=lambda t: int(t.split()[1]))
+
+
+def test_list_creates_visible_rows_only():
+    gui = pg.PazGui(ListBox, stream=acc.TestOut())
+    box = gui.child(0)
+
+    assert box.children_count() == 10 // 2 + 2
+    assert _shown(box)[0] == 'item 0'
+
+
+def test_list_rebinds_on_scroll():
+    gui = pg.PazGui(ListBox, stream=acc.TestOut())
+    box = gui.child(0)
+    rows = list(box.child('all'))
+
+    box.scroll((0, 2 * 5000))
+
+    assert box.child('all') == rows
+    assert _shown(box)[0] == 'item 5000'
+
+    # Scrolling is clamped to the end of the list.
+    box.scroll((0, 10 ** 9))
+    assert _shown(box)[-1] == 'item 99999'
+
+
+def test_list_navigation_scrolls():
+    gui = pg.PazGui(ListBox, stream=acc.TestOut())
+    box = gui.child(0)
+    lst = box.get_behavior(pb.PazList)
+
+    lst.select(0)
+    for _ in range(20):
+        box.propagate_event(pg.PazEvent('KEY_DOWN', source='KBD'))
+
+    active = [ row for row in box.child('all') if row.get_style('active') ]
+    assert len(active) == 1
+    assert lst.index_of(active[0]) == 20
+    assert active[0].get_text() == 'item 20'
+    assert box.get_style('scroll-pos')[1] == 2 * 21 - 10
@@ -0,0 +1,125 @@
+import json
+import logging
+
+from pazgui import gui as pg
+from pazgui import accessories as acc
+
+
+class Cell(pg.PazBox):
+    text = 'cell'
+    style = {
+        'rect': (0, 0, 8, 1),
+    }
+
+
+class Grid(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+    }
+
+    def children(self):
+        return [ Cell ] * 10
+
+
+def _frame(gui):
+    gui._process_events()
+    gui.draw()
+    gui.update()
+
+
+def test_metrics_are_disabled_by_default():
+    gui = pg.PazGui(Grid, stream=acc.TestOut())
+    _frame(gui)
+
+    assert gui.metrics() == None
+
+
+def test_metrics():
+    gui = pg.PazGui(Grid, stream=acc.TestOut(), config={ 'metrics': True })
+    _frame(gui)
+
+    metrics = gui.metrics()
+    width, height = gui._frame_buffer.width, gui._frame_buffer.height
+    assert metrics['counters']['frames'] == 1
+    assert metrics['counters']['events.DRAW'] >= 1
+    assert metrics['gauges']['cells-changed'] == width * height
+    assert metrics['gauges']['bytes-written'] >= width * height
+    for name in ('process-events', 'draw', 'update', 'frame'):
+        assert metrics['timings'][name]['count'] == 1
+
+    paths = [ box['path'] for box in metrics['slowest-boxes'] ]
+    assert paths and all(p.startswith('/root/') for p in paths)
+
+    # Only the changed cells are counted.
+    gui.child(0).child(9).set_text('CELL')
+    _frame(gui)
+    assert gui.metrics()['gauges']['cells-changed'] == 4
+
+
+def test_metrics_are_logged(caplog, tmp_path):
+    gui = pg.PazGui(Grid, stream=acc.TestOut(), config={
+        'metrics': True,
+        'metrics-log-interval': 0,
+        'log': str(tmp_path / 'metrics.log'),
+    })
+    _frame(gui)
+
+    with caplog.at_level(logging.INFO, logger=acc.LOGGER):
+        gui._loop_cleanup()
+
+    message = json.loads(caplog.records[-1].getMessage())
+    assert message['counters']['frames'] == 1
+
+    # Log entries are JSON objects separated by commas.
+    with open(str(tmp_path / 'metrics.log')) as fh:
+        entry = json.loads(fh.readlines()[-1].rstrip().rstrip(','))
+    assert json.loads(entry['msg']) == message
+
+
+def test_application_log_handlers_are_kept():
+    handler = logging.NullHandler()
+    acc.logger().addHandler(handler)
+    try:
+        pg.PazGui(Grid, stream=acc.TestOut())
+        pg.PazGui(Grid, stream=acc.TestOut())
+
+        handlers = acc.logger().handlers
+        assert handler in handlers
+        # A single handler is installed for the guis.
+        assert len(handlers) == 2
+    finally:
+        acc.logger().removeHandler(handler)
+
+
+def test_profiler_overlay():
+    gui = pg.PazGui(Grid, stream=acc.TestOut(), config={
+        'profiler-interval': 0,
+    })
+    _frame(gui)
+
+    gui.event_queue(pg.PazEvent('KEY_F12', source='KBD'))
+    _frame(gui)
+    _frame(gui)
+    gui._loop_cleanup()
+
+    assert gui.profiler != None
+    text = gui.profiler.get_text()
+    assert text.startswith('FPS')
+    assert '/root/' in text and '/root/profiler' not in text
+    assert all(path != '/root/profiler'
+        for path, mean in gui._metrics.slowest_boxes(100))
+
+    gui.event_queue(pg.PazEvent('KEY_F12', source='KBD'))
+    _frame(gui)
+    assert gui.profiler == None
+    assert gui.child(1) == None
+    # Metrics were turned on by the overlay.
+    assert gui._metrics == None
+    assert gui._frame_buffer.metrics == None
+
+    gui = pg.PazGui(Grid, stream=acc.TestOut(), config={ 'metrics': True })
+    metrics = gui._metrics
+    gui.toggle_profiler()
+    gui.toggle_profiler()
+    assert gui._metrics is metrics
+    assert gui._frame_buffer.metrics is metrics
@@ -0,0 +1,88 @@
+import os
+
+from pazgui import gui as pg
+from pazgui import behavior as pb
+from pazgui import record
+from pazgui.headless import PazHeadlessGui
+
+
+class Chat(pg.PazBox):
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+        'border': True,
+        'behavior': {
+            pb.PazTextArea: { },
+        },
+    }
+
+    @pb.on('NEW_MESSAGE')
+    def new_message(self, ev):
+        self.set_text('{}\n{}'.format(self.get_text(), ev.get('message')))
+        return True
+
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / 'session.jsonl.gz')
+
+    gui = PazHeadlessGui(Chat, config={ 'record': path })
+    gui.step('h', 'i')
+    gui.advance(1.5)
+    gui.step(pg.PazEvent('NEW_MESSAGE', source='NET', target='/root/',
+        data={ 'message': 'hello' }))
+    gui.resize_screen(40, 10)
+    gui.step()
+    gui.advance(0.25)
+    gui.step('KEY_BACKSPACE')
+    gui.stop_recording()
+
+    header, entries = record.load(path)
+    assert header['size'] == [ 80, 24 ]
+    assert [ e[0] for e in entries ] == [ 0, 0, 1.5, 1.5, 1.75 ]
+    assert entries[2][1:] == [ 'NEW_MESSAGE', 'NET', '/root/',
+        { 'message': 'hello' } ]
+    assert entries[3][1] == [ 40, 10 ]
+
+    replayed = [ ]
+    class Replayed(Chat):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            replayed.append(self)
+
+    results = record.replay(path, Replayed)
+
+    assert results['events'] == 4
+    assert results['frames'] == 5
+    assert results['frame-time']['count'] == 5
+    assert gui.child(0).get_text().startswith('h')
+    assert replayed[0].get_text() == gui.child(0).get_text()
+
+
+def test_recording_of_killed_session(tmp_path):
+    path = str(tmp_path / 'session.jsonl.gz')
+
+    gui = PazHeadlessGui(Chat, config={ 'record': path })
+    gui.step('a', 'b')
+    gui.advance(1)
+    gui.step('c')
+
+    # Entries are written every 'record-flush-interval' seconds.
+    header, entries = record.load(path)
+    assert [ e[1] for e in entries ] == [ 'a', 'b' ]
+    written = os.path.getsize(path)
+
+    gui.advance(1)
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    assert len(data) > written
+
+    # The last gzip member is cut.
+    truncated = str(tmp_path / 'truncated.jsonl.gz')
+    with open(truncated, 'wb') as fh:
+        fh.write(data[:written + 10])
+
+    header, entries = record.load(truncated)
+    assert header['size'] == [ 80, 24 ]
+    assert [ e[1] for e in entries ] == [ 'a', 'b' ]
+
+    gui.stop_recording()
+    assert [ e[1] for e in record.load(path)[1] ] == [ 'a', 'b', 'c' ]
@@ -0,0 +1,51 @@
+from pazgui import gui as pg
+from pazgui import behavior as pb
+from pazgui import accessories as acc
+
+
+class TextBox(pg.PazBox):
+    style = {
+        'rect': (0, 0, 30, 5),
+    }
+
+
+class ProgressBox(pg.PazBox):
+    style = {
+        'rect': (0, 0, 10, 3),
+        'behavior': {
+            pb.PazProgressBar: { 'symbol': '#' },
+        },
+    }
+
+
+def _parsed(box):
+    text = box._text
+    text.parse()
+    styles = [ text.get_text_style(c, 0) for c in range(len(text.rows(0))) ]
+
+    return text.get(raw=False), text.rows(), styles
+
+
+def test_spans_match_markup():
+    gui = pg.PazGui(TextBox, stream=acc.TestOut())
+    box = gui.child(0)
+
+    box.set_text('<t s="red">abc</t> de\tf<t s="blue">\x01x\x02\x03</t>')
+    markup = _parsed(box)
+
+    box.set_spans([ ('abc', 'red'), (' de\tf', None), ('<x>&', 'blue') ])
+    spans = _parsed(box)
+
+    assert spans == markup
+    assert box.get_text() == 'abc de\tf<x>&'
+    assert spans[2][:4] == [ 'red', 'red', 'red', 'normal' ]
+
+
+def test_progressbar_spans():
+    gui = pg.PazGui(ProgressBox, stream=acc.TestOut())
+    box = gui.child(0)
+
+    ev = pg.PazEvent('PROGRESSBAR', data={ 'increment': 0.5 })
+    box.propagate_event(ev)
+
+    assert box.get_text() == '#####'
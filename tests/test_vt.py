@@ -0,0 +1,80 @@
+from pazgui import gui as pg
+from pazgui import behavior as pb
+from pazgui import accessories as acc
+from pazgui.vt import VirtualTerminal, Attrs, DEFAULT_ATTRS
+
+from benchmarks.common import StyledGui
+
+
+class Field(pg.PazBox):
+    style = {
+        'rect': (0, 0, 20, 3),
+        'border': True,
+        'border-style': 'green',
+        'behavior': {
+            pb.PazTextArea: { },
+        },
+    }
+
+
+class Form(pg.PazBox):
+    text = 'Form'
+    style = {
+        'rect': (0, 0, 1.0, 1.0),
+        'background-style': 'white_on_blue',
+    }
+
+    def children(self):
+        return [
+            Field,
+            type('Other', (Field, ), { 'style': dict(Field.style,
+                rect=(0, 4, 20, 3)) }),
+        ]
+
+
+def test_vt_sequences():
+    vt = VirtualTerminal(10, 3)
+    vt.feed('abc\x1b[2;5Hd\x1b[1;3')
+    vt.feed('2me\x1b[m\r\nxy')
+
+    assert vt.text() == [ 'abc       ', '    de    ', 'xy        ' ]
+    assert vt.cells()[1][5] == ('e', Attrs(2, None, frozenset([ 'bold' ])))
+    assert vt.cells()[1][4] == ('d', DEFAULT_ATTRS)
+
+    vt.feed('\x1b[H\x1b[2K\x1b[3;1H' + 'z' * 11)
+
+    assert vt.text() == [ '    de    ', 'zzzzzzzzzz', 'z         ' ]
+
+
+def test_differential_update_matches_full_repaint():
+    guis = [ ]
+    for differential in [ True, False ]:
+        stream = acc.TestOut()
+        gui = StyledGui(Form, stream=stream,
+            config={ 'differential-update': differential })
+        vt = VirtualTerminal(gui.width, gui.height)
+        guis.append((gui, stream, vt))
+
+    steps = [ [ ], [ 'KEY_TAB', 'h', 'e', 'y' ], [ 'KEY_BACKSPACE' ],
+              [ 'x' ] ]
+
+    written = [ ]
+    for keys in steps:
+        for gui, stream, vt in guis:
+            for key in keys:
+                gui.event_queue(pg.PazEvent(key, source='KBD'))
+            while len(gui._event_queue) > 0:
+                gui._process_events()
+
+            stream.seek(0)
+            stream.truncate()
+            gui.draw()
+            gui.update()
+            vt.feed(stream.getvalue())
+            written.append(len(stream.getvalue()))
+
+        assert guis[0][2].cells() == guis[1][2].cells()
+
+    assert guis[0][2].text()[1].startswith('│hex ')
+    # Frames after the first one are smaller.
+    assert sum(written[2::2]) < sum(written[3::2]) / 10